@@ -1,2 +1,59 @@
 from .p2p import P2P
+
 VERSION = "1.1.0"
+
+# Public name -> submodule. Everything but P2P is imported on first access, so that
+# `import bybit_p2p` only pays for the client itself.
+_LAZY_EXPORTS = {
+    "P2PAccountPool": "._p2p_accounts",
+    "AttachmentCache": "._p2p_attachments",
+    "BalanceTracker": "._p2p_balance",
+    "OrderBookDiff": "._p2p_book_diff",
+    "Cassette": "._p2p_cassette",
+    "CircuitBreakerRegistry": "._p2p_circuit",
+    "OrderExporter": "._p2p_export",
+    "configure_logging": "._p2p_logging",
+    "NotificationDispatcher": "._p2p_notify",
+    "OrderBookRecorder": "._p2p_orderbook",
+    "OrderBookReplay": "._p2p_orderbook",
+    "PaymentMethodIndex": "._p2p_payments",
+    "Profiler": "._p2p_profiler",
+    "TokenBucket": "._p2p_ratelimit",
+    "FileSource": "._p2p_reference",
+    "OnlineBookSource": "._p2p_reference",
+    "Quote": "._p2p_reference",
+    "ReferenceFeed": "._p2p_reference",
+    "ReferenceSource": "._p2p_reference",
+    "StaticSource": "._p2p_reference",
+    "PRIORITY_HIGH": "._p2p_scheduler",
+    "PRIORITY_LOW": "._p2p_scheduler",
+    "PRIORITY_NORMAL": "._p2p_scheduler",
+    "PollingScheduler": "._p2p_scheduler",
+    "SigningExecutor": "._p2p_signing",
+    "P2PSimulator": "._p2p_simulator",
+    "SnapshotFetcher": "._p2p_snapshots",
+    "SnapshotStore": "._p2p_snapshots",
+    "LeaderLease": "._p2p_state",
+    "MemoryBackend": "._p2p_state",
+    "RedisBackend": "._p2p_state",
+    "SharedTokenBucket": "._p2p_state",
+    "SQLiteBackend": "._p2p_state",
+    "AdUpdateQueue": "._p2p_write_queue",
+}
+
+__all__ = ["P2P", "VERSION", *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -20,4 +20,30 @@ class FailedRequestError(Exception):
         super().__init__(
             f"{message.capitalize()} (ErrCode: {status_code}) (ErrTime: {time})"
             f".\nRequest → {request}."
-        )
\ No newline at end of file
+        )
+
+
+class CircuitOpenError(FailedRequestError):
+    """
+    Raised without sending the request while the circuit breaker of an endpoint is open.
+
+    Attributes:
+        retry_after -- Seconds until the breaker lets a probe request through.
+    """
+
+    def __init__(self, request, message, time, retry_after):
+        self.retry_after = retry_after
+        super().__init__(request, message, None, time, None)
+
+
+class CassetteMismatchError(LookupError):
+    """
+    Raised when a cassette in replay mode has no recorded response for a request.
+    """
+
+
+class ResponseTooLargeError(ValueError):
+    """
+    Raised when a response body grows past the transport's `max_body_size` while it is
+    read and decompressed; the rest of the body is not read.
+    """
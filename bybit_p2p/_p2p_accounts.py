@@ -0,0 +1,232 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ._p2p_manager import create_session
+from ._p2p_pagination import iter_items
+from ._p2p_ratelimit import TokenBucket
+from .p2p import P2P
+
+# Bybit allows 600 requests per 5 seconds per IP
+DEFAULT_IP_RATE = 120
+DEFAULT_IP_BURST = 600
+
+
+class MergedResult:
+    """
+    Result of a query executed across accounts.
+
+    :ivar items: Merged rows, each tagged with the `account` it came from
+    :ivar errors: Exceptions raised by accounts that failed, keyed by account name
+    """
+
+    def __init__(self, items, errors):
+        self.items = items
+        self.errors = errors
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"MergedResult(items={len(self.items)}, errors={sorted(self.errors)})"
+
+
+class P2PAccountPool:
+    """
+    Many P2P accounts over one connection pool and one per-IP rate budget.
+
+    Every account is a regular `P2P` client, but all of them share a single
+    `requests.Session` and a token bucket sized to the IP limit, plus a bucket of their
+    own for per-key limits. Cross-account queries run on a shared thread pool.
+
+    :param testnet: Use Testnet instead of Mainnet
+    :param ip_rate: Requests per second allowed for the whole pool
+    :param ip_burst: Burst size of the pool budget
+    :param key_rate: Requests per second allowed per account, None for no per-key limit
+    :param key_burst: Burst size of each per-key budget
+    :param max_workers: Threads used for cross-account queries; also the connection pool size
+    :param client_kwargs: Extra `P2P` arguments applied to every account (domain, tld, ...)
+    """
+
+    def __init__(
+            self,
+            testnet=False,
+            ip_rate=DEFAULT_IP_RATE,
+            ip_burst=DEFAULT_IP_BURST,
+            key_rate=None,
+            key_burst=None,
+            max_workers=8,
+            **client_kwargs
+    ):
+        self._testnet = testnet
+        self._key_rate = key_rate
+        self._key_burst = key_burst
+        self._max_workers = max_workers
+        self._client_kwargs = client_kwargs
+        self.ip_bucket = TokenBucket(ip_rate, ip_burst) if ip_rate else None
+        self._session = None
+        self._executor = None
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = create_session(
+                    verify=not self._client_kwargs.get("disable_ssl_checks", False),
+                    pool_maxsize=self._max_workers,
+                )
+            return self._session
+
+    def add_account(self, name, api_key, api_secret, rsa=False, **kwargs):
+        """
+        Register an account.
+
+        :param name: Account name used in results
+        :param api_key: API key
+        :param api_secret: API secret or RSA private key
+        :param rsa: Sign requests with RSA
+        :param kwargs: `P2P` arguments overriding the pool defaults for this account
+        :return: The account's P2P client
+        """
+
+        limiters = []
+        if self._key_rate:
+            limiters.append(TokenBucket(self._key_rate, self._key_burst))
+        # Per-key budget first, so waiting on it does not hold IP budget
+        if self.ip_bucket is not None:
+            limiters.append(self.ip_bucket)
+
+        options = dict(self._client_kwargs, **kwargs)
+        options.setdefault("testnet", self._testnet)
+        api = P2P(
+            api_key=api_key,
+            api_secret=api_secret,
+            rsa=rsa,
+            session=self.session,
+            rate_limiters=limiters,
+            **options
+        )
+        with self._lock:
+            if name in self._accounts:
+                raise ValueError(f"Account already registered: {name}")
+            self._accounts[name] = api
+        return api
+
+    def remove_account(self, name):
+        with self._lock:
+            del self._accounts[name]
+
+    def __getitem__(self, name):
+        return self._accounts[name]
+
+    def __contains__(self, name):
+        return name in self._accounts
+
+    def __iter__(self):
+        return iter(list(self._accounts))
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def map(self, func, accounts=None):
+        """
+        Call `func(name, api)` for every account concurrently.
+
+        :param func: Callable receiving the account name and its P2P client
+        :param accounts: Account names to include, all accounts if None
+        :return: Tuple of (results by account, exceptions by account)
+        """
+
+        with self._lock:
+            names = list(accounts) if accounts is not None else list(self._accounts)
+            clients = [(name, self._accounts[name]) for name in names]
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="bybit-p2p-pool"
+                )
+            executor = self._executor
+
+        futures = {name: executor.submit(func, name, api) for name, api in clients}
+        results, errors = {}, {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+        return results, errors
+
+    def call(self, method_name, accounts=None, **params):
+        """
+        Call the same API method on every account.
+
+        :param method_name: P2P method name, e.g. "get_account_information"
+        :param accounts: Account names to include, all accounts if None
+        :param params: Request parameters
+        :return: Tuple of (responses by account, exceptions by account)
+        """
+
+        return self.map(lambda name, api: getattr(api, method_name)(**dict(params)), accounts)
+
+    def all_pending_orders(self, accounts=None, page_size=50, **params):
+        """
+        Pending orders of every account, all pages, merged newest first.
+
+        :param accounts: Account names to include, all accounts if None
+        :param page_size: Rows per page
+        :param params: Extra `get_pending_orders` filters
+        :return: MergedResult of order rows tagged with `account`
+        """
+
+        return self._merge_items("get_pending_orders", accounts, page_size, params)
+
+    def all_orders(self, accounts=None, page_size=50, **params):
+        """
+        Orders of every account, all pages, merged newest first.
+
+        :param accounts: Account names to include, all accounts if None
+        :param page_size: Rows per page
+        :param params: Extra `get_orders` filters
+        :return: MergedResult of order rows tagged with `account`
+        """
+
+        return self._merge_items("get_orders", accounts, page_size, params)
+
+    def all_balances(self, accounts=None, accountType="FUND", **params):
+        """
+        Coin balances of every account.
+
+        :param accounts: Account names to include, all accounts if None
+        :param accountType: Account type
+        :param params: Extra `get_current_balance` parameters, e.g. `coin`
+        :return: MergedResult of balance rows tagged with `account`
+        """
+
+        def fetch(name, api):
+            response = api.get_current_balance(accountType=accountType, **params)
+            return [dict(row, account=name) for row in (response.get("result") or {}).get("balance") or []]
+
+        results, errors = self.map(fetch, accounts)
+        return MergedResult([row for rows in results.values() for row in rows], errors)
+
+    def _merge_items(self, method_name, accounts, page_size, params):
+        def fetch(name, api):
+            fetch_page = getattr(api, method_name)
+            return [dict(item, account=name) for item in iter_items(fetch_page, page_size=page_size, **params)]
+
+        results, errors = self.map(fetch, accounts)
+        items = [item for rows in results.values() for item in rows]
+        items.sort(key=lambda item: int(item.get("createDate") or 0), reverse=True)
+        return MergedResult(items, errors)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Extension → chat contentType, as accepted by /v5/p2p/order/message/send
+_CONTENT_TYPES = {
+    ".jpg": "pic",
+    ".jpeg": "pic",
+    ".png": "pic",
+    ".pdf": "pdf",
+    ".mp4": "video",
+}
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """
+    Compute the SHA-256 hex digest of a file, reading it in chunks.
+
+    :param path: Path to the file
+    :return: Hex digest string
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_type_for(path):
+    """
+    Guess the chat contentType (pic, pdf, video) for a file by its extension.
+
+    :param path: Path to the file
+    :return: contentType string
+    """
+
+    ext = os.path.splitext(str(path))[1].lower()
+    try:
+        return _CONTENT_TYPES[ext]
+    except KeyError:
+        raise ValueError(f"Unsupported attachment type: {ext or path}")
+
+
+class AttachmentCache:
+    """
+    Content-addressed cache of uploaded chat files.
+
+    Maps the SHA-256 of a file to the URL returned by `upload_chat_file`, so the same
+    document is uploaded once and re-sent by URL afterwards. When `path` is given, the
+    cache is persisted as JSON and survives restarts.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def get(self, digest):
+        with self._lock:
+            return self._entries.get(digest)
+
+    def put(self, digest, entry):
+        with self._lock:
+            self._entries[digest] = entry
+            self._save()
+
+    def discard(self, digest):
+        with self._lock:
+            if self._entries.pop(digest, None) is not None:
+                self._save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _save(self):
+        if not self._path:
+            return
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self._path)
+
+
+class AttachmentUploader:
+    """
+    Uploads chat files through a P2P client, deduplicating by content hash.
+
+    Uploads run on a thread pool. Concurrent requests for the same content share a
+    single upload instead of racing each other.
+    """
+
+    def __init__(self, api, cache=None, max_workers=4):
+        self._api = api
+        self.cache = cache if cache is not None else AttachmentCache()
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def resolve(self, path):
+        """
+        Return the cache entry for a file, uploading it if needed.
+
+        :param path: Path to the file
+        :return: Dictionary with `url`, `contentType` and `fileName`
+        """
+
+        return self.resolve_async(path).result()
+
+    def resolve_async(self, path):
+        """
+        Same as `resolve`, but returns a Future. Cache hits resolve immediately.
+
+        :param path: Path to the file
+        :return: Future resolving to the cache entry
+        """
+
+        # Unsupported files fail before anything is uploaded
+        content_type_for(path)
+        digest = file_digest(path)
+        # The cache lookup and the in-flight check are one step: an upload stores its
+        # entry before leaving `_in_flight`, so a digest is never uploaded twice
+        with self._lock:
+            entry = self.cache.get(digest)
+            if entry is not None:
+                future = Future()
+                future.set_result(entry)
+                return future
+            future = self._in_flight.get(digest)
+            if future is None:
+                future = self._get_executor().submit(self._upload, digest, path)
+                self._in_flight[digest] = future
+        return future
+
+    def close(self):
+        # Running uploads take `_lock` to leave `_in_flight`, so wait for them outside it
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="bybit-p2p-upload"
+            )
+        return self._executor
+
+    def _upload(self, digest, path):
+        try:
+            response = self._api.upload_chat_file(upload_file=path)
+            result = response.get("result") or {}
+            entry = {
+                "url": result["url"],
+                "contentType": result.get("type") or content_type_for(path),
+                "fileName": os.path.basename(str(path)),
+            }
+            self.cache.put(digest, entry)
+            return entry
+        finally:
+            with self._lock:
+                self._in_flight.pop(digest, None)
@@ -0,0 +1,286 @@
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+# Order statuses, see /v5/p2p/order/simplifyList
+STATUS_WAITING_CHAIN = 5
+STATUS_WAITING_PAYMENT = 10
+STATUS_WAITING_RELEASE = 20
+STATUS_APPEALING = 30
+STATUS_CANCELLED = 40
+STATUS_FINISHED = 50
+STATUS_PAYING = 60
+STATUS_PAY_FAILED = 70
+STATUS_CANCELLED_EXCEPTION = 80
+STATUS_WAITING_TOKEN = 90
+STATUS_OBJECTIONING = 100
+STATUS_WAITING_OBJECTION = 110
+
+CANCELLED_STATUSES = frozenset({STATUS_CANCELLED, STATUS_CANCELLED_EXCEPTION})
+FINISHED_STATUSES = frozenset({STATUS_FINISHED})
+
+SIDE_BUY = 0
+SIDE_SELL = 1
+
+_ZERO = Decimal(0)
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value)) if value not in (None, "") else _ZERO
+    except InvalidOperation:
+        return _ZERO
+
+
+class CoinBalance:
+    """
+    Balance of one coin: `available` can be put into ads, `locked` is held by open sell
+    orders, `total` is both plus anything else the wallet reports.
+    """
+
+    __slots__ = ("coin", "total", "available", "locked")
+
+    def __init__(self, coin, total=_ZERO, available=_ZERO, locked=_ZERO):
+        self.coin = coin
+        self.total = total
+        self.available = available
+        self.locked = locked
+
+    def as_dict(self):
+        return {"coin": self.coin, "total": self.total, "available": self.available, "locked": self.locked}
+
+    def __repr__(self):
+        return f"CoinBalance({self.coin}, available={self.available}, locked={self.locked}, total={self.total})"
+
+
+class BalanceTracker:
+    """
+    Local view of the funding balance, kept current from order events.
+
+    The tracker is seeded from `get_current_balance` and then adjusted locally: coins
+    are locked when a sell order is created, leave the wallet when the order is
+    released, and return to `available` when it is cancelled. Buy orders credit the
+    coin once finished. A periodic `reconcile()` replaces the local numbers with the
+    exchange's, so drift cannot accumulate.
+
+    Events are idempotent per order ID, so feeding the same order list repeatedly
+    (e.g. every pending orders poll) is safe.
+
+    :param api: P2P client
+    :param account_type: Account type passed to `get_current_balance`
+    :param coins: Coins to track, all returned coins if None
+    """
+
+    def __init__(self, api, account_type="FUND", coins=None):
+        self._api = api
+        self._account_type = account_type
+        self._coins = set(coins) if coins else None
+        self._lock = threading.Lock()
+        self._balances = {}
+        # order ID -> (coin, amount, side) of orders currently holding funds
+        self._open_orders = {}
+        self._closed_orders = set()
+        self.last_reconciled = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _balance(self, coin):
+        balance = self._balances.get(coin)
+        if balance is None:
+            balance = self._balances[coin] = CoinBalance(coin)
+        return balance
+
+    def reconcile(self):
+        """
+        Replace local balances with the exchange's. The wallet's transferable balance
+        already excludes funds frozen by orders, so locally tracked locks are kept.
+
+        :return: Dictionary of coin -> CoinBalance
+        """
+
+        params = {"accountType": self._account_type}
+        if self._coins and len(self._coins) == 1:
+            params["coin"] = next(iter(self._coins))
+        response = self._api.get_current_balance(**params)
+        rows = (response.get("result") or {}).get("balance") or []
+
+        with self._lock:
+            for row in rows:
+                coin = row.get("coin")
+                if not coin or (self._coins and coin not in self._coins):
+                    continue
+                balance = self._balance(coin)
+                balance.total = _decimal(row.get("walletBalance"))
+                balance.available = _decimal(row.get("transferBalance", row.get("walletBalance")))
+                balance.locked = sum(
+                    (amount for order_coin, amount, side in self._open_orders.values()
+                     if order_coin == coin and side == SIDE_SELL),
+                    _ZERO,
+                )
+            self.last_reconciled = time.time()
+            return dict(self._balances)
+
+    def order_created(self, order_id, coin, amount, side=SIDE_SELL):
+        """
+        An order was placed against one of our ads. Sell orders lock `amount`.
+
+        :param order_id: Order ID
+        :param coin: Token ID, e.g. USDT
+        :param amount: Token quantity of the order
+        :param side: SIDE_SELL if we sell the coin, SIDE_BUY if we buy it
+        """
+
+        order_id = str(order_id)
+        with self._lock:
+            if order_id in self._open_orders or order_id in self._closed_orders:
+                return
+            amount = _decimal(amount)
+            self._open_orders[order_id] = (coin, amount, side)
+            if side == SIDE_SELL:
+                balance = self._balance(coin)
+                balance.available -= amount
+                balance.locked += amount
+
+    def order_released(self, order_id):
+        """
+        Assets were released (`release_assets`) or the order finished: locked coins leave
+        the wallet for sell orders, bought coins arrive for buy orders.
+
+        :param order_id: Order ID
+        """
+
+        with self._lock:
+            order = self._close(order_id)
+            if order is None:
+                return
+            coin, amount, side = order
+            balance = self._balance(coin)
+            if side == SIDE_SELL:
+                balance.locked -= amount
+                balance.total -= amount
+            else:
+                balance.available += amount
+                balance.total += amount
+
+    def release_assets(self, order_id):
+        """
+        Call `release_assets` and book the release once the exchange accepted it.
+
+        :param order_id: Order ID
+        :return: Request results as dictionary
+        """
+
+        response = self._api.release_assets(orderId=order_id)
+        self.order_released(order_id)
+        return response
+
+    def order_cancelled(self, order_id):
+        """
+        The order was cancelled: locked coins become available again.
+
+        :param order_id: Order ID
+        """
+
+        with self._lock:
+            order = self._close(order_id)
+            if order is None:
+                return
+            coin, amount, side = order
+            if side == SIDE_SELL:
+                balance = self._balance(coin)
+                balance.locked -= amount
+                balance.available += amount
+
+    def _close(self, order_id):
+        order_id = str(order_id)
+        order = self._open_orders.pop(order_id, None)
+        if order is not None:
+            self._closed_orders.add(order_id)
+        return order
+
+    def apply_order(self, order):
+        """
+        Update from an order row as returned by `get_orders`/`get_pending_orders`.
+        Orders first seen in a finished or cancelled state do not change balances.
+
+        :param order: Order dictionary with `id`, `tokenId`, `side`, `status` and
+            `notifyTokenQuantity` (or `quantity`)
+        """
+
+        order_id = str(order["id"])
+        status = int(order.get("status", STATUS_WAITING_PAYMENT))
+        final = status in FINISHED_STATUSES or status in CANCELLED_STATUSES
+        with self._lock:
+            seen = order_id in self._open_orders or order_id in self._closed_orders
+            if not seen and final:
+                # First seen already closed, e.g. history loaded at startup: its effect
+                # is part of the reconciled balance, so it is only remembered
+                self._closed_orders.add(order_id)
+                return
+        if not seen:
+            self.order_created(
+                order_id,
+                order.get("tokenId"),
+                order.get("notifyTokenQuantity", order.get("quantity")),
+                int(order.get("side", SIDE_SELL)),
+            )
+        if status in FINISHED_STATUSES:
+            self.order_released(order_id)
+        elif status in CANCELLED_STATUSES:
+            self.order_cancelled(order_id)
+
+    def apply_orders(self, orders):
+        for order in orders:
+            self.apply_order(order)
+
+    def available(self, coin):
+        with self._lock:
+            balance = self._balances.get(coin)
+            return balance.available if balance is not None else _ZERO
+
+    def locked(self, coin):
+        with self._lock:
+            balance = self._balances.get(coin)
+            return balance.locked if balance is not None else _ZERO
+
+    def can_cover(self, coin, quantity):
+        """
+        Whether `quantity` of `coin` is available, e.g. for an ad's `quantity`.
+
+        :return: bool
+        """
+
+        return self.available(coin) >= _decimal(quantity)
+
+    def snapshot(self):
+        """
+        :return: Dictionary of coin -> {"coin", "total", "available", "locked"}
+        """
+
+        with self._lock:
+            return {coin: balance.as_dict() for coin, balance in self._balances.items()}
+
+    def start(self, interval=300):
+        """
+        Reconcile now, then every `interval` seconds from a daemon thread.
+        """
+
+        self.reconcile()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="bybit-p2p-balance", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                self._api.logger.warning("Balance reconciliation failed: %s", e)
@@ -0,0 +1,173 @@
+import threading
+import time
+
+from ._p2p_orderbook import book_key
+from ._p2p_pagination import iter_items
+from ._p2p_reference import SIDE_BUY
+
+# Ad fields compared between polls; a difference in any of them makes the ad "changed"
+FINGERPRINT_FIELDS = ("price", "premium", "lastQuantity", "quantity", "minAmount", "maxAmount", "payments",
+                      "status", "isOnline")
+
+
+def _price(item):
+    try:
+        return float(item.get("price"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BookDiff:
+    """
+    Changes of one book (token/currency/side) between two polls.
+
+    `added` and `removed` are lists of ads, `changed` a list of (previous, current)
+    pairs. `best_price` is the highest buy-ad price for side "0" and the lowest
+    sell-ad price for side "1", None for an empty book.
+    """
+
+    __slots__ = ("key", "ts", "added", "removed", "changed", "best_price", "previous_best_price", "size")
+
+    def __init__(self, key, ts, added, removed, changed, best_price, previous_best_price, size):
+        self.key = key
+        self.ts = ts
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.best_price = best_price
+        self.previous_best_price = previous_best_price
+        self.size = size
+
+    @property
+    def best_price_changed(self):
+        return self.best_price != self.previous_best_price
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return (f"BookDiff({self.key}, added={len(self.added)}, removed={len(self.removed)}, "
+                f"changed={len(self.changed)}, best_price={self.best_price})")
+
+
+class _Book:
+    __slots__ = ("fingerprints", "items", "best_price")
+
+    def __init__(self):
+        self.fingerprints = {}
+        self.items = {}
+        self.best_price = None
+
+
+class OrderBookDiff:
+    """
+    Turns successive `get_online_ads` polls into changes.
+
+    Every ad is fingerprinted on `fields` (price, amounts, payment methods, status by
+    default); the previous snapshot of each token/currency/side is kept, and `update`
+    returns only the ads that appeared, disappeared or changed, plus whether the best
+    price moved. Consumers can skip a poll whose diff is empty, and reprocess only the
+    ads it lists otherwise.
+
+    :param fields: Ad fields making up the fingerprint
+    """
+
+    def __init__(self, fields=FINGERPRINT_FIELDS):
+        self.fields = tuple(fields)
+        self._books = {}
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, item):
+        values = []
+        for field in self.fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                # Payment methods come in no particular order
+                value = tuple(sorted(str(v) for v in value))
+            values.append(value)
+        return tuple(values)
+
+    def update(self, token_id, currency_id, side, items, ts=None):
+        """
+        Compare a full book with the previous one and keep it as the new snapshot.
+        The first update of a book reports every ad as added.
+
+        :param items: Ads of the book, as returned in `result.items`
+        :param ts: Poll time in seconds, now if None
+        :return: BookDiff
+        """
+
+        key = book_key(token_id, currency_id, side)
+        bids = str(side) == SIDE_BUY
+        fingerprints = {}
+        current = {}
+        best = None
+        for item in items:
+            ad_id = str(item.get("id"))
+            fingerprints[ad_id] = self._fingerprint(item)
+            current[ad_id] = item
+            price = _price(item)
+            if price is not None and (best is None or (price > best if bids else price < best)):
+                best = price
+
+        with self._lock:
+            book = self._books.get(key)
+            if book is None:
+                book = self._books[key] = _Book()
+            previous, previous_items = book.fingerprints, book.items
+            added, changed = [], []
+            for ad_id, fingerprint in fingerprints.items():
+                old = previous.get(ad_id)
+                if old is None:
+                    added.append(current[ad_id])
+                elif old != fingerprint:
+                    changed.append((previous_items[ad_id], current[ad_id]))
+            removed = [item for ad_id, item in previous_items.items() if ad_id not in fingerprints]
+            previous_best = book.best_price
+            book.fingerprints, book.items, book.best_price = fingerprints, current, best
+
+        return BookDiff(key, time.time() if ts is None else ts, added, removed, changed, best, previous_best,
+                        len(current))
+
+    def poll(self, api, token_id, currency_id, side, max_items=250, page_size=50):
+        """
+        Fetch a book with `get_online_ads` and diff it.
+
+        :param api: P2P client, or anything with a `get_online_ads` method
+        :param max_items: Ads fetched at most, from the top of the book
+        :return: BookDiff
+        """
+
+        items = []
+        for item in iter_items(api.get_online_ads, page_size=page_size,
+                               tokenId=token_id, currencyId=currency_id, side=side):
+            items.append(item)
+            if len(items) >= max_items:
+                break
+        return self.update(token_id, currency_id, side, items)
+
+    def snapshot(self, token_id, currency_id, side):
+        """
+        :return: Ads of the last update of a book, in poll order
+        """
+
+        with self._lock:
+            book = self._books.get(book_key(token_id, currency_id, side))
+            return list(book.items.values()) if book is not None else []
+
+    def best_price(self, token_id, currency_id, side):
+        with self._lock:
+            book = self._books.get(book_key(token_id, currency_id, side))
+            return book.best_price if book is not None else None
+
+    def reset(self, token_id=None, currency_id=None, side=None):
+        """
+        Forget one book, or every book if no book is given; its next update reports
+        every ad as added.
+        """
+
+        with self._lock:
+            if token_id is None:
+                self._books.clear()
+            else:
+                self._books.pop(book_key(token_id, currency_id, side), None)
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from urllib.parse import parse_qsl, urlsplit
+
+from ._exceptions import CassetteMismatchError
+from ._p2p_transport import Transport, TransportResponse
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+_CASSETTE_VERSION = 1
+
+# Response headers that are never written to a cassette
+_SCRUBBED_RESPONSE_HEADERS = {"set-cookie", "cookie", "authorization"}
+
+# Request fields that differ on every call and are left out of matching
+DEFAULT_IGNORED_FIELDS = ("msgUuid",)
+
+
+def _as_bytes(body):
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return bytes(body)
+
+
+def _strip_fields(value, ignored):
+    if isinstance(value, dict):
+        return {k: _strip_fields(v, ignored) for k, v in value.items() if k not in ignored}
+    if isinstance(value, list):
+        return [_strip_fields(v, ignored) for v in value]
+    return value
+
+
+def normalise_request(method, url, body, ignored_fields=DEFAULT_IGNORED_FIELDS):
+    """
+    Reduce a request to what identifies it: method, path, sorted query and body.
+
+    Host, headers, timestamps and signatures are dropped. JSON bodies are re-serialised
+    with sorted keys; other bodies (multipart uploads) are replaced by their SHA-256.
+
+    :param method: HTTP method
+    :param url: Full request URL
+    :param body: Request body, str or bytes
+    :param ignored_fields: JSON fields excluded from matching
+    :return: Dictionary with `method`, `path` and `body`
+    """
+
+    parts = urlsplit(url)
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    path = parts.path + ("?" + "&".join(f"{k}={v}" for k, v in query) if query else "")
+
+    raw = _as_bytes(body)
+    try:
+        normalised = json.dumps(_strip_fields(json.loads(raw), set(ignored_fields)), sort_keys=True)
+    except ValueError:
+        normalised = "sha256:" + hashlib.sha256(raw).hexdigest() if raw else ""
+    return {"method": method.upper(), "path": path, "body": normalised}
+
+
+class Cassette:
+    """
+    Recorded request/response exchanges for offline, deterministic runs.
+
+    Passed to `P2PManager(cassette=...)`, it wraps the client's transport. In record
+    mode, real requests go through and each exchange is appended to the cassette file,
+    without request headers (API key, signature, timestamp). In replay mode, nothing
+    leaves the process: requests are matched on method, path, query and normalised
+    body, and the recorded responses are served in the order they were recorded. The
+    last match for a request is repeated once its recordings run out.
+
+    The file is JSON lines: a header line with the format version, then one exchange
+    per line, so recording appends instead of rewriting the file, and a crash loses at
+    most the exchange being written.
+
+    :param path: Cassette file
+    :param mode: "record" or "replay"
+    :param ignored_fields: JSON request fields excluded from matching
+    """
+
+    def __init__(self, path, mode=MODE_REPLAY, ignored_fields=DEFAULT_IGNORED_FIELDS):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._ignored_fields = tuple(ignored_fields)
+        self._lock = threading.Lock()
+        self._file = None
+        self.interactions = []
+        self._queues = {}
+        self._last = {}
+
+        if mode == MODE_REPLAY or os.path.exists(path):
+            clean = self._load()
+            if mode == MODE_RECORD and not clean:
+                # Older single-document cassette, or a torn last line: rewrite before appending
+                self.save()
+
+    @staticmethod
+    def _key(request):
+        return request["method"], request["path"], request["body"]
+
+    def _load(self):
+        # Returns False if the file is not clean JSON lines and must be rewritten to append to it
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+        clean = True
+        try:
+            # Cassettes written before the JSON lines format: one indented document
+            self.interactions = json.loads(text)["interactions"]
+            clean = False
+        except (ValueError, TypeError, KeyError):
+            lines = text.splitlines()
+            for index, line in enumerate(lines[1:], 1):
+                try:
+                    self.interactions.append(json.loads(line))
+                except ValueError:
+                    if index < len(lines) - 1:
+                        raise
+                    clean = False  # torn by a crash while it was written
+            clean = clean and text.endswith("\n")
+        for interaction in self.interactions:
+            self._queues.setdefault(self._key(interaction["request"]), deque()).append(interaction["response"])
+        return clean
+
+    @staticmethod
+    def _line(value):
+        return json.dumps(value, separators=(",", ":")) + "\n"
+
+    def save(self):
+        """
+        Rewrite the whole cassette (atomically, through a temporary file).
+        """
+
+        with self._lock:
+            self._close_file()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self._line({"version": _CASSETTE_VERSION}))
+                f.writelines(self._line(interaction) for interaction in self.interactions)
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def play(self, method, url, body):
+        """
+        Serve the recorded response for a request.
+
+        :return: TransportResponse
+        """
+
+        request = normalise_request(method, url, body, self._ignored_fields)
+        key = self._key(request)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                response = self._last[key] = queue.popleft()
+            elif key in self._last:
+                response = self._last[key]
+            else:
+                raise CassetteMismatchError(f"No recorded response for {request['method']} {request['path']}: "
+                                            f"{request['body'][:200]}")
+        return TransportResponse(response["status"], dict(response["headers"]), response["body"].encode("utf-8"))
+
+    def record(self, method, url, body, response):
+        """
+        Append an exchange to the cassette and its file.
+        """
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _SCRUBBED_RESPONSE_HEADERS}
+        interaction = {
+            "request": normalise_request(method, url, body, self._ignored_fields),
+            "response": {"status": response.status_code, "headers": headers, "body": response.text},
+        }
+        line = self._line(interaction)
+        with self._lock:
+            if self._file is None:
+                new = not os.path.exists(self.path)
+                self._file = open(self.path, "a", encoding="utf-8")
+                if new:
+                    self._file.write(self._line({"version": _CASSETTE_VERSION}))
+            self._file.write(line)
+            self._file.flush()
+            self.interactions.append(interaction)
+
+    def transport(self, inner=None):
+        """
+        Wrap a transport: in record mode requests go through `inner` and are recorded,
+        in replay mode `inner` is never used and may be None.
+
+        :param inner: Transport used for live requests
+        :return: CassetteTransport
+        """
+
+        return CassetteTransport(self, inner)
+
+
+class CassetteTransport(Transport):
+    """
+    Transport recording to, or replaying from, a Cassette.
+    """
+
+    def __init__(self, cassette, inner=None):
+        if cassette.mode == MODE_RECORD and inner is None:
+            raise ValueError("Recording needs a transport for live requests")
+        self.cassette = cassette
+        self._inner = inner
+
+    def send(self, request):
+        if self.cassette.mode == MODE_REPLAY:
+            return self.cassette.play(request.method, request.url, request.body)
+        response = self._inner.send(request)
+        self.cassette.record(request.method, request.url, request.body, response)
+        return response
+
+    def close(self):
+        self.cassette.close()
+        if self._inner is not None:
+            self._inner.close()
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# HTTP statuses counted as failures; other responses mean the service is up
+_FAILURE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast while an endpoint is down.
+
+    The circuit opens after `failure_threshold` consecutive failures: transport errors,
+    429/5xx responses, or responses slower than `slow_threshold`. While open, requests
+    are rejected without being sent. After `reset_timeout` seconds one probe request is
+    let through (half-open); its success closes the circuit, its failure opens it again
+    for twice as long, up to `max_reset_timeout`.
+
+    :param name: Name used in logs and state reports
+    :param failure_threshold: Consecutive failures that open the circuit
+    :param slow_threshold: Seconds above which a response counts as a failure, None to ignore latency
+    :param reset_timeout: Seconds the circuit stays open before a probe
+    :param max_reset_timeout: Upper bound of the open period after repeated failed probes
+    """
+
+    def __init__(self, name, failure_threshold=5, slow_threshold=None, reset_timeout=2.0, max_reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_threshold = slow_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._open_for = reset_timeout
+        self._probing = False
+        self.total_failures = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == STATE_OPEN and now - self._opened_at >= self._open_for:
+            self._state = STATE_HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def retry_after(self):
+        """
+        :return: Seconds until the next probe is allowed, 0 if requests may be sent
+        """
+
+        with self._lock:
+            if self._current_state(time.monotonic()) != STATE_OPEN:
+                return 0.0
+            return max(0.0, self._open_for - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """
+        Whether a request may be sent now. In half-open state only one caller at a
+        time gets True; it must report the outcome with `record_success`,
+        `record_failure` or `release`.
+
+        :return: bool
+        """
+
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """
+        Give back a permission from `allow()` without an outcome (nothing was sent).
+        """
+
+        with self._lock:
+            self._probing = False
+
+    def record(self, status_code, latency):
+        """
+        Report a response.
+
+        :param status_code: HTTP status
+        :param latency: Seconds from send to response
+        """
+
+        slow = self.slow_threshold is not None and latency > self.slow_threshold
+        if status_code in _FAILURE_STATUSES or slow:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                _logger.info("Circuit %s closed", self.name)
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probing = False
+            self._open_for = self.reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self.total_failures += 1
+            self._failures += 1
+            state = self._current_state(now)
+            if state == STATE_HALF_OPEN:
+                self._open_for = min(self._open_for * 2, self.max_reset_timeout)
+            elif state != STATE_CLOSED or self._failures < self.failure_threshold:
+                return
+            self._state = STATE_OPEN
+            self._opened_at = now
+            self._probing = False
+            _logger.warning("Circuit %s open for %.1fs after %d failures", self.name, self._open_for, self._failures)
+
+    def snapshot(self):
+        """
+        :return: Dictionary with `name`, `state`, `failures`, `total_failures`, `rejected`
+            and `retry_after`
+        """
+
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._current_state(time.monotonic()),
+                "failures": self._failures,
+                "total_failures": self.total_failures,
+                "rejected": self.rejected,
+                "retry_after": round(retry_after, 3),
+            }
+
+
+class CircuitBreakerRegistry:
+    """
+    One CircuitBreaker per endpoint and base URL, so an outage of one endpoint or one
+    region (api.bybit.com vs api.bytick.com) does not block the others. Pass it to
+    `P2P(circuit_breaker=...)`; clients may share one registry.
+
+    :param breaker_kwargs: CircuitBreaker settings for every breaker
+    """
+
+    def __init__(self, **breaker_kwargs):
+        self._kwargs = breaker_kwargs
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, method, base_url):
+        """
+        :param method: P2PMethod
+        :param base_url: API base URL, e.g. https://api.bybit.com
+        :return: CircuitBreaker
+        """
+
+        key = (base_url, method.url)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = self._breakers[key] = CircuitBreaker(base_url + method.url, **self._kwargs)
+        return breaker
+
+    def states(self):
+        """
+        :return: List of breaker snapshots, for monitoring
+        """
+
+        return [breaker.snapshot() for breaker in list(self._breakers.values())]
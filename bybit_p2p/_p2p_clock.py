@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+
+# retCode for "invalid request, please check your server timestamp or recv_window param"
+RET_CODE_TIMESTAMP = 10002
+
+# Bybit rejects timestamps more than 1000 ms ahead of server time
+_SERVER_AHEAD_TOLERANCE_MS = 1000
+
+
+class ServerClock:
+    """
+    Tracks the offset between local time and Bybit server time.
+
+    Every response carries the server time (`Timenow` header or the `time` field of the
+    body). Each sample is compared with the midpoint of the local send/receive times and
+    folded into an exponentially weighted average. Samples from round-trips slower than
+    the best recent one get proportionally less weight, since the midpoint assumption
+    is less accurate for them. Round-trip times are tracked per endpoint as well, which is
+    what `recv_window()` uses to size the receive window.
+
+    :param smoothing: Weight of a new sample in the moving averages, between 0 and 1
+    :param min_recv_window: Lower bound for adaptive receive windows, in ms
+    :param max_recv_window: Upper bound for adaptive receive windows, in ms
+    """
+
+    def __init__(self, smoothing=0.2, min_recv_window=1000, max_recv_window=5000):
+        self._smoothing = smoothing
+        self._min_recv_window = min_recv_window
+        self._max_recv_window = max_recv_window
+        self._lock = threading.Lock()
+        self._offset = 0.0
+        self._offset_dev = 0.0
+        self._samples = 0
+        self._best_rtt = 0.0
+        self._rtt = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def offset_ms(self):
+        """Estimated server time minus local time, in ms."""
+        return self._offset
+
+    @property
+    def samples(self):
+        return self._samples
+
+    def now_ms(self):
+        """
+        Current server time estimate.
+
+        :return: Unix timestamp in ms
+        """
+
+        return int(time.time() * 10 ** 3 + self._offset)
+
+    def observe(self, server_ms, sent_at, received_at, key=None, reset=False):
+        """
+        Feed one server time sample.
+
+        :param server_ms: Server time from the response, in ms
+        :param sent_at: Local time (`time.time()`) when the request was sent
+        :param received_at: Local time (`time.time()`) when the response arrived
+        :param key: Endpoint the sample came from, used for per-endpoint RTT tracking
+        :param reset: Take the sample as the new offset instead of averaging it in, e.g.
+            for an explicit resync after the local clock stepped
+        """
+
+        rtt = max(0.0, (received_at - sent_at) * 10 ** 3)
+        sample = float(server_ms) - (sent_at + received_at) / 2 * 10 ** 3
+        with self._lock:
+            if self._samples == 0 or reset:
+                self._offset = sample
+                self._offset_dev = rtt / 2
+                self._best_rtt = rtt
+            else:
+                # Best RTT is allowed to creep up, so a route change is eventually accepted
+                self._best_rtt = min(rtt, self._best_rtt * 1.05 + 1)
+                weight = self._smoothing * min(1.0, (self._best_rtt + 1) / (rtt + 1))
+                error = sample - self._offset
+                self._offset += weight * error
+                self._offset_dev += weight * (abs(error) - self._offset_dev)
+            self._samples += 1
+            if key is not None:
+                self._observe_rtt(key, rtt)
+
+    def _observe_rtt(self, key, rtt):
+        current = self._rtt.get(key)
+        if current is None:
+            self._rtt[key] = (rtt, rtt / 2)
+        else:
+            avg, dev = current
+            error = rtt - avg
+            self._rtt[key] = (avg + self._smoothing * error, dev + self._smoothing * (abs(error) - dev))
+
+    def recv_window(self, key, default):
+        """
+        Receive window for an endpoint: enough to cover the observed one-way latency
+        and the uncertainty of the offset estimate, within the configured bounds.
+
+        :param key: Endpoint key
+        :param default: Window to use until the endpoint has been observed
+        :return: Receive window in ms
+        """
+
+        with self._lock:
+            rtt = self._rtt.get(key)
+            offset_dev = self._offset_dev
+        if rtt is None:
+            return default
+        avg, dev = rtt
+        # Same shape as TCP's RTO estimate, plus the offset uncertainty
+        window = avg + 4 * dev + 2 * offset_dev + _SERVER_AHEAD_TOLERANCE_MS
+        return int(min(self._max_recv_window, max(self._min_recv_window, math.ceil(window))))
+
+    def reset(self):
+        with self._lock:
+            self._offset = 0.0
+            self._offset_dev = 0.0
+            self._samples = 0
+            self._best_rtt = 0.0
+            self._rtt.clear()
+
+    def start(self, sync, interval):
+        """
+        Call `sync()` every `interval` seconds from a daemon thread.
+
+        :param sync: Callable performing a server time request
+        :param interval: Seconds between calls
+        """
+
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(sync, interval), name="bybit-p2p-time-sync", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, sync, interval):
+        while not self._stop.wait(interval):
+            try:
+                sync()
+            except Exception:
+                # Keep the last estimate; the next response or tick refreshes it
+                pass
+
+
+def server_time_ms(headers, body):
+    """
+    Extract the server time from a response, if present.
+
+    :param headers: Response headers
+    :param body: Decoded JSON body
+    :return: Server time in ms, or None
+    """
+
+    value = headers.get("Timenow") if headers is not None else None
+    if value is None and isinstance(body, dict):
+        value = body.get("time")
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,258 @@
+import functools
+import threading
+import zlib
+
+from ._exceptions import ResponseTooLargeError
+
+# Bytes read from the socket at a time while decompressing
+CHUNK_SIZE = 64 * 1024
+
+# Default limit of a decoded response body; a few KB of gzip can expand to gigabytes
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return brotli
+
+
+def _zstd():
+    try:
+        from compression import zstd  # Python 3.14+
+    except ImportError:
+        try:
+            import zstandard as zstd
+        except ImportError:
+            return None
+    return zstd
+
+
+@functools.lru_cache(maxsize=None)
+def available_encodings():
+    """
+    Content codings this process can decode: gzip and deflate always, br and zstd when
+    brotli (or brotlicffi) and zstandard (or Python 3.14's compression.zstd) are installed.
+
+    :return: Tuple, most preferred first
+    """
+
+    encodings = []
+    if _zstd() is not None:
+        encodings.append("zstd")
+    if _brotli() is not None:
+        encodings.append("br")
+    return tuple(encodings) + ("gzip", "deflate")
+
+
+def accept_encoding():
+    """
+    :return: Accept-Encoding header value listing `available_encodings()`
+    """
+
+    return ", ".join(available_encodings())
+
+
+class _DeflateDecoder:
+    # "deflate" is zlib-wrapped per the RFC, but some servers send raw deflate streams
+    def __init__(self):
+        self._obj = zlib.decompressobj()
+        self._first = True
+
+    def decompress(self, data, max_length=0):
+        if not self._first:
+            return self._obj.decompress(data, max_length)
+        self._first = False
+        try:
+            return self._obj.decompress(data, max_length)
+        except zlib.error:
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._obj.decompress(data, max_length)
+
+    def flush(self):
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self, brotli):
+        self._obj = brotli.Decompressor()
+        self._process = getattr(self._obj, "process", None) or self._obj.decompress
+
+    def decompress(self, data, max_length=0):
+        # No portable output limit; read_body checks the size after each chunk
+        return self._process(data)
+
+    def flush(self):
+        return b""
+
+
+class _ZstdDecoder:
+    def __init__(self, zstd):
+        if hasattr(zstd, "ZstdDecompressor") and hasattr(zstd.ZstdDecompressor, "decompressobj"):
+            self._obj = zstd.ZstdDecompressor().decompressobj()
+        else:
+            self._obj = zstd.ZstdDecompressor()
+
+    def decompress(self, data, max_length=0):
+        # No portable output limit; read_body checks the size after each chunk
+        return self._obj.decompress(data)
+
+    def flush(self):
+        flush = getattr(self._obj, "flush", None)
+        return flush() if flush is not None else b""
+
+
+def decoder(encoding):
+    """
+    Incremental decoder for a Content-Encoding value.
+
+    :return: Object with `decompress(chunk, max_length=0)` (at most `max_length`
+        bytes out, 0 for no limit) and `flush()`, None for identity or an unsupported
+        coding
+    """
+
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _DeflateDecoder()
+    if encoding == "br" and _brotli() is not None:
+        return _BrotliDecoder(_brotli())
+    if encoding == "zstd" and _zstd() is not None:
+        return _ZstdDecoder(_zstd())
+    return None
+
+
+def compress(data, encoding):
+    """
+    Encode `data` with a content coding from `available_encodings()`, e.g. for test
+    servers.
+
+    :return: bytes
+    """
+
+    if encoding == "gzip":
+        obj = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return obj.compress(data) + obj.flush()
+    if encoding == "deflate":
+        return zlib.compress(data, 6)
+    if encoding == "br" and _brotli() is not None:
+        return _brotli().compress(data)
+    if encoding == "zstd" and _zstd() is not None:
+        zstd = _zstd()
+        if hasattr(zstd, "ZstdCompressor") and hasattr(zstd.ZstdCompressor, "compressobj"):
+            return zstd.ZstdCompressor().compress(data)
+        return zstd.compress(data)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+
+def negotiate(header, offered=None):
+    """
+    Pick the coding of a response from a request's Accept-Encoding header.
+
+    :param header: Accept-Encoding value, e.g. "gzip, br;q=0.9"
+    :param offered: Codings the server can produce, `available_encodings()` if None
+    :return: Coding, or None to send the body as-is
+    """
+
+    accepted = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in offered or available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def read_body(chunks, encoding, max_size=MAX_BODY_SIZE):
+    """
+    Decompress a response body as it is read.
+
+    :param chunks: Iterable of raw (still encoded) body chunks
+    :param encoding: Content-Encoding header value
+    :param max_size: Largest decoded body in bytes, None for no limit
+    :return: (decoded bytes, bytes received)
+    :raises ResponseTooLargeError: As soon as the decoded body exceeds `max_size`
+    """
+
+    decode = decoder(encoding)
+    parts = []
+    received = decoded = 0
+    for chunk in chunks:
+        received += len(chunk)
+        if decode is not None:
+            # One byte past the limit is enough to know it was exceeded
+            chunk = decode.decompress(chunk, max_size - decoded + 1 if max_size is not None else 0)
+        decoded += len(chunk)
+        if max_size is not None and decoded > max_size:
+            raise ResponseTooLargeError(f"Response body exceeds {max_size} bytes")
+        parts.append(chunk)
+    if decode is not None:
+        tail = decode.flush()
+        if max_size is not None and decoded + len(tail) > max_size:
+            raise ResponseTooLargeError(f"Response body exceeds {max_size} bytes")
+        parts.append(tail)
+    return b"".join(parts), received
+
+
+class CompressionStats:
+    """
+    Bytes received versus bytes after decompression, per Content-Encoding. Transports
+    update it for every response; `snapshot()` reports the compression ratio and the
+    bytes saved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_encoding = {}
+
+    def record(self, encoding, received, decoded):
+        encoding = (encoding or "identity").strip().lower() or "identity"
+        with self._lock:
+            counts = self._by_encoding.get(encoding)
+            if counts is None:
+                counts = self._by_encoding[encoding] = [0, 0, 0]
+            counts[0] += 1
+            counts[1] += received
+            counts[2] += decoded
+
+    def reset(self):
+        with self._lock:
+            self._by_encoding = {}
+
+    def snapshot(self):
+        """
+        :return: Dictionary with `responses`, `received_bytes`, `decoded_bytes`,
+            `bytes_saved`, `ratio` (decoded / received) and the same per encoding
+        """
+
+        with self._lock:
+            by_encoding = {name: list(counts) for name, counts in self._by_encoding.items()}
+
+        def summary(responses, received, decoded):
+            return {
+                "responses": responses,
+                "received_bytes": received,
+                "decoded_bytes": decoded,
+                "bytes_saved": decoded - received,
+                "ratio": round(decoded / received, 3) if received else None,
+            }
+
+        totals = [sum(counts[i] for counts in by_encoding.values()) for i in range(3)]
+        result = summary(*totals)
+        result["encodings"] = {name: summary(*counts) for name, counts in sorted(by_encoding.items())}
+        return result
@@ -0,0 +1,259 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+
+from ._p2p_pagination import DEFAULT_PAGE_SIZE, iter_pages
+
+FORMAT_PARQUET = "parquet"
+FORMAT_CSV = "csv"
+
+STATE_FILE = "_export_state.json"
+
+# Decimal columns are exported with this many fractional digits
+DECIMAL_SCALE = 10
+_QUANTUM = Decimal(1).scaleb(-DECIMAL_SCALE)
+
+# (column, type) of exported order rows. Types: string, int, decimal, timestamp (ms
+# since the epoch), side (0/1 -> buy/sell). Real names are deliberately left out.
+ORDER_SCHEMA = (
+    ("id", "string"),
+    ("createDate", "timestamp"),
+    ("side", "side"),
+    ("status", "int"),
+    ("orderType", "string"),
+    ("tokenId", "string"),
+    ("currencyId", "string"),
+    ("price", "decimal"),
+    ("amount", "decimal"),
+    ("notifyTokenQuantity", "decimal"),
+    ("fee", "decimal"),
+    ("userId", "string"),
+    ("targetUserId", "string"),
+    ("targetNickName", "string"),
+)
+
+_SIDES = {0: "buy", 1: "sell"}
+
+
+def _convert(value, kind):
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "decimal":
+            return Decimal(str(value)).quantize(_QUANTUM)
+        if kind in ("int", "timestamp"):
+            return int(value)
+        if kind == "side":
+            return _SIDES.get(int(value), str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def _csv_value(value, kind):
+    if value is None:
+        return ""
+    if kind == "timestamp":
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat(timespec="milliseconds")
+    if kind == "decimal":
+        return format(value.normalize(), "f")
+    return value
+
+
+def arrow_schema(schema=ORDER_SCHEMA):
+    """
+    :return: pyarrow.Schema for an export schema
+    """
+
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "decimal": pa.decimal128(38, DECIMAL_SCALE),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "side": pa.string(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in schema])
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _CsvPart:
+    def __init__(self, path, schema):
+        self._schema = schema
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in schema])
+
+    def write(self, columns):
+        kinds = [kind for _, kind in self._schema]
+        rows = zip(*(columns[name] for name, _ in self._schema))
+        self._writer.writerows([_csv_value(v, k) for v, k in zip(row, kinds)] for row in rows)
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class _ParquetPart:
+    def __init__(self, path, schema):
+        import pyarrow.parquet as pq
+
+        self._arrow_schema = arrow_schema(schema)
+        self._writer = pq.ParquetWriter(path, self._arrow_schema)
+
+    def write(self, columns):
+        import pyarrow as pa
+
+        self._writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=self._arrow_schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class OrderExporter:
+    """
+    Streams orders from `get_orders` into Parquet (pyarrow) or CSV files.
+
+    Each page is converted to one column batch and written out immediately, so memory
+    use does not grow with the number of orders. Output goes to `directory` as part
+    files of `pages_per_file` pages each. `endTime` is pinned when an export starts, so
+    orders created meanwhile do not shift the pages. After every completed part the
+    position is saved to a state file: running the same export again resumes after the
+    last completed part, and parts left over from an interrupted run are rewritten.
+
+    :param api: P2P client
+    :param directory: Output directory
+    :param format: "parquet" or "csv"; parquet if pyarrow is installed, else csv
+    :param page_size: Rows per page
+    :param pages_per_file: Pages written to a part file before starting the next one
+    :param schema: Sequence of (column, type), see ORDER_SCHEMA
+    :param fetch: Paginated request method, `api.get_orders` if None
+    :param params: Extra request parameters, e.g. `beginTime`, `tokenId`, `status`
+    """
+
+    def __init__(self, api, directory, format=None, page_size=DEFAULT_PAGE_SIZE, pages_per_file=200,
+                 schema=ORDER_SCHEMA, fetch=None, **params):
+        if format is None:
+            format = FORMAT_PARQUET if _has_pyarrow() else FORMAT_CSV
+        if format not in (FORMAT_PARQUET, FORMAT_CSV):
+            raise ValueError(f"Unknown export format: {format}")
+        self.directory = directory
+        self.format = format
+        self.page_size = page_size
+        self.pages_per_file = pages_per_file
+        self.schema = tuple(schema)
+        self._fetch = fetch or api.get_orders
+        self._params = params
+        self._state_path = os.path.join(directory, STATE_FILE)
+
+    def _load_state(self):
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        if state.get("params") != self._params or state.get("format") != self.format:
+            raise ValueError(f"{self.directory} holds a different export, use another directory")
+        return state
+
+    def _save_state(self, state):
+        tmp_path = f"{self._state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, self._state_path)
+
+    def iter_batches(self, start_page=1, end_time=None):
+        """
+        Converted pages as column dictionaries {column: [values]}.
+
+        :param start_page: First page to request
+        :param end_time: Pinned `endTime` in ms, now if None
+        :return: Generator of (page number, columns)
+        """
+
+        params = dict(self._params)
+        params.setdefault("endTime", str(end_time if end_time is not None else int(time.time() * 1000)))
+        for page, result in iter_pages(self._fetch, self.page_size, start_page, **params):
+            items = result.get("items") or []
+            if not items:
+                return
+            yield page, {name: [_convert(item.get(name), kind) for item in items] for name, kind in self.schema}
+
+    def iter_record_batches(self, **kwargs):
+        """
+        Pages as `pyarrow.RecordBatch`, for analysis without writing files.
+
+        :return: Generator of pyarrow.RecordBatch
+        """
+
+        import pyarrow as pa
+
+        schema = arrow_schema(self.schema)
+        for _, columns in self.iter_batches(**kwargs):
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+    def _open_part(self, index):
+        name = f"part-{index:05d}.{self.format}"
+        path = os.path.join(self.directory, name)
+        writer_class = _ParquetPart if self.format == FORMAT_PARQUET else _CsvPart
+        return name, path, writer_class(f"{path}.tmp", self.schema)
+
+    def run(self):
+        """
+        Export all orders, resuming a previous run of the same export if there is one.
+
+        :return: Export state dictionary with `rows`, `parts`, `next_page` and `done`
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+        state = self._load_state() or {
+            "params": self._params,
+            "format": self.format,
+            "end_time": int(time.time() * 1000),
+            "next_page": 1,
+            "parts": [],
+            "rows": 0,
+            "done": False,
+        }
+        if state["done"]:
+            return state
+
+        part = None
+        part_pages = part_rows = 0
+        for page, columns in self.iter_batches(state["next_page"], state["end_time"]):
+            if part is None:
+                part = self._open_part(len(state["parts"]))
+            part[2].write(columns)
+            part_pages += 1
+            part_rows += len(columns[self.schema[0][0]])
+            if part_pages >= self.pages_per_file:
+                self._finish_part(state, part, page + 1, part_rows)
+                part = None
+                part_pages = part_rows = 0
+
+        if part is not None:
+            self._finish_part(state, part, state["next_page"] + part_pages, part_rows)
+        state["done"] = True
+        self._save_state(state)
+        return state
+
+    def _finish_part(self, state, part, next_page, rows):
+        name, path, writer = part
+        writer.close()
+        os.replace(f"{path}.tmp", path)
+        state["parts"].append(name)
+        state["next_page"] = next_page
+        state["rows"] += rows
+        self._save_state(state)
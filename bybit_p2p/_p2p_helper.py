@@ -4,7 +4,7 @@ from ._p2p_method import P2PMethod
 class P2PMethods:
     GET_CURRENT_BALANCE = P2PMethod("/v5/asset/transfer/query-account-coins-balance", "GET", ["accountType"])
     GET_ACCOUNT_INFORMATION = P2PMethod("/v5/p2p/user/personal/info", "POST", [])
-    GET_ADS_LIST = P2PMethod("/v5/p2p/item/personal/list", "POST", [])
+    GET_ADS_LIST = P2PMethod("/v5/p2p/item/personal/list", "POST", [], paginated=True)
     GET_AD_DETAILS = P2PMethod("/v5/p2p/item/info", "POST", ["itemId"])
     UPDATE_AD = P2PMethod("/v5/p2p/item/update", "POST",
                           [
@@ -23,8 +23,9 @@ class P2PMethods:
                           ]
                           )
     REMOVE_AD = P2PMethod("/v5/p2p/item/cancel", "POST", ["itemId"])
-    GET_ORDERS = P2PMethod("/v5/p2p/order/simplifyList", "POST", ["page", "size"])
-    GET_PENDING_ORDERS = P2PMethod("/v5/p2p/order/pending/simplifyList", "POST", ["page", "size"])
+    GET_ORDERS = P2PMethod("/v5/p2p/order/simplifyList", "POST", ["page", "size"], paginated=True)
+    GET_PENDING_ORDERS = P2PMethod("/v5/p2p/order/pending/simplifyList", "POST", ["page", "size"],
+                                   paginated=True)
     GET_COUNTERPARTY_INFO = P2PMethod("/v5/p2p/user/order/personal/info", "POST", ["originalUid", "orderId"])
     GET_ORDER_DETAILS = P2PMethod("/v5/p2p/order/info", "POST", ["orderId"])
     RELEASE_ASSETS = P2PMethod("/v5/p2p/order/finish", "POST", ["orderId"])
@@ -49,5 +50,16 @@ class P2PMethods:
                               "itemType"
                           ]
                         )
-    GET_ONLINE_ADS = P2PMethod("/v5/p2p/item/online", "POST", ["tokenId", "currencyId", "side"])
+    GET_ONLINE_ADS = P2PMethod("/v5/p2p/item/online", "POST", ["tokenId", "currencyId", "side"], paginated=True)
     GET_USER_PAYMENT_TYPES = P2PMethod("/v5/p2p/user/payment/list", "POST", [])
+    GET_SERVER_TIME = P2PMethod("/v5/market/time", "GET", [])
+
+    @classmethod
+    def all(cls):
+        """
+        All P2P API methods, in declaration order.
+
+        :return: List of P2PMethod
+        """
+
+        return [value for value in vars(cls).values() if isinstance(value, P2PMethod)]
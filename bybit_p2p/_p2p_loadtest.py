@@ -0,0 +1,408 @@
+import math
+import os
+import random
+import threading
+import time
+
+from ._exceptions import FailedRequestError
+
+# Relative weights of the default scenario mix: mostly polling, some order handling
+DEFAULT_MIX = {
+    "poll_pending": 40,
+    "read_chat": 25,
+    "send_message": 15,
+    "mark_paid": 8,
+    "release": 5,
+    "reprice": 7,
+}
+
+_PERCENTILES = (50, 90, 95, 99)
+
+# Latency histogram buckets: 1% wide, from 1 µs up
+_BUCKET_MIN = 1e-6
+_LOG_GROWTH = math.log(1.01)
+
+_STATUS_WAITING_PAYMENT = 10
+_STATUS_PAID = 20
+
+
+def _poll_pending(api, rng, state):
+    response = api.get_pending_orders(page=1, size=state.page_size)
+    state.learn_orders(response["result"]["items"])
+
+
+def _read_chat(api, rng, state):
+    api.get_chat_messages(orderId=state.order_id(rng), size=30)
+
+
+def _send_message(api, rng, state):
+    api.send_chat_message(message=f"load test {rng.random():.6f}", contentType="str", orderId=state.order_id(rng))
+
+
+def _mark_paid(api, rng, state):
+    order_id = state.order_id(rng, status=_STATUS_WAITING_PAYMENT)
+    api.mark_as_paid(orderId=order_id, paymentType="14", paymentId="1")
+    state.set_status(order_id, _STATUS_PAID)
+
+
+def _release(api, rng, state):
+    order_id = state.order_id(rng)
+    api.release_assets(orderId=order_id)
+    state.forget_order(order_id)
+
+
+def _reprice(api, rng, state):
+    ad = rng.choice(state.ads)
+    api.update_ad(
+        id=ad["id"], priceType=0, premium="", price=f"{float(ad['price']) * rng.uniform(0.99, 1.01):.4f}",
+        minAmount=ad["minAmount"], maxAmount=ad["maxAmount"], remark="", tradingPreferenceSet={},
+        paymentIds=ad.get("payments", []), actionType="MODIFY", quantity=ad["quantity"], paymentPeriod="15",
+    )
+
+
+SCENARIOS = {
+    "poll_pending": _poll_pending,
+    "read_chat": _read_chat,
+    "send_message": _send_message,
+    "mark_paid": _mark_paid,
+    "release": _release,
+    "reprice": _reprice,
+}
+
+
+class _SharedState:
+    """
+    Orders and ads known to the workers, learned from polls like a real bot would.
+    """
+
+    def __init__(self, orders, ads, page_size):
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._orders = {}
+        self.ads = ads
+        self.learn_orders(orders)
+
+    def learn_orders(self, items):
+        if items:
+            with self._lock:
+                self._orders = {o["id"]: o.get("status") for o in items}
+
+    def set_status(self, order_id, status):
+        with self._lock:
+            if order_id in self._orders:
+                self._orders[order_id] = status
+
+    def forget_order(self, order_id):
+        with self._lock:
+            self._orders.pop(order_id, None)
+
+    def order_id(self, rng, status=None):
+        """
+        :return: A known order, in `status` if any is; "0" if no order is known
+        """
+
+        with self._lock:
+            ids = list(self._orders)
+            if status is not None:
+                ids = [i for i in ids if self._orders[i] == status] or ids
+            return rng.choice(ids) if ids else "0"
+
+
+class _LatencyHistogram:
+    """
+    Latencies counted in logarithmic buckets 1% wide, so a worker's memory does not
+    grow with the length of the run. Percentiles are the upper bound of their bucket
+    (at most 1% high); count, mean and max are exact.
+    """
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = 0 if seconds <= _BUCKET_MIN else int(math.log(seconds / _BUCKET_MIN) / _LOG_GROWTH) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentiles(self):
+        """
+        :return: Same dictionary as `percentiles`
+        """
+
+        if not self.count:
+            return {}
+        ranks = {p: max(1, -(-p * self.count // 100)) for p in _PERCENTILES}
+        result = {}
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            for p, rank in ranks.items():
+                if rank <= seen and f"p{p}" not in result:
+                    upper = _BUCKET_MIN * math.exp(index * _LOG_GROWTH)
+                    result[f"p{p}"] = round(min(upper, self.max) * 1000, 3)
+        result["max"] = round(self.max * 1000, 3)
+        result["mean"] = round(self.total / self.count * 1000, 3)
+        return result
+
+
+class _WorkerStats:
+    __slots__ = ("latencies", "errors")
+
+    def __init__(self):
+        self.latencies = {name: _LatencyHistogram() for name in SCENARIOS}
+        self.errors = {name: {} for name in SCENARIOS}
+
+
+def _error_key(e):
+    if isinstance(e, FailedRequestError):
+        return f"{e.status_code}: {e.message}"
+    return type(e).__name__
+
+
+def percentiles(values):
+    """
+    Nearest-rank percentiles of a list of latencies.
+
+    :param values: Seconds
+    :return: Dictionary {"p50", "p90", "p95", "p99", "max", "mean"} in ms
+    """
+
+    if not values:
+        return {}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    result = {f"p{p}": round(ordered[min(last, max(0, -(-p * len(ordered) // 100) - 1))] * 1000, 3)
+              for p in _PERCENTILES}
+    result["max"] = round(ordered[-1] * 1000, 3)
+    result["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return result
+
+
+def open_fds():
+    """
+    :return: Number of open file descriptors of this process, None where unknown
+    """
+
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+
+def rss_bytes():
+    """
+    :return: Resident set size of this process in bytes, None where unknown
+    """
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak, not current, RSS; in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class _ResourceSampler:
+    def __init__(self, interval, trace_memory):
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        traced = None
+        if self.trace_memory:
+            import tracemalloc
+
+            traced = tracemalloc.get_traced_memory()[0]
+        self.samples.append({
+            "t": time.monotonic(), "rss": rss_bytes(), "fds": open_fds(),
+            "threads": threading.active_count(), "traced": traced,
+        })
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="bybit-p2p-loadtest-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def summary(self, key):
+        values = [s[key] for s in self.samples if s[key] is not None]
+        if not values:
+            return None
+        return {"start": values[0], "end": values[-1], "peak": max(values), "growth": values[-1] - values[0]}
+
+
+class LoadTest:
+    """
+    Drives a mix of bot scenarios (poll pending orders, read chats, send messages,
+    mark paid, release, reprice ads) from `concurrency` threads sharing one client for
+    `duration` seconds, then reports throughput, latency percentiles and errors per
+    scenario, along with the process' memory, file descriptor and thread counts
+    sampled during the run. Run it against `MockP2PServer` or a staging server, never
+    against a real account.
+
+    :param api: P2P client
+    :param concurrency: Worker threads
+    :param duration: Seconds to run
+    :param mix: Dictionary {scenario: weight}, see DEFAULT_MIX and SCENARIOS
+    :param page_size: Page size of pending order polls
+    :param sample_interval: Seconds between resource samples
+    :param trace_memory: Also measure Python allocations with tracemalloc (slows the run)
+    :param seed: Seed of the workers' random choices
+    """
+
+    def __init__(self, api, concurrency=50, duration=30.0, mix=None, page_size=50, sample_interval=1.0,
+                 trace_memory=False, seed=None):
+        mix = dict(DEFAULT_MIX if mix is None else mix)
+        unknown = set(mix) - set(SCENARIOS)
+        if unknown:
+            raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        self._api = api
+        self.concurrency = concurrency
+        self.duration = duration
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        if not self.mix:
+            raise ValueError("Scenario mix is empty")
+        self.page_size = page_size
+        self.sample_interval = sample_interval
+        self.trace_memory = trace_memory
+        self.seed = seed
+
+    def _prepare(self):
+        try:
+            orders = self._api.get_pending_orders(page=1, size=self.page_size)["result"]["items"]
+        except FailedRequestError:
+            # Polls during the run learn the orders
+            orders = []
+        ads = []
+        if "reprice" in self.mix:
+            ads = self._api.get_ads_list()["result"]["items"]
+            if not ads:
+                raise ValueError("The reprice scenario needs at least one ad")
+        return _SharedState(orders, ads, self.page_size)
+
+    def _work(self, index, state, deadline, stats):
+        rng = random.Random(None if self.seed is None else self.seed + index)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                SCENARIOS[name](self._api, rng, state)
+            except Exception as e:
+                errors = stats.errors[name]
+                key = _error_key(e)
+                errors[key] = errors.get(key, 0) + 1
+            stats.latencies[name].add(time.perf_counter() - started)
+
+    def run(self):
+        """
+        :return: JSON-serializable report dictionary
+        """
+
+        state = self._prepare()
+        if self.trace_memory:
+            import tracemalloc
+
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+        sampler = _ResourceSampler(self.sample_interval, self.trace_memory)
+        sampler.start()
+
+        workers = [_WorkerStats() for _ in range(self.concurrency)]
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [
+            threading.Thread(target=self._work, args=(i, state, deadline, stats),
+                             name=f"bybit-p2p-loadtest-{i}", daemon=True)
+            for i, stats in enumerate(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        sampler.stop()
+        if self.trace_memory and started_tracing:
+            tracemalloc.stop()
+        return self._report(workers, sampler, elapsed)
+
+    def _compression(self):
+        stats = getattr(getattr(self._api, "transport", None), "compression", None)
+        return stats.snapshot() if stats is not None else None
+
+    def _report(self, workers, sampler, elapsed):
+        scenarios = {}
+        all_latencies = _LatencyHistogram()
+        total_errors = 0
+        for name in self.mix:
+            latencies = _LatencyHistogram()
+            for w in workers:
+                latencies.merge(w.latencies[name])
+            errors = {}
+            for w in workers:
+                for key, count in w.errors[name].items():
+                    errors[key] = errors.get(key, 0) + count
+            error_count = sum(errors.values())
+            all_latencies.merge(latencies)
+            total_errors += error_count
+            scenarios[name] = {
+                "requests": latencies.count,
+                "errors": error_count,
+                "error_rate": round(error_count / latencies.count, 4) if latencies.count else 0.0,
+                "throughput": round(latencies.count / elapsed, 2),
+                "latency_ms": latencies.percentiles(),
+                "error_types": errors,
+            }
+        total = all_latencies.count
+        return {
+            "config": {"concurrency": self.concurrency, "duration": self.duration, "mix": self.mix},
+            "elapsed": round(elapsed, 3),
+            "requests": total,
+            "errors": total_errors,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "throughput": round(total / elapsed, 2),
+            "latency_ms": all_latencies.percentiles(),
+            "scenarios": scenarios,
+            "rss_bytes": sampler.summary("rss"),
+            "traced_bytes": sampler.summary("traced"),
+            "fds": sampler.summary("fds"),
+            "threads": sampler.summary("threads"),
+            "compression": self._compression(),
+            "samples": [{"t": round(s["t"] - sampler.samples[0]["t"], 3), "rss": s["rss"], "fds": s["fds"],
+                         "threads": s["threads"], "traced": s["traced"]} for s in sampler.samples],
+        }
@@ -0,0 +1,222 @@
+import json
+import logging
+import threading
+import time
+
+REDACTED = "***"
+
+# Fields whose values never reach logs or exception messages: credentials, signatures
+# and the personal/payment data carried by order and payment method payloads
+SENSITIVE_FIELDS = frozenset({
+    "api_key",
+    "api_secret",
+    "apiKey",
+    "secret",
+    "sign",
+    "signature",
+    "X-BAPI-API-KEY",
+    "X-BAPI-SIGN",
+    "accountNo",
+    "realName",
+    "buyerRealName",
+    "sellerRealName",
+    "firstName",
+    "lastName",
+    "secondLastName",
+    "mobile",
+    "clabe",
+    "debitCardNumber",
+    "qrcode",
+    "payMessage",
+    "message",
+})
+
+# Max length of a request description embedded in FailedRequestError
+MAX_PAYLOAD_LENGTH = 512
+
+# Attributes of a LogRecord promoted to top-level JSON fields
+STRUCTURED_FIELDS = ("method", "endpoint", "latency_ms", "status", "retCode", "suppressed")
+
+_RESERVED = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "_template"}
+
+
+def redact(value, fields=SENSITIVE_FIELDS):
+    """
+    Copy of a JSON-like value with sensitive fields masked, at any depth.
+
+    :param value: dict, list or scalar
+    :param fields: Field names to mask
+    :return: Redacted copy
+    """
+
+    if isinstance(value, dict):
+        return {k: REDACTED if k in fields else redact(v, fields) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, fields) for v in value]
+    return value
+
+
+def describe_payload(payload, limit=MAX_PAYLOAD_LENGTH):
+    """
+    Short, redacted description of a request payload for error messages.
+
+    :param payload: JSON string, query string or bytes (file uploads)
+    :param limit: Max length of the description
+    :return: str
+    """
+
+    if isinstance(payload, (bytes, bytearray)):
+        return f"<{len(payload)} bytes>"
+    try:
+        text = json.dumps(redact(json.loads(payload)), ensure_ascii=False)
+    except (TypeError, ValueError):
+        text = str(payload)
+    if len(text) > limit:
+        text = text[:limit] + f"... ({len(text) - limit} more chars)"
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Masks registered secret values (API keys and secrets) anywhere in a log message.
+    The message is formatted once here and stored back, so handlers do not format it
+    again; the original template is kept in `_template` for RateLimitFilter.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._secrets = frozenset()
+        self._lock = threading.Lock()
+
+    def add_secret(self, *values):
+        with self._lock:
+            self._secrets = self._secrets | {v for v in values if v and len(v) >= 4}
+
+    def filter(self, record):
+        secrets = self._secrets
+        if not secrets:
+            return True
+        message = record.getMessage()
+        redacted = message
+        for secret in secrets:
+            if secret in redacted:
+                redacted = redacted.replace(secret, REDACTED)
+        if redacted is not message:
+            record._template = record.msg
+            record.msg = redacted
+            record.args = ()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per message template, so a burst of identical errors (e.g. during a
+    ban) costs a bounded amount of logging. Records above the budget are dropped and
+    counted; the next record that passes carries the count in `suppressed`.
+
+    :param rate: Records per second allowed per template
+    :param burst: Records allowed at once per template
+    :param level: Records below this level are never limited
+    """
+
+    def __init__(self, rate=1.0, burst=10, level=logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.level = level
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        key = (record.name, record.levelno, getattr(record, "_template", record.msg))
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, with request fields (`method`, `endpoint`,
+    `latency_ms`, `status`, `retCode`) as top-level keys when present.
+    """
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in STRUCTURED_FIELDS:
+            value = record.__dict__.get(key)
+            if value is not None:
+                data[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in data:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging(logger, level=logging.INFO, json_format=False, queue=False,
+                      handler=None, error_rate=1.0, error_burst=10):
+    """
+    Set up a logger for production use. Records logged through child loggers (the
+    client logs to `bybit_p2p._p2p_manager`) go through the same handler and limits.
+
+    :param logger: Logger to configure, e.g. `logging.getLogger("bybit_p2p")`
+    :param level: Log level
+    :param json_format: Format records as JSON objects
+    :param queue: Hand records to a background thread instead of writing them inline
+    :param handler: Destination handler, a StreamHandler if None
+    :param error_rate: Warnings/errors per second allowed per message template, None for no limit.
+        Without configure_logging nothing is rate-limited
+    :param error_burst: Burst allowed per message template
+    :return: The QueueListener when `queue` is set (call `.stop()` on shutdown), else None
+    """
+
+    handler = handler or logging.StreamHandler()
+    if json_format:
+        handler.setFormatter(JsonFormatter())
+
+    # Filters of a logger do not see records propagated from its children, so the
+    # limit goes on the handler installed here; left on the logger by older versions
+    for existing in [f for f in logger.filters if isinstance(f, RateLimitFilter)]:
+        logger.removeFilter(existing)
+
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+
+    listener = None
+    if queue:
+        import queue as queue_module
+        from logging.handlers import QueueHandler, QueueListener
+
+        records = queue_module.SimpleQueue()
+        listener = QueueListener(records, handler, respect_handler_level=True)
+        installed = QueueHandler(records)
+    else:
+        installed = handler
+    for existing in [f for f in installed.filters if isinstance(f, RateLimitFilter)]:
+        installed.removeFilter(existing)
+    if error_rate:
+        # With a queue, dropped records are never enqueued
+        installed.addFilter(RateLimitFilter(error_rate, error_burst))
+    logger.addHandler(installed)
+    if listener is not None:
+        listener.start()
+
+    logger.setLevel(level)
+    logger.propagate = False
+    return listener
@@ -1,22 +1,25 @@
 import base64
+import functools
 import hashlib
 import hmac
 import json
+import mimetypes
 import os
 
-import requests
 import logging
 import time
 from datetime import datetime as dt, timezone
 from json import JSONDecodeError
-from requests_toolbelt import MultipartEncoder
 
-from Crypto.Hash import SHA256
-from Crypto.PublicKey import RSA
-from Crypto.Signature import PKCS1_v1_5
+# requests and pycryptodome are imported on first use, so that `import bybit_p2p`
+# stays cheap for short-lived processes.
 
-from ._exceptions import FailedRequestError
+from ._exceptions import CircuitOpenError, FailedRequestError
+from ._p2p_clock import RET_CODE_TIMESTAMP, ServerClock, server_time_ms
+from ._p2p_helper import P2PMethods
+from ._p2p_logging import RedactingFilter, describe_payload
 from ._p2p_method import P2PMethod
+from ._p2p_transport import RequestsTransport, TransportRequest
 
 _SUBDOMAIN_TESTNET = "api-testnet"
 _SUBDOMAIN_MAINNET = "api"
@@ -24,6 +27,52 @@ _DOMAIN_MAIN = "bybit"
 _DOMAIN_ALT = "bytick"
 _TLD_MAIN = "com"
 
+_logger = logging.getLogger(__name__)
+# Masks API keys/secrets of every client in log output. Rate limiting is opt-in,
+# see configure_logging
+_redacting_filter = RedactingFilter()
+_logger.addFilter(_redacting_filter)
+
+
+@functools.lru_cache(maxsize=8)
+def _rsa_signer(secret):
+    from Crypto.PublicKey import RSA
+    from Crypto.Signature import PKCS1_v1_5
+
+    return PKCS1_v1_5.new(RSA.importKey(secret))
+
+
+def _rsa_sign(secret, data):
+    from Crypto.Hash import SHA256
+
+    return base64.b64encode(_rsa_signer(secret).sign(SHA256.new(data))).decode()
+
+
+def create_session(verify=True, pool_maxsize=None):
+    """
+    Create a `requests.Session` configured for the P2P API.
+
+    :param verify: Verify SSL certificates
+    :param pool_maxsize: Max kept-alive connections per host, requests' default if None
+    :return: requests.Session
+    """
+
+    import requests
+
+    session = requests.Session()
+    session.verify = verify
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    })
+    if pool_maxsize:
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return session
+
 
 class P2PManager:
     def __init__(
@@ -36,7 +85,21 @@ class P2PManager:
             recv_window=5000,
             rsa=False,
             logging_level=logging.INFO,
-            disable_ssl_checks=False
+            disable_ssl_checks=False,
+            attachment_cache=None,
+            time_sync=True,
+            time_sync_interval=None,
+            adaptive_recv_window=False,
+            session=None,
+            rate_limiters=(),
+            signer=None,
+            cassette=None,
+            transport=None,
+            async_transport=None,
+            timeout=None,
+            circuit_breaker=None,
+            profiler=None,
+            base_url=None
     ):
         self._testnet = testnet
         self._api_key = api_key
@@ -47,13 +110,37 @@ class P2PManager:
         self._rsa = rsa
         self._logging_level = logging_level
         self._disable_ssl_checks = disable_ssl_checks
+        self._attachment_cache = attachment_cache
+        # A session may be shared between clients, e.g. by P2PAccountPool
+        self._client = session
+        # Token buckets acquired in order before every request
+        self._rate_limiters = tuple(rate_limiters)
+        # Optional SigningExecutor offloading RSA signatures to worker processes
+        self._signer = signer if rsa else None
+        # Optional Cassette recording or replaying HTTP exchanges
+        self._cassette = cassette
+        # Transports are created on first request when not given
+        if cassette is not None and transport is not None:
+            transport = cassette.transport(transport)
+        self._transport = transport
+        self._async_transport = async_transport
+        self._timeout = timeout
+        # Optional CircuitBreakerRegistry failing requests fast while an endpoint is down
+        self._circuit_breaker = circuit_breaker
+        # Optional Profiler sampling per-phase timings of requests; may be set at runtime
+        self.profiler = profiler
+        self._adaptive_recv_window = adaptive_recv_window
+        # Overrides testnet/domain/tld, e.g. to target a local MockP2PServer
+        self._base_url = base_url
+
+        # Server time offset, learned from responses; `recv_window` caps adaptive windows
+        self.clock = ServerClock(max_recv_window=recv_window) if time_sync else None
+        if self.clock is not None and time_sync_interval:
+            self.clock.start(self.sync_time, time_sync_interval)
 
         # Set network settings: URL, subdomain, and environment
         self._init_network()
 
-        # Create HTTP session with necessary headers and SSL settings
-        self._init_http_client()
-
         # Set up logging if not already configured
         self._init_logger()
 
@@ -61,20 +148,51 @@ class P2PManager:
 
     def _init_network(self):
         self._subdomain = _SUBDOMAIN_TESTNET if self._testnet else _SUBDOMAIN_MAINNET
-        self._url = f"https://{self._subdomain}.{self._domain}.{self._tld}"
+        if self._base_url:
+            self._url = self._base_url.rstrip("/")
+        else:
+            self._url = f"https://{self._subdomain}.{self._domain}.{self._tld}"
+
+    @property
+    def client(self):
+        # HTTP session is created on first request
+        if self._client is None:
+            self._init_http_client()
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
 
     def _init_http_client(self):
-        self.client = requests.Session()
-        self.client.verify = not self._disable_ssl_checks
-        self.client.headers.update({
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        })
+        self.client = create_session(verify=not self._disable_ssl_checks)
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            if self._cassette is not None and self._cassette.mode == "replay":
+                transport = None
+            else:
+                transport = RequestsTransport(self.client, timeout=self._timeout)
+            if self._cassette is not None:
+                transport = self._cassette.transport(transport)
+            self._transport = transport
+        return self._transport
+
+    @property
+    def async_transport(self):
+        if self._async_transport is None:
+            from ._p2p_transport import ThreadedAsyncTransport
+
+            self._async_transport = ThreadedAsyncTransport(self.transport)
+        return self._async_transport
 
     def _init_logger(self):
-        self.logger = logging.getLogger(__name__)
-        # Only attach a handler if no logging handlers exist yet
-        if not logging.root.handlers:
+        self.logger = _logger
+        # Only attach a handler if no logging handlers exist yet, on this logger or the
+        # ones it propagates to. The logger is shared by all instances, so this happens
+        # at most once per process.
+        if not self.logger.hasHandlers():
             handler = logging.StreamHandler()
             handler.setFormatter(logging.Formatter(
                 fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -83,28 +201,179 @@ class P2PManager:
             handler.setLevel(self._logging_level)
             self.logger.addHandler(handler)
         self.logger.setLevel(self._logging_level)
+        _redacting_filter.add_secret(self._api_key, self._api_secret)
 
     def http_req_handler(self, method: P2PMethod, params):
+        trace = self.profiler.start(method) if self.profiler is not None else None
+        if params is None:
+            params = {}
+
+        try:
+            self._validate_required_params(method, params)
+            self._sanitize_params(params)
+        except BaseException:
+            if trace is not None:
+                trace.cancel()
+            raise
+        if trace is not None:
+            trace.mark("validate")
+
+        try:
+            return self._execute(method, params, trace)
+        except FailedRequestError as e:
+            # Timestamp outside of recv_window: the offset estimate was stale, resync once
+            if not self._should_resync(e):
+                raise
+            self.sync_time()
+            return self._execute(method, params)
+
+    async def http_req_handler_async(self, method: P2PMethod, params):
+        """
+        Same as `http_req_handler`, sending through `async_transport`.
+        Signing and rate limiting run in the default executor, off the event loop.
+        """
+
+        import asyncio
+
         if params is None:
             params = {}
 
         self._validate_required_params(method, params)
         self._sanitize_params(params)
 
-        timestamp = int(time.time() * 10 ** 3)
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            breaker = self._acquire_circuit(method)
+            try:
+                request, payload = await loop.run_in_executor(None, self._build_request, method, params)
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            sent_at = time.time()
+            try:
+                response = await self.async_transport.send(request)
+            except Exception:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            if breaker is not None:
+                breaker.record(response.status_code, time.time() - sent_at)
+            try:
+                return self._process_response(response, method, payload, (sent_at, time.time()))
+            except FailedRequestError as e:
+                if attempt or not self._should_resync(e):
+                    raise
+                await loop.run_in_executor(None, self.sync_time)
+
+    def _should_resync(self, error):
+        if error.status_code != RET_CODE_TIMESTAMP or self.clock is None:
+            return False
+        self.logger.warning("Request timestamp rejected, resyncing server time and retrying.")
+        return True
+
+    def sync_time(self):
+        """
+        Measure the server time offset now, instead of waiting for the next response.
+        The measured offset replaces the smoothed estimate, so a clock step (or a
+        timestamp rejection) is corrected by a single call.
+
+        :return: Estimated server time minus local time, in ms
+        """
+
+        self._execute(P2PMethods.GET_SERVER_TIME, {}, reset_clock=True)
+        return self.clock.offset_ms if self.clock is not None else 0.0
+
+    def _execute(self, method, params, trace=None, reset_clock=False):
+        try:
+            breaker = self._acquire_circuit(method)
+            try:
+                request, payload = self._build_request(method, params, trace)
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            sent_at = time.time()
+            try:
+                response = self._send_request(request)
+            except Exception:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            received_at = time.time()
+            if trace is not None:
+                trace.mark("network")
+            if breaker is not None:
+                breaker.record(response.status_code, received_at - sent_at)
+            result = self._process_response(response, method, payload, (sent_at, received_at), reset_clock)
+            if trace is not None:
+                trace.mark("decode")
+            return result
+        finally:
+            if trace is not None:
+                trace.finish()
+
+    def _acquire_circuit(self, method):
+        # Returns the endpoint's breaker if one is configured, raises if it is open
+        if self._circuit_breaker is None:
+            return None
+        breaker = self._circuit_breaker.get(method, self._url)
+        if not breaker.allow():
+            retry_after = breaker.retry_after()
+            raise CircuitOpenError(
+                request=self._url + method.url,
+                message=f"circuit open, retry in {retry_after:.1f}s",
+                time=dt.now(timezone.utc).strftime("%H:%M:%S"),
+                retry_after=retry_after,
+            )
+        return breaker
+
+    def _build_request(self, method, params, trace=None):
+        # Wait for rate budget before stamping, so the timestamp is not stale when sent
+        for limiter in self._rate_limiters:
+            limiter.acquire()
+        if trace is not None:
+            trace.mark("rate_limit")
+
+        timestamp = self._timestamp()
+        recv_window = self._recv_window_for(method)
 
         # Prepare payload and content type based on request method
         if method.http_method == "FILE":
-            payload, content_type, signature = self._handle_file_upload(method, params, timestamp)
+            payload, content_type, signature = self._handle_file_upload(method, params, timestamp, recv_window)
+            if trace is not None:
+                trace.mark("payload")
         else:
             payload = self._generate_payload(method.http_method, params)
             content_type = "application/json"
-            signature = self._generate_sign(payload, timestamp)
+            if trace is not None:
+                trace.mark("payload")
+            signature = self._generate_sign(payload, timestamp, recv_window)
+            if trace is not None:
+                trace.mark("sign")
 
-        headers = self._build_headers(signature, timestamp, content_type)
+        headers = self._build_headers(signature, timestamp, content_type, recv_window)
         request = self._prepare_request(method, payload, headers)
-        response = self._send_request(request)
-        return self._process_response(response, method, payload)
+        if trace is not None:
+            trace.mark("prepare")
+        return request, payload
+
+    def _timestamp(self):
+        if self.clock is not None:
+            return self.clock.now_ms()
+        return int(time.time() * 10 ** 3)
+
+    def _recv_window_for(self, method):
+        if self._adaptive_recv_window and self.clock is not None:
+            return self.clock.recv_window(method.url, self._recv_window)
+        return self._recv_window
+
+    def _observe_server_time(self, method, response, body, timing, reset=False):
+        if self.clock is None or timing is None:
+            return
+        server_ms = server_time_ms(response.headers, body)
+        if server_ms is not None:
+            self.clock.observe(server_ms, timing[0], timing[1], key=method.url, reset=reset)
 
     def _validate_required_params(self, method, params):
         # Ensure all required parameters are passed
@@ -118,70 +387,65 @@ class P2PManager:
             if isinstance(params[i], float) and params[i] == int(params[i]):
                 params[i] = int(params[i])
 
-    def _handle_file_upload(self, method, params, timestamp):
+    def _handle_file_upload(self, method, params, timestamp, recv_window=None):
         filepath = params["upload_file"]
         boundary = "boundary-for-file"
         content_type = f"multipart/form-data; boundary={boundary}"
         filename = os.path.basename(str(filepath))
-        mime_type = "image/png"
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
         with open(filepath, "rb") as f:
             binary_data = f.read()
 
-        files = MultipartEncoder(
-            {
-                'upload_file': (
-                    filename,
-                    open(filepath, "rb"),
-                    mime_type
-                )
-            },
-            boundary=boundary
-        )
-
+        # The signed bytes are sent as-is, so the body is built exactly once
         payload = (
                       f"--{boundary}\r\n"
                       f"Content-Disposition: form-data; name=\"upload_file\"; filename=\"{filename}\"\r\nContent-Type: {mime_type}\r\n\r\n"
                   ).encode() + binary_data + f"\r\n--{boundary}--\r\n".encode()
-        signature = self._generate_sign_binary(payload, timestamp)
-        return files.to_string(), content_type, signature
+        signature = self._generate_sign_binary(payload, timestamp, recv_window)
+        return payload, content_type, signature
 
-    def _build_headers(self, signature, timestamp, content_type):
+    def _build_headers(self, signature, timestamp, content_type, recv_window=None):
         return {
             'X-BAPI-API-KEY': self._api_key,
             'X-BAPI-SIGN': signature,
             'X-BAPI-SIGN-TYPE': '2',
             'X-BAPI-TIMESTAMP': str(timestamp),
-            'X-BAPI-RECV-WINDOW': str(self._recv_window),
+            'X-BAPI-RECV-WINDOW': str(recv_window or self._recv_window),
             'Content-Type': content_type
         }
 
     def _prepare_request(self, method, payload, headers):
         endpoint = self._url + method.url
         if method.http_method == "GET":
-            return self.client.prepare_request(
-                requests.Request(
-                    method.http_method, endpoint + f"?{payload}" if payload != "" else "", headers=headers
-                )
-            )
-        else:
-            return self.client.prepare_request(
-                requests.Request(
-                    "POST", endpoint, data=payload, headers=headers
-                )
+            return TransportRequest(
+                "GET", endpoint + (f"?{payload}" if payload != "" else ""), headers
             )
+        body = payload if isinstance(payload, bytes) else payload.encode("utf-8")
+        return TransportRequest("POST", endpoint, headers, body)
 
     def _send_request(self, request):
-        try:
-            return self.client.send(request)
-        except (
-                requests.exceptions.ReadTimeout,
-                requests.exceptions.SSLError,
-                requests.exceptions.ConnectionError,
-        ) as e:
-            raise e
-
-    def _process_response(self, response, method, payload):
+        return self.transport.send(request)
+
+    def _log_extra(self, method, response, timing, ret_code=None):
+        return {
+            "method": method.name,
+            "endpoint": method.url,
+            "latency_ms": round((timing[1] - timing[0]) * 10 ** 3, 1) if timing else None,
+            "status": response.status_code,
+            "retCode": ret_code,
+        }
+
+    def _failed_request(self, method, payload, message, status_code, response):
+        return FailedRequestError(
+            request=f"{self._url + method.url}: {describe_payload(payload)}",
+            message=message,
+            status_code=status_code,
+            time=dt.now(timezone.utc).strftime("%H:%M:%S"),
+            resp_headers=response.headers,
+        )
+
+    def _process_response(self, response, method, payload, timing=None, reset_clock=False):
         # Handle HTTP error codes
         if response.status_code != 200:
             if response.status_code == 403:
@@ -192,49 +456,40 @@ class P2PManager:
                              "2) incorrect environment: Mainnet vs Testnet")
             else:
                 error_msg = f"HTTP status code is: {response.status_code}, expected: 200"
-                self.logger.error(f"{error_msg}")
-            raise FailedRequestError(
-                request=f"{self._url + method.url}: {payload}",
-                message=error_msg,
-                status_code=response.status_code,
-                time=dt.now(timezone.utc).strftime("%H:%M:%S"),
-                resp_headers=response.headers,
-            )
+                self.logger.error("HTTP status code is: %s, expected: 200", response.status_code,
+                                  extra=self._log_extra(method, response, timing))
+            raise self._failed_request(method, payload, error_msg, response.status_code, response)
 
         try:
             s_json = response.json()
         except JSONDecodeError:
-            self.logger.debug(f"Response text: {response.text}")
-            raise FailedRequestError(
-                request=f"{self._url + method.url}: {payload}",
-                message="Could not decode JSON.",
-                status_code=response.status_code,
-                time=dt.now(timezone.utc).strftime("%H:%M:%S"),
-                resp_headers=response.headers,
-            )
+            self.logger.debug("Response text: %s", response.text, extra=self._log_extra(method, response, timing))
+            raise self._failed_request(method, payload, "Could not decode JSON.", response.status_code, response)
+
+        self._observe_server_time(method, response, s_json, timing, reset_clock)
 
         ret_code = "retCode" if "retCode" in s_json else "ret_code"
         ret_msg = "retMsg" if "retMsg" in s_json else "ret_msg"
 
         if s_json[ret_code]:
-            error_msg = f"{s_json[ret_msg]} (ErrCode: {s_json[ret_code]})"
-            self.logger.error(f"{error_msg}")
-            raise FailedRequestError(
-                request=f"{self._url + method.url}: {payload}",
-                message=s_json[ret_msg],
-                status_code=s_json[ret_code],
-                time=dt.now(timezone.utc).strftime("%H:%M:%S"),
-                resp_headers=response.headers,
-            )
+            self.logger.error("%s (ErrCode: %s)", s_json[ret_msg], s_json[ret_code],
+                              extra=self._log_extra(method, response, timing, s_json[ret_code]))
+            raise self._failed_request(method, payload, s_json[ret_msg], s_json[ret_code], response)
 
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s %s OK", method.name, method.url, extra=self._log_extra(method, response, timing, 0))
         return s_json
 
-    def _generate_sign(self, payload, timestamp):
-        sign_string = str(timestamp) + self._api_key + str(self._recv_window) + payload
+    def _generate_sign(self, payload, timestamp, recv_window=None):
+        sign_string = str(timestamp) + self._api_key + str(recv_window or self._recv_window) + payload
+        if self._signer is not None:
+            return self._signer.sign(sign_string.encode("utf-8"))
         return P2PManager._sign(self._rsa, self._api_secret, sign_string)
 
-    def _generate_sign_binary(self, payload, timestamp):
-        sign_string = f"{timestamp}{self._api_key}{self._recv_window}".encode() + payload
+    def _generate_sign_binary(self, payload, timestamp, recv_window=None):
+        sign_string = f"{timestamp}{self._api_key}{recv_window or self._recv_window}".encode() + payload
+        if self._signer is not None:
+            return self._signer.sign(sign_string)
         return P2PManager._sign(self._rsa, self._api_secret, sign_string, True)
 
     # reference: https://github.com/bybit-exchange/pybit
@@ -334,22 +589,10 @@ class P2PManager:
             return hash.hexdigest()
 
         def generate_rsa():
-            hash = SHA256.new(param_str.encode("utf-8"))
-            encoded_signature = base64.b64encode(
-                PKCS1_v1_5.new(RSA.importKey(secret)).sign(
-                    hash
-                )
-            )
-            return encoded_signature.decode()
+            return _rsa_sign(secret, param_str.encode("utf-8"))
 
         def generate_rsa_binary():
-            hash = SHA256.new(param_str)
-            encoded_signature = base64.b64encode(
-                PKCS1_v1_5.new(RSA.importKey(secret)).sign(
-                    hash
-                )
-            )
-            return encoded_signature.decode()
+            return _rsa_sign(secret, param_str)
 
         if not use_rsa_authentication:
             if binary:
@@ -3,8 +3,18 @@ class P2PMethod:
             self,
             url,
             http_method,
-            required_params
+            required_params,
+            paginated=False
     ):
         self.url = url
         self.http_method = http_method
-        self.required_params = required_params
\ No newline at end of file
+        self.required_params = required_params
+        self.paginated = paginated
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        # P2PMethods.GET_ORDERS -> "GET_ORDERS"
+        self.name = name
+
+    def __repr__(self):
+        return f"P2PMethod({self.name or self.url})"
@@ -0,0 +1,295 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from ._p2p_compression import available_encodings, compress, negotiate
+
+STATUS_WAITING_PAYMENT = 10
+STATUS_PAID = 20
+
+# retCode of requests on orders that do not exist or are in the wrong state
+RET_CODE_ORDER_STATUS = 912100027
+RET_CODE_NOT_FOUND = 912100001
+
+
+class _Market:
+    """
+    In-memory orders, chats and ads behind MockP2PServer. Finished orders are replaced
+    by new ones, so the number of pending orders stays constant under load.
+    """
+
+    def __init__(self, orders, ads, seed=None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._next_id = 1000000000000000000
+        self.orders = {}
+        self.messages = {}
+        self.ads = {}
+        for _ in range(orders):
+            self._new_order()
+        for i in range(ads):
+            ad_id = str(2000000000000000000 + i)
+            self.ads[ad_id] = {
+                "id": ad_id, "tokenId": "USDT", "currencyId": "EUR", "side": i % 2,
+                "price": f"{0.9 + self._rng.random() * 0.1:.4f}", "minAmount": "10", "maxAmount": "1000",
+                "quantity": "1000", "lastQuantity": "1000", "status": 10, "payments": ["14"],
+            }
+
+    def _new_order(self):
+        self._next_id += 1
+        order_id = str(self._next_id)
+        price = 0.9 + self._rng.random() * 0.1
+        quantity = self._rng.randint(10, 1000)
+        self.orders[order_id] = {
+            "id": order_id, "side": self._rng.randint(0, 1), "tokenId": "USDT", "currencyId": "EUR",
+            "price": f"{price:.4f}", "quantity": str(quantity), "amount": f"{price * quantity:.2f}",
+            "status": STATUS_WAITING_PAYMENT, "createDate": str(int(time.time() * 1000)),
+            "targetNickName": f"user{self._rng.randint(1, 99999)}", "targetUserId": str(self._rng.randint(1, 10 ** 8)),
+        }
+        self.messages[order_id] = []
+        return order_id
+
+    def handle(self, path, params):
+        """
+        :return: (retCode, retMsg, result)
+        """
+
+        handler = _ROUTES.get(path)
+        if handler is None:
+            return None
+        with self._lock:
+            return handler(self, params)
+
+    def _page(self, items, params):
+        page, size = int(params.get("page", 1)), int(params.get("size", 10))
+        return 0, "SUCCESS", {"count": len(items), "items": items[(page - 1) * size:page * size]}
+
+    def _order(self, params):
+        return self.orders.get(str(params.get("orderId")))
+
+    def orders_list(self, params):
+        # Newest first, like the real API
+        return self._page(list(self.orders.values())[::-1], params)
+
+    def order_info(self, params):
+        order = self._order(params)
+        if order is None:
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        return 0, "SUCCESS", dict(order)
+
+    def mark_paid(self, params):
+        order = self._order(params)
+        if order is None or order["status"] != STATUS_WAITING_PAYMENT:
+            return RET_CODE_ORDER_STATUS, "Order status error", {}
+        order["status"] = STATUS_PAID
+        return 0, "SUCCESS", {}
+
+    def release(self, params):
+        order = self._order(params)
+        if order is None:
+            return RET_CODE_ORDER_STATUS, "Order status error", {}
+        # Finished orders leave the market; a new one keeps the pending count steady
+        del self.orders[order["id"]]
+        self.messages.pop(order["id"], None)
+        self._new_order()
+        return 0, "SUCCESS", {}
+
+    def chat_messages(self, params):
+        messages = self.messages.get(str(params.get("orderId")))
+        if messages is None:
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        return 0, "SUCCESS", {"result": messages[-int(params.get("size", 30)):][::-1]}
+
+    def send_message(self, params):
+        messages = self.messages.get(str(params.get("orderId")))
+        if messages is None:
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        messages.append({
+            "id": str(len(messages) + 1), "message": params.get("message"),
+            "contentType": params.get("contentType"), "createDate": str(int(time.time() * 1000)),
+        })
+        # Chats are bounded like the real ones
+        del messages[:-200]
+        return 0, "SUCCESS", {}
+
+    def update_ad(self, params):
+        ad = self.ads.get(str(params.get("id")))
+        if ad is None:
+            return RET_CODE_NOT_FOUND, "Ad does not exist", {}
+        for key in ("price", "minAmount", "maxAmount", "quantity", "remark"):
+            if key in params:
+                ad[key] = params[key]
+        return 0, "SUCCESS", {}
+
+    def my_ads(self, params):
+        return 0, "SUCCESS", {"count": len(self.ads), "items": list(self.ads.values())}
+
+    def online_ads(self, params):
+        side = str(params.get("side", "0"))
+        return self._page([a for a in self.ads.values() if str(a["side"]) == side], params)
+
+    def balance(self, params):
+        return 0, "SUCCESS", {"accountType": params.get("accountType", "FUND"), "balance": [
+            {"coin": "USDT", "walletBalance": "100000", "transferBalance": "100000"},
+        ]}
+
+    def server_time(self, params):
+        now = time.time()
+        return 0, "OK", {"timeSecond": str(int(now)), "timeNano": str(int(now * 1e9))}
+
+
+_ROUTES = {
+    "/v5/p2p/order/pending/simplifyList": _Market.orders_list,
+    "/v5/p2p/order/simplifyList": _Market.orders_list,
+    "/v5/p2p/order/info": _Market.order_info,
+    "/v5/p2p/order/pay": _Market.mark_paid,
+    "/v5/p2p/order/finish": _Market.release,
+    "/v5/p2p/order/message/listpage": _Market.chat_messages,
+    "/v5/p2p/order/message/send": _Market.send_message,
+    "/v5/p2p/item/update": _Market.update_ad,
+    "/v5/p2p/item/personal/list": _Market.my_ads,
+    "/v5/p2p/item/online": _Market.online_ads,
+    "/v5/asset/transfer/query-account-coins-balance": _Market.balance,
+    "/v5/market/time": _Market.server_time,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle the body waits for the
+    # client's delayed ACK of the headers, adding ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self._respond(url.path, dict(parse_qsl(url.query)))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            params = None
+        self._respond(urlsplit(self.path).path, params)
+
+    def _respond(self, path, params):
+        server = self.server.mock
+        server._count(path)
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.headers.get("X-BAPI-API-KEY") and path != "/v5/market/time":
+            return self._send(401, {"retCode": 10003, "retMsg": "API key is invalid."})
+        if server.error_rate and random.random() < server.error_rate:
+            return self._send(503, {"retCode": 10016, "retMsg": "Service unavailable"})
+        if params is None:
+            return self._send(200, {"retCode": 10001, "retMsg": "Invalid JSON", "result": {}})
+        answer = server.market.handle(path, params)
+        if answer is None:
+            return self._send(404, {"retCode": 10001, "retMsg": f"Unknown path {path}"})
+        ret_code, ret_msg, result = answer
+        self._send(200, {"retCode": ret_code, "retMsg": ret_msg, "result": result,
+                         "retExtInfo": {}, "time": int(time.time() * 1000)})
+
+    def _send(self, status, body):
+        payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        server = self.server.mock
+        encoding = None
+        if server.encodings and len(payload) >= server.compress_min_size:
+            encoding = negotiate(self.headers.get("Accept-Encoding"), server.encodings)
+        if encoding is not None:
+            payload = compress(payload, encoding)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of clients connect at once under load
+    request_queue_size = 1024
+
+
+class MockP2PServer:
+    """
+    Local HTTP server answering the P2P endpoints from an in-memory market: pending
+    orders that can be marked paid and released (released orders are replaced by new
+    ones), per-order chats, and ads that can be repriced. Signatures are not checked,
+    but an API key header is required. Point a client at it with
+    `P2P(testnet=False, api_key="x", api_secret="x", base_url=server.url)`.
+
+    :param host: Interface to listen on
+    :param port: Port, 0 for a free one
+    :param orders: Number of pending orders
+    :param ads: Number of ads
+    :param latency: Seconds added to every response
+    :param error_rate: Fraction of requests answered with HTTP 503
+    :param seed: Seed of generated orders and ads
+    :param encodings: Content codings offered to clients that accept them, in order of
+        preference, `available_encodings()` if None; () disables compression
+    :param compress_min_size: Bodies smaller than this many bytes are not compressed
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, orders=100, ads=20, latency=0.0, error_rate=0.0, seed=None,
+                 encodings=None, compress_min_size=256):
+        self.market = _Market(orders, ads, seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.encodings = available_encodings() if encodings is None else tuple(encodings)
+        self.compress_min_size = compress_min_size
+        self._counts = {}
+        self._counts_lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, path):
+        with self._counts_lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+
+    def request_counts(self):
+        """
+        :return: Dictionary {path: requests received}
+        """
+
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="bybit-p2p-mock-server",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,378 @@
+import collections
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# What happens to an event published to a full queue
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_MERGE = "merge"
+
+_logger = logging.getLogger(__name__)
+
+
+class Destination:
+    """
+    Receiver of event batches. `send` raises to have the batch retried.
+    """
+
+    name = "destination"
+
+    def send(self, events):
+        """
+        :param events: List of event dictionaries {"kind", "key", "data", "ts"}
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CallableDestination(Destination):
+    """
+    Hands batches to `func(events)`, e.g. a chat bot client.
+    """
+
+    def __init__(self, func, name=None):
+        self._func = func
+        self.name = name or getattr(func, "__name__", "callable")
+
+    def send(self, events):
+        self._func(events)
+
+
+class WebhookDestination(Destination):
+    """
+    POSTs batches as JSON to a URL. Non-2xx responses raise, so the batch is retried.
+
+    :param url: Webhook URL
+    :param headers: Extra request headers
+    :param format: `format(events)` returning the JSON-serializable body,
+        {"events": events} if None
+    :param transport: Transport used to send, a RequestsTransport of its own if None,
+        so deliveries never share connections with API requests
+    :param timeout: Seconds per delivery attempt
+    """
+
+    def __init__(self, url, headers=None, format=None, transport=None, timeout=10.0, name=None):
+        self.url = url
+        self.name = name or url
+        self._headers = dict(headers or {})
+        self._headers.setdefault("Content-Type", "application/json")
+        self._format = format
+        self._transport = transport
+        self._timeout = timeout
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            from ._p2p_transport import RequestsTransport
+
+            self._transport = RequestsTransport(timeout=self._timeout, compress=False)
+        return self._transport
+
+    def send(self, events):
+        from ._p2p_transport import TransportRequest
+
+        body = self._format(events) if self._format is not None else {"events": events}
+        data = json.dumps(body, separators=(",", ":"), default=str).encode("utf-8")
+        response = self.transport.send(TransportRequest("POST", self.url, dict(self._headers), data))
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"Webhook {self.url} answered HTTP {response.status_code}")
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+
+class _Route:
+    """
+    Queue, policy and counters of one destination.
+    """
+
+    def __init__(self, destination, kinds, max_queue, batch_size, max_delay, policy, dedupe_ttl, retries):
+        self.destination = destination
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.policy = policy
+        self.dedupe_ttl = dedupe_ttl
+        self.retries = retries
+        # key -> event, in arrival order; keyless events get a unique key
+        self.queue = collections.OrderedDict()
+        self.first_queued = None
+        self.merged = {}
+        self.sent_keys = collections.OrderedDict()
+        self.inflight = False
+        # Failed batch waiting for its retry at `retry_at`, and retries made so far
+        self.pending = None
+        self.retry_at = None
+        self.attempts = 0
+        self.counts = {"published": 0, "deduplicated": 0, "dropped": 0, "merged": 0,
+                       "sent": 0, "failed": 0, "batches": 0}
+
+    def accepts(self, kind):
+        return self.kinds is None or kind in self.kinds
+
+    def due(self, now):
+        if self.inflight:
+            return False
+        if self.pending is not None:
+            return now >= self.retry_at
+        if not self.queue:
+            return bool(self.merged)
+        return len(self.queue) >= self.batch_size or now - self.first_queued >= self.max_delay
+
+    def remember(self, events, now):
+        # Keys sent or in flight and their data, oldest first, bounded in count and age
+        if self.dedupe_ttl <= 0:
+            return
+        for event in events:
+            if event["key"] is not None:
+                slot = (event["kind"], event["key"])
+                self.sent_keys.pop(slot, None)
+                self.sent_keys[slot] = (event["data"], now)
+        limit = 10 * self.max_queue
+        while self.sent_keys:
+            slot, (_, sent_at) = next(iter(self.sent_keys.items()))
+            if len(self.sent_keys) <= limit and now - sent_at < self.dedupe_ttl:
+                break
+            del self.sent_keys[slot]
+
+    def forget(self, events):
+        # Undo `remember` for a batch that was never delivered
+        for event in events:
+            if event["key"] is not None:
+                slot = (event["kind"], event["key"])
+                sent = self.sent_keys.get(slot)
+                if sent is not None and sent[0] is event["data"]:
+                    del self.sent_keys[slot]
+
+
+class NotificationDispatcher:
+    """
+    Delivers events (new orders, chat messages, ...) to webhooks and chat bots off the
+    polling thread.
+
+    `publish` only appends to in-memory queues and never blocks or raises because of a
+    destination. Each destination has a bounded queue; events are batched (up to
+    `batch_size`, or whatever is queued after `max_delay` seconds) and sent from a
+    worker pool, one batch at a time per destination, so events arrive in order.
+    Events with a key are deduplicated per destination: a queued event is replaced by
+    a newer one with the same key, and an event identical to one sent (or being sent)
+    with that key within `dedupe_ttl` seconds is skipped, so re-polling the same
+    pending orders does not repeat alerts. When a queue is full, the destination's policy drops the newest
+    event (POLICY_DROP_NEWEST), the oldest one (POLICY_DROP_OLDEST), or drops the
+    oldest and reports the dropped events as one "merged" summary event per kind in
+    the next batch (POLICY_MERGE). Failed batches are retried with backoff, then
+    counted as failed and their keys forgotten. Retries are scheduled by the
+    dispatcher thread, so a failing destination does not hold a worker between
+    attempts.
+
+    :param max_workers: Batches sent at the same time, across destinations
+    """
+
+    def __init__(self, max_workers=4):
+        self._routes = []
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bybit-p2p-notify")
+        self._closed = False
+        self._seq = 0
+        self._thread = threading.Thread(target=self._run, name="bybit-p2p-notify-dispatcher", daemon=True)
+        self._thread.start()
+
+    def add_destination(self, destination, kinds=None, max_queue=1000, batch_size=20, max_delay=1.0,
+                        policy=POLICY_DROP_OLDEST, dedupe_ttl=600.0, retries=3):
+        """
+        :param destination: Destination, or a callable taking a list of events
+        :param kinds: Event kinds delivered to this destination, all if None
+        :param max_queue: Events queued at most
+        :param batch_size: Events per batch at most
+        :param max_delay: Seconds an event waits for a batch to fill
+        :param policy: POLICY_DROP_OLDEST, POLICY_DROP_NEWEST or POLICY_MERGE
+        :param dedupe_ttl: Seconds a sent key is remembered, 0 to only merge queued events
+        :param retries: Attempts after the first failed one
+        :return: The destination
+        """
+
+        if policy not in (POLICY_DROP_NEWEST, POLICY_DROP_OLDEST, POLICY_MERGE):
+            raise ValueError(f"Unknown policy: {policy}")
+        if not isinstance(destination, Destination):
+            destination = CallableDestination(destination)
+        with self._cond:
+            self._routes.append(_Route(destination, kinds, max_queue, batch_size, max_delay, policy,
+                                       dedupe_ttl, retries))
+        return destination
+
+    def publish(self, kind, data, key=None):
+        """
+        Queue an event for every destination interested in `kind`.
+
+        :param kind: Event kind, e.g. "order" or "chat_message"
+        :param data: JSON-serializable payload
+        :param key: Deduplication key, e.g. the order id and status; None to never deduplicate
+        :return: Number of destinations the event was queued for
+        """
+
+        now = time.time()
+        queued = 0
+        with self._cond:
+            if self._closed:
+                return 0
+            for route in self._routes:
+                if route.accepts(kind) and self._enqueue(route, kind, data, key, now):
+                    queued += 1
+            if queued:
+                self._cond.notify()
+        return queued
+
+    def _enqueue(self, route, kind, data, key, now):
+        route.counts["published"] += 1
+        event = {"kind": kind, "key": key, "data": data, "ts": now}
+        if key is None:
+            self._seq += 1
+            slot = (None, self._seq)
+        else:
+            slot = (kind, key)
+            sent = route.sent_keys.get(slot)
+            if sent is not None and sent[0] == data and now - sent[1] < route.dedupe_ttl:
+                route.counts["deduplicated"] += 1
+                return False
+            if slot in route.queue:
+                # Latest data wins, the event keeps its place
+                route.queue[slot] = event
+                route.counts["deduplicated"] += 1
+                return True
+
+        if len(route.queue) >= route.max_queue:
+            route.counts["dropped"] += 1
+            if route.policy == POLICY_DROP_NEWEST:
+                return False
+            _, oldest = route.queue.popitem(last=False)
+            if route.policy == POLICY_MERGE:
+                route.merged[oldest["kind"]] = route.merged.get(oldest["kind"], 0) + 1
+        if not route.queue:
+            route.first_queued = now
+        route.queue[slot] = event
+        return True
+
+    def publish_orders(self, response, kind="order"):
+        """
+        Publish every order of a `get_orders`/`get_pending_orders` response, keyed by
+        order id and status, so an order is announced again only when its status
+        changes. Usable as a PollingScheduler callback.
+        """
+
+        for order in response.get("result", {}).get("items") or []:
+            self.publish(kind, order, key=f"{order.get('id')}:{order.get('status')}")
+
+    def publish_messages(self, order_id, response, kind="chat_message"):
+        """
+        Publish every message of a `get_chat_messages` response, keyed by message id.
+        """
+
+        result = response.get("result") or {}
+        messages = result.get("result") if isinstance(result, dict) else result
+        for message in messages or []:
+            self.publish(kind, dict(message, orderId=order_id), key=f"{order_id}:{message.get('id')}")
+
+    def stats(self):
+        """
+        :return: Dictionary {destination name: counts and queue length}
+        """
+
+        with self._cond:
+            return {route.destination.name: dict(route.counts, queued=len(route.queue)) for route in self._routes}
+
+    def flush(self, timeout=None):
+        """
+        Send everything queued now and wait for the deliveries.
+
+        :return: True if all queues drained within `timeout`
+        """
+
+        with self._cond:
+            for route in self._routes:
+                if route.queue:
+                    route.first_queued = float("-inf")
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: all(
+                not (r.queue or r.merged or r.inflight or r.pending is not None) for r in self._routes), timeout)
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        for route in self._routes:
+            route.destination.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _take_batch(self, route):
+        route.inflight = True
+        if route.pending is not None:
+            batch, route.pending = route.pending, None
+            return batch
+        batch = []
+        while route.queue and len(batch) < route.batch_size:
+            batch.append(route.queue.popitem(last=False)[1])
+        for kind, count in route.merged.items():
+            batch.append({"kind": kind, "key": None, "data": {"merged": count}, "ts": time.time()})
+            route.counts["merged"] += count
+        route.merged = {}
+        route.first_queued = time.time() if route.queue else None
+        # Keys count as sent from now on, so re-polls during delivery are not queued again
+        route.remember(batch, time.time())
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    ready = [r for r in self._routes if r.due(now)]
+                    if ready or self._closed:
+                        break
+                    waiting = [r.retry_at if r.pending is not None else r.first_queued + r.max_delay
+                               for r in self._routes if (r.queue or r.pending is not None) and not r.inflight]
+                    self._cond.wait(max(0.0, min(waiting) - now) if waiting else None)
+                if not ready:
+                    return
+                batches = [(route, self._take_batch(route)) for route in ready]
+            for route, batch in batches:
+                self._executor.submit(self._deliver, route, batch)
+
+    def _deliver(self, route, batch):
+        error = None
+        try:
+            route.destination.send(batch)
+        except Exception as e:
+            error = e
+        with self._cond:
+            route.inflight = False
+            if error is not None and route.attempts < route.retries:
+                # Back to the dispatcher thread, which sends it again once `retry_at` passes
+                route.pending = batch
+                route.retry_at = time.time() + min(0.5 * 2 ** route.attempts, 10.0)
+                route.attempts += 1
+            else:
+                route.attempts = 0
+                route.counts["batches"] += 1
+                if error is None:
+                    route.counts["sent"] += len(batch)
+                else:
+                    _logger.warning("Dropping %d events for %s: %s", len(batch), route.destination.name, error)
+                    route.counts["failed"] += len(batch)
+                    route.forget(batch)
+            self._cond.notify_all()
@@ -0,0 +1,382 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from ._p2p_pagination import iter_items
+
+# File layout (little-endian):
+#   file header:  b"BP2PBOOK" + uint16 version
+#   chunk header: b"SNAP" + int64 ts_ms + uint32 rows + uint16 key_len + uint32 body_len + uint32 crc32
+#   chunk key:    utf-8 "tokenId/currencyId/side"
+#   chunk body:   zlib-compressed columns, numeric columns first, then string columns
+# Chunks are only ever appended. Timestamps and keys live in the uncompressed chunk
+# header, so a reader can index a memory-mapped file without decompressing anything.
+_FILE_MAGIC = b"BP2PBOOK"
+_FILE_VERSION = 1
+_FILE_HEADER = struct.Struct("<8sH")
+_CHUNK_MAGIC = b"SNAP"
+_CHUNK_HEADER = struct.Struct("<4sqIHII")
+_STR_LEN = struct.Struct("<I")
+
+NUMERIC_COLUMNS = ("price", "lastQuantity", "minAmount", "maxAmount", "recentExecuteRate")
+STRING_COLUMNS = ("id", "userId", "nickName", "payments")
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def book_key(token_id, currency_id, side):
+    return f"{token_id}/{currency_id}/{side}"
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _format_number(value):
+    if value != value:  # NaN
+        return ""
+    return repr(int(value)) if value.is_integer() else repr(value)
+
+
+def _encode_strings(values):
+    data = "\x00".join(values).encode("utf-8")
+    return _STR_LEN.pack(len(data)) + data
+
+
+def _encode_columns(items):
+    parts = []
+    for column in NUMERIC_COLUMNS:
+        values = array("d", (_to_float(item.get(column)) for item in items))
+        if not _LITTLE_ENDIAN:
+            values.byteswap()
+        parts.append(values.tobytes())
+    for column in STRING_COLUMNS:
+        if column == "payments":
+            values = [",".join(str(p) for p in item.get(column) or []) for item in items]
+        else:
+            values = [str(item.get(column, "")) for item in items]
+        parts.append(_encode_strings(values))
+    return b"".join(parts)
+
+
+def _decode_columns(raw, rows):
+    columns = {}
+    offset = 0
+    width = rows * 8
+    for column in NUMERIC_COLUMNS:
+        values = array("d")
+        values.frombytes(raw[offset:offset + width])
+        if not _LITTLE_ENDIAN:
+            values.byteswap()
+        columns[column] = values
+        offset += width
+    for column in STRING_COLUMNS:
+        (length,) = _STR_LEN.unpack_from(raw, offset)
+        offset += _STR_LEN.size
+        text = bytes(raw[offset:offset + length]).decode("utf-8")
+        offset += length
+        columns[column] = text.split("\x00") if rows else []
+    return columns
+
+
+class BookSnapshot:
+    """
+    One recorded page set of online ads for a token/currency/side at a point in time.
+    Columns are decoded lazily; `items` rebuilds API-shaped ad dictionaries.
+    """
+
+    def __init__(self, ts, key, rows, body):
+        self.ts = ts
+        self.key = key
+        self.rows = rows
+        self.token_id, self.currency_id, self.side = key.split("/")
+        self._body = body
+        self._columns = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = _decode_columns(zlib.decompress(self._body), self.rows)
+            self._body = None
+        return self._columns
+
+    @property
+    def items(self):
+        columns = self.columns
+        items = []
+        for i in range(self.rows):
+            item = {
+                "tokenId": self.token_id,
+                "currencyId": self.currency_id,
+                "side": int(self.side) if self.side.isdigit() else self.side,
+            }
+            for column in NUMERIC_COLUMNS:
+                item[column] = _format_number(columns[column][i])
+            for column in STRING_COLUMNS:
+                item[column] = columns[column][i]
+            item["payments"] = item["payments"].split(",") if item["payments"] else []
+            items.append(item)
+        return items
+
+    def as_response(self):
+        """
+        Shape the snapshot like a `get_online_ads` response.
+
+        :return: Response dictionary
+        """
+
+        return {
+            "retCode": 0,
+            "retMsg": "SUCCESS",
+            "result": {"count": self.rows, "items": self.items},
+            "time": self.ts,
+        }
+
+
+def _check_header(mm, path):
+    magic, version = _FILE_HEADER.unpack_from(mm, 0)
+    if magic != _FILE_MAGIC or version != _FILE_VERSION:
+        raise ValueError(f"Not an order book snapshot file: {path}")
+
+
+def _valid_length(path):
+    """
+    :return: Bytes of a snapshot file up to the end of its last complete chunk,
+        0 if not even the file header is complete
+    """
+
+    size = os.path.getsize(path)
+    if size < _FILE_HEADER.size:
+        return 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _check_header(mm, path)
+        offset = _FILE_HEADER.size
+        while offset + _CHUNK_HEADER.size <= size:
+            magic, _, _, key_len, body_len, crc = _CHUNK_HEADER.unpack_from(mm, offset)
+            body_start = offset + _CHUNK_HEADER.size + key_len
+            body_end = body_start + body_len
+            if magic != _CHUNK_MAGIC or body_end > size or zlib.crc32(mm[body_start:body_end]) != crc:
+                break
+            offset = body_end
+        return offset
+
+
+class OrderBookWriter:
+    """
+    Append-only writer for order book snapshot files.
+
+    An existing file is truncated back to its last complete chunk on open, so a chunk
+    torn by a crash does not hide the snapshots appended after it.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            length = _valid_length(path)
+            self._file = open(path, "r+b")
+            self._file.truncate(length)
+            self._file.seek(length)
+        else:
+            self._file = open(path, "wb")
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(_FILE_MAGIC, _FILE_VERSION))
+            self._file.flush()
+
+    def append(self, key, items, ts=None):
+        ts = int(time.time() * 10 ** 3) if ts is None else int(ts)
+        body = zlib.compress(_encode_columns(items), 6)
+        encoded_key = key.encode("utf-8")
+        header = _CHUNK_HEADER.pack(
+            _CHUNK_MAGIC, ts, len(items), len(encoded_key), len(body), zlib.crc32(body)
+        )
+        with self._lock:
+            self._file.write(header + encoded_key + body)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshots(path, key=None, start=None, end=None):
+    """
+    Iterate over the snapshots of a file, oldest first. A partially written trailing
+    chunk (e.g. after a crash) is ignored; the next OrderBookWriter opened on the file
+    truncates it away.
+
+    :param path: Snapshot file path
+    :param key: Only yield snapshots of this book, see `book_key`
+    :param start: Only yield snapshots at or after this timestamp (ms)
+    :param end: Only yield snapshots at or before this timestamp (ms)
+    :return: Generator of BookSnapshot
+    """
+
+    if os.path.getsize(path) <= _FILE_HEADER.size:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _check_header(mm, path)
+        offset = _FILE_HEADER.size
+        size = len(mm)
+        while offset + _CHUNK_HEADER.size <= size:
+            magic, ts, rows, key_len, body_len, crc = _CHUNK_HEADER.unpack_from(mm, offset)
+            body_start = offset + _CHUNK_HEADER.size + key_len
+            body_end = body_start + body_len
+            if magic != _CHUNK_MAGIC or body_end > size:
+                return
+            if (start is None or ts >= start) and (end is None or ts <= end):
+                chunk_key = mm[offset + _CHUNK_HEADER.size:body_start].decode("utf-8")
+                if key is None or chunk_key == key:
+                    body = mm[body_start:body_end]
+                    if zlib.crc32(body) != crc:
+                        return
+                    yield BookSnapshot(ts, chunk_key, rows, body)
+            offset = body_end
+
+
+class OrderBookRecorder:
+    """
+    Periodically snapshots `get_online_ads` for a set of books into a snapshot file.
+
+    :param api: P2P client
+    :param path: Snapshot file path, appended to if it exists
+    :param books: Iterable of (tokenId, currencyId, side)
+    :param interval: Seconds between snapshots
+    :param max_pages: Max pages of ads fetched per book and snapshot
+    :param page_size: Rows per page
+    """
+
+    def __init__(self, api, path, books, interval=10.0, max_pages=5, page_size=50):
+        self._api = api
+        self._books = [tuple(str(v) for v in book) for book in books]
+        self._interval = interval
+        self._max_items = max_pages * page_size
+        self._page_size = page_size
+        self._writer = OrderBookWriter(path)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record_once(self):
+        """
+        Snapshot every book once.
+
+        :return: Number of snapshots written
+        """
+
+        written = 0
+        for token_id, currency_id, side in self._books:
+            try:
+                items = []
+                for item in iter_items(self._api.get_online_ads, page_size=self._page_size,
+                                       tokenId=token_id, currencyId=currency_id, side=side):
+                    items.append(item)
+                    if len(items) >= self._max_items:
+                        break
+            except Exception as e:
+                self._api.logger.warning("Order book snapshot failed for %s/%s/%s: %s",
+                                         token_id, currency_id, side, e)
+                continue
+            self._writer.append(book_key(token_id, currency_id, side), items)
+            written += 1
+        return written
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bybit-p2p-recorder", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._writer.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.record_once()
+            self._stop.wait(max(0.0, self._interval - (time.monotonic() - started)))
+
+
+class OrderBookReplay:
+    """
+    Replays recorded snapshots through the `get_online_ads` interface.
+
+    The replay object stands in for a P2P client: strategy code that calls
+    `api.get_online_ads(tokenId=..., currencyId=..., side=...)` gets the latest
+    snapshot at or before the replay clock (`now`, in ms).
+
+    :param path: Snapshot file path
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self.now = None
+        self._latest = {}
+
+    def get_online_ads(self, **kwargs):
+        """
+        Online advertisements list, as of the replay clock.
+
+        :key tokenId: Token ID, like USDT, ETH, BTC
+        :key currencyId: Currency ID, like RUB, USD, EUR
+        :key side: 0 - buy, 1 - sell
+        :key page: Page number
+        :key size: Rows per page
+        :return: Response dictionary
+        """
+
+        key = book_key(kwargs["tokenId"], kwargs["currencyId"], kwargs["side"])
+        snapshot = self._latest.get(key)
+        if snapshot is None:
+            return {"retCode": 0, "retMsg": "SUCCESS", "result": {"count": 0, "items": []}, "time": self.now}
+        response = snapshot.as_response()
+        if "page" in kwargs or "size" in kwargs:
+            size = int(kwargs.get("size", 10))
+            first = (int(kwargs.get("page", 1)) - 1) * size
+            response["result"]["items"] = response["result"]["items"][first:first + size]
+        return response
+
+    def run(self, callback, speed=None, key=None, start=None, end=None):
+        """
+        Step the replay clock through every snapshot and call `callback(self, snapshot)`.
+
+        :param callback: Strategy hook, receives this replay object and the new snapshot
+        :param speed: Replay speed relative to real time (e.g. 3600 for an hour per
+            second); None replays as fast as possible
+        :param key: Only replay this book, see `book_key`
+        :param start: First timestamp (ms) to replay
+        :param end: Last timestamp (ms) to replay
+        :return: Number of snapshots replayed
+        """
+
+        count = 0
+        wall_start = time.monotonic()
+        first_ts = None
+        for snapshot in read_snapshots(self._path, key=key, start=start, end=end):
+            if speed:
+                first_ts = snapshot.ts if first_ts is None else first_ts
+                delay = (snapshot.ts - first_ts) / 1000 / speed - (time.monotonic() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.now = snapshot.ts
+            self._latest[snapshot.key] = snapshot
+            callback(self, snapshot)
+            count += 1
+        return count
@@ -0,0 +1,45 @@
+DEFAULT_PAGE_SIZE = 50
+
+
+def iter_pages(fetch, page_size=DEFAULT_PAGE_SIZE, start_page=1, **params):
+    """
+    Iterate over the `result` of every page of a paginated endpoint.
+
+    Pages are requested lazily, one at a time, until a page comes back short or empty,
+    or the reported `count` has been reached.
+
+    :param fetch: Bound request method, e.g. `api.get_orders`
+    :param page_size: Rows per page
+    :param start_page: First page number to request
+    :param params: Extra request parameters
+    :return: Generator of (page number, result dictionary)
+    """
+
+    page = start_page
+    seen = (start_page - 1) * page_size
+    while True:
+        response = fetch(page=page, size=page_size, **params)
+        result = response.get("result") or {}
+        items = result.get("items") or []
+        yield page, result
+
+        seen += len(items)
+        count = result.get("count")
+        if len(items) < page_size or (count is not None and seen >= int(count)):
+            return
+        page += 1
+
+
+def iter_items(fetch, page_size=DEFAULT_PAGE_SIZE, start_page=1, **params):
+    """
+    Iterate over the individual `items` of a paginated endpoint.
+
+    :param fetch: Bound request method, e.g. `api.get_orders`
+    :param page_size: Rows per page
+    :param start_page: First page number to request
+    :param params: Extra request parameters
+    :return: Generator of item dictionaries
+    """
+
+    for _, result in iter_pages(fetch, page_size, start_page, **params):
+        yield from result.get("items") or []
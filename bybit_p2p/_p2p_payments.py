@@ -0,0 +1,184 @@
+import threading
+import time
+
+
+def _fold(value):
+    return str(value).strip().casefold() if value not in (None, "") else None
+
+
+class PaymentMethodIndex:
+    """
+    The user's payment methods from `get_user_payment_types`, indexed for lookups.
+
+    The list is fetched once and refreshed lazily when older than `ttl` seconds. Payment
+    methods are indexed by ID, payment type, bank name and currency. The API does not
+    say which currencies a payment method serves, so currencies come from a `currencyId`
+    field when one is present, from `add_currency()`, or from `learn_from_ads()` with
+    the user's own ads.
+
+    :param api: P2P client
+    :param ttl: Seconds before the list is fetched again, None to never refresh
+    """
+
+    def __init__(self, api, ttl=300):
+        self._api = api
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._by_id = {}
+        self._by_type = {}
+        self._by_bank = {}
+        self._by_currency = {}
+        self._type_currencies = {}
+
+    def refresh(self):
+        """
+        Fetch the payment methods and rebuild the index.
+        """
+
+        response = self._api.get_user_payment_types()
+        rows = response.get("result") or []
+        if isinstance(rows, dict):
+            rows = rows.get("items") or []
+
+        by_id, by_type, by_bank, currencies = {}, {}, {}, []
+        for row in rows:
+            payment_id = str(row.get("id"))
+            by_id[payment_id] = row
+            by_type.setdefault(str(row.get("paymentType")), []).append(row)
+            bank = _fold(row.get("bankName"))
+            if bank:
+                by_bank.setdefault(bank, []).append(row)
+            if row.get("currencyId"):
+                currencies.append((str(row.get("paymentType")), row["currencyId"]))
+
+        with self._lock:
+            self._by_id, self._by_type, self._by_bank = by_id, by_type, by_bank
+            for payment_type, currency in currencies:
+                self._type_currencies.setdefault(payment_type, set()).add(currency)
+            self._rebuild_currencies()
+            self._loaded_at = time.monotonic()
+
+    def _rebuild_currencies(self):
+        by_currency = {}
+        for payment_type, currencies in self._type_currencies.items():
+            for row in self._by_type.get(payment_type, ()):
+                for currency in currencies:
+                    by_currency.setdefault(currency, []).append(row)
+        self._by_currency = by_currency
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.ttl is not None and time.monotonic() - loaded_at > self.ttl):
+            self.refresh()
+
+    def add_currency(self, payment_type, *currencies):
+        """
+        Declare that a payment type serves the given currencies.
+
+        :param payment_type: Payment type, e.g. "14"
+        :param currencies: Currency IDs, like RUB, USD, EUR
+        """
+
+        with self._lock:
+            self._type_currencies.setdefault(str(payment_type), set()).update(currencies)
+            self._rebuild_currencies()
+
+    def learn_from_ads(self, ads):
+        """
+        Learn currencies from the user's own ads (`get_ads_list` items), whose
+        `paymentTerms` list the payment methods used for the ad's `currencyId`.
+
+        :param ads: Iterable of ad dictionaries
+        """
+
+        with self._lock:
+            for ad in ads:
+                currency = ad.get("currencyId")
+                if not currency:
+                    continue
+                for term in ad.get("paymentTerms") or ():
+                    self._type_currencies.setdefault(str(term.get("paymentType")), set()).add(currency)
+            self._rebuild_currencies()
+
+    def get(self, payment_id):
+        """
+        :param payment_id: Payment method ID
+        :return: Payment method dictionary or None
+        """
+
+        self._ensure_loaded()
+        return self._by_id.get(str(payment_id))
+
+    def by_type(self, payment_type):
+        self._ensure_loaded()
+        return list(self._by_type.get(str(payment_type), ()))
+
+    def by_bank(self, bank_name):
+        self._ensure_loaded()
+        return list(self._by_bank.get(_fold(bank_name), ()))
+
+    def by_currency(self, currency_id):
+        self._ensure_loaded()
+        return list(self._by_currency.get(currency_id, ()))
+
+    def payment_ids(self, payment_types=None, currency_id=None, bank_name=None):
+        """
+        IDs of the payment methods matching all given filters, for the `paymentIds`
+        parameter of `post_new_ad`/`update_ad`.
+
+        :param payment_types: Iterable of payment types
+        :param currency_id: Currency ID
+        :param bank_name: Bank name, case-insensitive
+        :return: List of payment method IDs
+        """
+
+        self._ensure_loaded()
+        if payment_types is not None:
+            rows = [row for t in payment_types for row in self._by_type.get(str(t), ())]
+        elif currency_id is not None:
+            rows = self._by_currency.get(currency_id, ())
+        elif bank_name is not None:
+            rows = self._by_bank.get(_fold(bank_name), ())
+        else:
+            rows = self._by_id.values()
+
+        if currency_id is not None:
+            allowed = {str(row.get("id")) for row in self._by_currency.get(currency_id, ())}
+        ids = []
+        for row in rows:
+            if currency_id is not None and str(row.get("id")) not in allowed:
+                continue
+            if bank_name is not None and _fold(row.get("bankName")) != _fold(bank_name):
+                continue
+            ids.append(str(row.get("id")))
+        return ids
+
+    def resolve(self, order, preferred_types=None):
+        """
+        Pick the seller's payment term to pay with, as `mark_as_paid` parameters.
+
+        Terms are matched against `preferred_types` in order, or against the payment
+        types the user has when None. The first term of the order is used otherwise.
+
+        :param order: Order dictionary (`get_order_details` result) with `paymentTermList`
+        :param preferred_types: Iterable of payment types, most preferred first
+        :return: Dictionary with `paymentType` and `paymentId`, or None if the order has no terms
+        """
+
+        terms = {}
+        for term in order.get("paymentTermList") or ():
+            terms.setdefault(str(term.get("paymentType")), term)
+        if not terms:
+            return None
+
+        if preferred_types is None:
+            self._ensure_loaded()
+            preferred_types = self._by_type
+        for payment_type in preferred_types:
+            term = terms.get(str(payment_type))
+            if term is not None:
+                break
+        else:
+            term = next(iter(terms.values()))
+        return {"paymentType": str(term.get("paymentType")), "paymentId": str(term.get("id"))}
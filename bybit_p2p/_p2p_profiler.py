@@ -0,0 +1,257 @@
+import random
+import threading
+import time
+
+# Phases of a request, in order; see P2PManager.http_req_handler
+PHASES = ("validate", "rate_limit", "payload", "sign", "prepare", "network", "decode")
+
+# cProfile hooks the whole process (only one profiler may be active from Python 3.12),
+# so at most one request at a time runs under it
+_cprofile_lock = threading.Lock()
+
+
+class _PhaseStats:
+    __slots__ = ("count", "wall", "wall_max", "cpu", "memory")
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.wall_max = 0.0
+        self.cpu = 0.0
+        self.memory = 0
+
+    def add(self, wall, cpu, memory):
+        self.count += 1
+        self.wall += wall
+        self.wall_max = max(self.wall_max, wall)
+        self.cpu += cpu
+        self.memory += memory
+
+
+class _Trace:
+    """
+    Timings of one sampled request. `mark(phase)` closes the phase that started at
+    the previous mark.
+    """
+
+    __slots__ = ("profiler", "method_name", "phases", "_wall", "_cpu", "_memory", "_cprofile")
+
+    def __init__(self, profiler, method_name):
+        self.profiler = profiler
+        self.method_name = method_name
+        self.phases = []
+        self._cprofile = None
+        if profiler.cprofile and _cprofile_lock.acquire(blocking=False):
+            self._start_cprofile()
+        self._memory = self._traced_memory()
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+
+    def _start_cprofile(self):
+        import cProfile
+
+        try:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        except Exception:
+            # Another profiling tool is active; time this request without cProfile
+            self._cprofile = None
+            _cprofile_lock.release()
+
+    def _stop_cprofile(self):
+        if self._cprofile is None:
+            return
+        try:
+            self._cprofile.disable()
+        except Exception:
+            self._cprofile = None
+        finally:
+            _cprofile_lock.release()
+
+    def _traced_memory(self):
+        if not self.profiler.memory:
+            return 0
+        import tracemalloc
+
+        return tracemalloc.get_traced_memory()[0]
+
+    def mark(self, phase):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        memory = self._traced_memory()
+        self.phases.append((phase, wall - self._wall, cpu - self._cpu, memory - self._memory))
+        self._wall, self._cpu, self._memory = wall, cpu, memory
+
+    def finish(self):
+        self._stop_cprofile()
+        self.profiler._record(self)
+
+    def cancel(self):
+        """
+        Drop the trace of a request that failed before it was sent.
+        """
+
+        self._stop_cprofile()
+
+
+class Profiler:
+    """
+    Samples requests and measures where their time and memory go.
+
+    Attach it with `P2P(profiler=...)` or `api.profiler = ...`, and switch it with
+    `enable()`/`disable()` at runtime. A sampled request is split into phases
+    (validation, rate limiting, payload casting/JSON, signing, request preparation,
+    network, response decoding); wall time, thread CPU time and, with `memory`, the
+    net change of traced memory are aggregated per phase and per P2P method. With
+    `cprofile`, sampled requests also run under cProfile, one request at a time: a
+    request sampled while another is under cProfile is only timed.
+
+    Without a profiler attached a request pays one attribute check, and a disabled
+    profiler one method call.
+
+    :param sample_rate: Fraction of requests profiled, 0.0 to 1.0
+    :param memory: Track memory with tracemalloc (started on `enable()` if needed)
+    :param cprofile: Run sampled requests under cProfile
+    :param enabled: Start enabled
+    """
+
+    def __init__(self, sample_rate=1.0, memory=False, cprofile=False, enabled=True):
+        self.sample_rate = sample_rate
+        self.memory = memory
+        self.cprofile = cprofile
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._pstats = {}
+        self._started_tracemalloc = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if self.memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracemalloc:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._pstats = {}
+
+    def start(self, method):
+        """
+        Begin a trace for a request, if it is sampled.
+
+        :param method: P2PMethod
+        :return: Trace, or None when the request is not profiled
+        """
+
+        if not self.enabled or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return None
+        return _Trace(self, method.name)
+
+    def _record(self, trace):
+        with self._lock:
+            phases = self._stats.setdefault(trace.method_name, {})
+            for phase, wall, cpu, memory in trace.phases:
+                stats = phases.get(phase)
+                if stats is None:
+                    stats = phases[phase] = _PhaseStats()
+                stats.add(wall, cpu, memory)
+            if trace._cprofile is not None:
+                import pstats
+
+                existing = self._pstats.get(trace.method_name)
+                if existing is None:
+                    self._pstats[trace.method_name] = pstats.Stats(trace._cprofile)
+                else:
+                    existing.add(trace._cprofile)
+
+    def summary(self):
+        """
+        :return: Dictionary {method name: {phase: {"count", "wall_ms", "wall_avg_ms",
+            "wall_max_ms", "cpu_ms", "memory_bytes"}}}
+        """
+
+        with self._lock:
+            return {
+                method_name: {
+                    phase: {
+                        "count": s.count,
+                        "wall_ms": round(s.wall * 1000, 3),
+                        "wall_avg_ms": round(s.wall * 1000 / s.count, 3),
+                        "wall_max_ms": round(s.wall_max * 1000, 3),
+                        "cpu_ms": round(s.cpu * 1000, 3),
+                        "memory_bytes": s.memory,
+                    }
+                    for phase, s in sorted(phases.items(), key=lambda item: _phase_order(item[0]))
+                }
+                for method_name, phases in self._stats.items()
+            }
+
+    def report(self):
+        """
+        :return: Human-readable summary table, slowest methods first
+        """
+
+        summary = self.summary()
+        lines = [f"{'method':<24} {'phase':<11} {'count':>7} {'avg ms':>9} {'max ms':>9} {'cpu ms':>9} {'mem KiB':>9}"]
+        totals = {name: sum(p["wall_ms"] for p in phases.values()) for name, phases in summary.items()}
+        for name in sorted(summary, key=totals.get, reverse=True):
+            for phase, s in summary[name].items():
+                lines.append(f"{name:<24} {phase:<11} {s['count']:>7} {s['wall_avg_ms']:>9.3f} "
+                             f"{s['wall_max_ms']:>9.3f} {s['cpu_ms']:>9.3f} {s['memory_bytes'] / 1024:>9.1f}")
+        return "\n".join(lines)
+
+    def collapsed(self):
+        """
+        Total wall time per method and phase in collapsed stack format
+        (`frame;frame;frame microseconds`), as read by flamegraph.pl and speedscope.
+
+        :return: str
+        """
+
+        with self._lock:
+            lines = [
+                f"bybit_p2p;{method_name};{phase} {int(stats.wall * 1e6)}"
+                for method_name, phases in self._stats.items()
+                for phase, stats in phases.items()
+            ]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def dump_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+
+    def dump_pstats(self, path, method_name=None):
+        """
+        Write cProfile statistics (`cprofile=True`) for snakeviz, pstats, etc.
+
+        :param path: Output file
+        :param method_name: One P2P method, e.g. "GET_PENDING_ORDERS", all methods if None
+        """
+
+        import pstats
+
+        with self._lock:
+            stats = [s for name, s in self._pstats.items() if method_name is None or name == method_name]
+            if not stats:
+                raise ValueError("No cProfile data collected")
+            merged = pstats.Stats()
+            merged.add(*stats)
+        merged.dump_stats(path)
+
+
+def _phase_order(phase):
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
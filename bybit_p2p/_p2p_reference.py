@@ -0,0 +1,323 @@
+import json
+import logging
+import math
+import threading
+import time
+from array import array
+
+# Online ads sides: buy ads are the bids, sell ads the asks
+SIDE_BUY = "0"
+SIDE_SELL = "1"
+
+# Columns kept per sample in ReferenceBuffer
+_COLUMNS = ("ts", "bid", "ask", "mid", "bid_vwap", "ask_vwap", "bid_depth", "ask_depth")
+
+_logger = logging.getLogger(__name__)
+
+# numpy module, False when not installed, None until first looked up
+_numpy = None
+
+
+def _load_numpy():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy
+
+
+class Quote:
+    """
+    One observation of a market: bids and asks as (price, quantity) pairs, best first.
+
+    :param ts: Observation time, seconds since the epoch
+    :param bids: Iterable of (price, quantity), highest price first
+    :param asks: Iterable of (price, quantity), lowest price first
+    """
+
+    __slots__ = ("ts", "bids", "asks")
+
+    def __init__(self, ts, bids, asks):
+        self.ts = ts
+        self.bids = [(float(p), float(q)) for p, q in bids]
+        self.asks = [(float(p), float(q)) for p, q in asks]
+
+    def __repr__(self):
+        return f"Quote(ts={self.ts}, bids={len(self.bids)}, asks={len(self.asks)})"
+
+
+class ReferenceSource:
+    """
+    Where reference prices come from. `fetch()` returns the current Quote.
+    """
+
+    def fetch(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class OnlineBookSource(ReferenceSource):
+    """
+    The P2P order book itself, from `get_online_ads`. Any object with that method
+    works, so an `OrderBookReplay` gives an offline source from recorded books.
+
+    :param api: P2P client or OrderBookReplay
+    :param token_id: Token ID, like USDT
+    :param currency_id: Currency ID, like RUB
+    :param depth: Ads per side taken into account
+    """
+
+    def __init__(self, api, token_id, currency_id, depth=20):
+        self._api = api
+        self.token_id = token_id
+        self.currency_id = currency_id
+        self.depth = depth
+
+    def _side(self, side):
+        response = self._api.get_online_ads(tokenId=self.token_id, currencyId=self.currency_id,
+                                            side=side, page=1, size=self.depth)
+        items = (response.get("result") or {}).get("items") or []
+        return [(item["price"], item.get("lastQuantity") or 0) for item in items]
+
+    def fetch(self):
+        bids = sorted(self._side(SIDE_BUY), key=lambda level: -float(level[0]))
+        asks = sorted(self._side(SIDE_SELL), key=lambda level: float(level[0]))
+        return Quote(time.time(), bids, asks)
+
+
+class FileSource(ReferenceSource):
+    """
+    Quotes read from a JSON lines file, one `{"ts": ..., "bids": [[price, qty], ...],
+    "asks": [...]}` object per line, served in order. The last quote is repeated once
+    the file is exhausted, or the file starts over with `loop`.
+
+    :param path: JSON lines file
+    :param loop: Start over at the end of the file
+    """
+
+    def __init__(self, path, loop=False):
+        with open(path, "r", encoding="utf-8") as f:
+            self._quotes = [json.loads(line) for line in f if line.strip()]
+        if not self._quotes:
+            raise ValueError(f"No quotes in {path}")
+        self._loop = loop
+        self._position = 0
+
+    def fetch(self):
+        data = self._quotes[self._position]
+        if self._position + 1 < len(self._quotes):
+            self._position += 1
+        elif self._loop:
+            self._position = 0
+        return Quote(data.get("ts", time.time()), data.get("bids", ()), data.get("asks", ()))
+
+
+class StaticSource(ReferenceSource):
+    """
+    Fixed or computed quotes, for tests and offline runs.
+
+    :param quote: Quote, or a callable returning one
+    """
+
+    def __init__(self, quote):
+        self._quote = quote
+
+    def fetch(self):
+        return self._quote() if callable(self._quote) else self._quote
+
+
+def _vwap(levels):
+    notional = sum(p * q for p, q in levels)
+    depth = sum(q for _, q in levels)
+    return (notional / depth if depth else float("nan")), depth
+
+
+class ReferenceStats:
+    """
+    Immutable statistics over the buffered window, as published by ReferenceFeed.
+
+    `bid`/`ask`/`mid`/`spread` describe the latest quote; `vwap` is the
+    depth-weighted average mid over the window; `volatility` is the standard
+    deviation of log returns of the mid over the window.
+    """
+
+    __slots__ = ("ts", "bid", "ask", "mid", "spread", "spread_pct", "bid_vwap", "ask_vwap",
+                 "vwap", "volatility", "samples")
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ReferenceStats is read-only")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"ReferenceStats(mid={self.mid}, spread={self.spread}, vwap={self.vwap}, samples={self.samples})"
+
+
+class ReferenceBuffer:
+    """
+    Fixed-size ring buffer of quote summaries, stored column-wise in `array('d')`.
+    Window statistics are computed with numpy when it is installed (zero-copy views of
+    the arrays), in pure Python otherwise.
+
+    :param capacity: Samples kept
+    """
+
+    def __init__(self, capacity=360):
+        self.capacity = capacity
+        self._columns = {name: array("d", bytes(8 * capacity)) for name in _COLUMNS}
+        self._next = 0
+        self.size = 0
+
+    def append(self, quote):
+        bid = quote.bids[0][0] if quote.bids else float("nan")
+        ask = quote.asks[0][0] if quote.asks else float("nan")
+        bid_vwap, bid_depth = _vwap(quote.bids)
+        ask_vwap, ask_depth = _vwap(quote.asks)
+        row = (quote.ts, bid, ask, (bid + ask) / 2, bid_vwap, ask_vwap, bid_depth, ask_depth)
+        for name, value in zip(_COLUMNS, row):
+            self._columns[name][self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def column(self, name):
+        """
+        :return: Values of a column, oldest first, as a list
+        """
+
+        values = self._columns[name]
+        if self.size < self.capacity:
+            return values[:self.size].tolist()
+        return (values[self._next:] + values[:self._next]).tolist()
+
+    def stats(self):
+        """
+        :return: ReferenceStats over the buffered window, None if empty
+        """
+
+        if not self.size:
+            return None
+        numpy = _load_numpy()
+        window = self._window_numpy(numpy) if numpy else self._window_python()
+        last = (self._next - 1) % self.capacity
+        bid, ask = self._columns["bid"][last], self._columns["ask"][last]
+        mid = self._columns["mid"][last]
+        return ReferenceStats(
+            ts=self._columns["ts"][last],
+            bid=bid,
+            ask=ask,
+            mid=mid,
+            spread=ask - bid,
+            spread_pct=(ask - bid) / mid * 100 if mid else float("nan"),
+            bid_vwap=self._columns["bid_vwap"][last],
+            ask_vwap=self._columns["ask_vwap"][last],
+            samples=self.size,
+            **window,
+        )
+
+    def _window_numpy(self, numpy):
+        def view(name):
+            values = numpy.frombuffer(self._columns[name], dtype=numpy.float64)
+            if self.size < self.capacity:
+                return values[:self.size]
+            return numpy.concatenate((values[self._next:], values[:self._next]))
+
+        mid = view("mid")
+        weights = view("bid_depth") + view("ask_depth")
+        valid = numpy.isfinite(mid) & (weights > 0)
+        vwap = float(numpy.average(mid[valid], weights=weights[valid])) if valid.any() else float("nan")
+        finite = mid[numpy.isfinite(mid) & (mid > 0)]
+        returns = numpy.diff(numpy.log(finite))
+        volatility = float(returns.std(ddof=1)) if len(returns) > 1 else 0.0
+        return {"vwap": vwap, "volatility": volatility}
+
+    def _window_python(self):
+        mid = self.column("mid")
+        weights = [b + a for b, a in zip(self.column("bid_depth"), self.column("ask_depth"))]
+        pairs = [(m, w) for m, w in zip(mid, weights) if math.isfinite(m) and w > 0]
+        total = sum(w for _, w in pairs)
+        vwap = sum(m * w for m, w in pairs) / total if total else float("nan")
+        finite = [m for m in mid if math.isfinite(m) and m > 0]
+        returns = [math.log(b / a) for a, b in zip(finite, finite[1:])]
+        volatility = 0.0
+        if len(returns) > 1:
+            mean = sum(returns) / len(returns)
+            volatility = math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1))
+        return {"vwap": vwap, "volatility": volatility}
+
+
+class ReferenceFeed:
+    """
+    Polls a ReferenceSource in the background and publishes ReferenceStats.
+
+    Readers take `feed.stats`, the latest published snapshot, without locking or
+    waiting on the network: repricing code never sits on a reference request.
+    Subscribers are called with every new snapshot from the feed's thread.
+
+    :param source: ReferenceSource
+    :param interval: Seconds between fetches
+    :param window: Samples kept for window statistics
+    """
+
+    def __init__(self, source, interval=10.0, window=360):
+        self.source = source
+        self.interval = interval
+        self.buffer = ReferenceBuffer(window)
+        self.stats = None
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """
+        :param callback: Called as `callback(stats)` after every update
+        """
+
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def update(self):
+        """
+        Fetch one quote and publish new statistics.
+
+        :return: ReferenceStats
+        """
+
+        self.buffer.append(self.source.fetch())
+        stats = self.stats = self.buffer.stats()
+        for callback in list(self._subscribers):
+            callback(stats)
+        return stats
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bybit-p2p-reference", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.source.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.update()
+            except Exception as e:
+                _logger.warning("Reference update failed: %s", e)
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,313 @@
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ._p2p_state import default_owner
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Budget fill (available / capacity) below which jobs of a priority are deferred
+_DEFER_BELOW = {PRIORITY_HIGH: 0.0, PRIORITY_NORMAL: 0.2, PRIORITY_LOW: 0.5}
+
+_logger = logging.getLogger(__name__)
+
+
+def _fingerprint(response):
+    data = json.dumps(response.get("result") if isinstance(response, dict) else response,
+                      sort_keys=True, default=str)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+
+
+class Subscription:
+    """
+    A consumer of a polled request, returned by `PollingScheduler.subscribe`.
+    """
+
+    __slots__ = ("job", "callback", "on_error", "interval", "priority")
+
+    def __init__(self, job, callback, on_error, interval, priority):
+        self.job = job
+        self.callback = callback
+        self.on_error = on_error
+        self.interval = interval
+        self.priority = priority
+
+    def __repr__(self):
+        return f"Subscription({self.job.method_name}, interval={self.interval})"
+
+
+class _Job:
+    __slots__ = ("key", "method_name", "params", "subscriptions", "interval", "min_interval",
+                 "max_interval", "priority", "next_run", "fingerprint", "running", "cancelled", "runs")
+
+    def __init__(self, key, method_name, params):
+        self.key = key
+        self.method_name = method_name
+        self.params = params
+        self.subscriptions = []
+        self.interval = None
+        self.min_interval = None
+        self.max_interval = None
+        self.priority = PRIORITY_LOW
+        self.next_run = 0.0
+        self.fingerprint = None
+        self.running = False
+        self.cancelled = False
+        self.runs = 0
+
+    def configure(self):
+        self.min_interval = min(s.interval for s in self.subscriptions)
+        self.max_interval = self.min_interval * 4
+        self.priority = min(s.priority for s in self.subscriptions)
+        if self.interval is None or self.interval > self.max_interval:
+            self.interval = self.min_interval
+        self.interval = max(self.interval, self.min_interval)
+
+
+class PollingScheduler:
+    """
+    Central owner of periodic requests (pending orders, chat, ads, balances).
+
+    Subscriptions to the same method with the same parameters share one job: the
+    request is made once and every subscriber's callback receives the response. A job
+    runs at the shortest interval requested by its subscribers while responses keep
+    changing, and backs off up to 4x that interval while they stay the same. Every
+    interval is spread by +/- `jitter` so that processes started together do not poll
+    in lockstep.
+
+    With a `budget` (the TokenBucket also passed to the client's `rate_limiters`), low
+    and normal priority jobs are deferred and slowed down when the bucket runs low, so
+    high priority jobs keep their share.
+
+    With a shared `state` backend, schedulers in different processes elect one leader
+    per job: only the leader makes the request and stores the response in the backend,
+    the others hand the stored response to their subscribers.
+
+    :param api: P2P client
+    :param budget: TokenBucket (or SharedTokenBucket) shared with the client, None to
+        ignore rate budget
+    :param jitter: Relative random spread of intervals, 0.1 for +/- 10%
+    :param max_workers: Jobs running at the same time
+    :param state: StateBackend shared with schedulers in other processes
+    :param owner: Identity of this scheduler in leases, `default_owner()` if None
+    """
+
+    def __init__(self, api, budget=None, jitter=0.1, max_workers=4, state=None, owner=None):
+        self._api = api
+        self.budget = budget
+        self.jitter = jitter
+        self._max_workers = max_workers
+        self._state = state
+        self._owner = owner or (default_owner() if state is not None else None)
+        self._jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopping = False
+
+    @staticmethod
+    def _key(method_name, params):
+        return method_name, json.dumps(params, sort_keys=True, default=str)
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (job.next_run, job.priority, next(self._seq), job))
+        self._cond.notify()
+
+    def _jittered(self, interval):
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def subscribe(self, method_name, callback, interval=5.0, priority=PRIORITY_NORMAL, on_error=None, **params):
+        """
+        Receive the response of a periodically made request.
+
+        :param method_name: P2P method name, e.g. "get_pending_orders"
+        :param callback: Called as `callback(response)` after every successful request
+        :param interval: Seconds between requests while responses change
+        :param priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+        :param on_error: Called as `on_error(exception)` when a request fails
+        :param params: Request parameters
+        :return: Subscription, pass it to `unsubscribe`
+        """
+
+        if not callable(getattr(self._api, method_name, None)):
+            raise ValueError(f"Unknown method: {method_name}")
+        key = self._key(method_name, params)
+        with self._cond:
+            job = self._jobs.get(key)
+            new = job is None
+            if new:
+                job = self._jobs[key] = _Job(key, method_name, dict(params))
+            subscription = Subscription(job, callback, on_error, interval, priority)
+            job.subscriptions.append(subscription)
+            job.configure()
+            now = time.monotonic()
+            if new:
+                # Stagger the first runs of jobs created together
+                job.next_run = now + random.uniform(0, job.interval * self.jitter)
+                self._push(job)
+            elif not job.running and job.next_run > now + job.interval:
+                # A faster subscriber should not wait out the backed off interval; the
+                # heap entry at the old time is skipped as stale by `_due`
+                job.next_run = now + job.interval
+                self._push(job)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._cond:
+            job = subscription.job
+            if subscription in job.subscriptions:
+                job.subscriptions.remove(subscription)
+            if job.subscriptions:
+                job.configure()
+            else:
+                job.cancelled = True
+                self._jobs.pop(job.key, None)
+
+    def jobs(self):
+        """
+        :return: List of (method name, params, current interval, subscriber count)
+        """
+
+        with self._cond:
+            return [(j.method_name, j.params, j.interval, len(j.subscriptions)) for j in self._jobs.values()]
+
+    def _budget_fill(self):
+        if self.budget is None:
+            return 1.0
+        return self.budget.available / self.budget.capacity
+
+    def _due(self, now):
+        """
+        Pop the jobs due at `now`, rescheduling those deferred for lack of budget.
+        """
+
+        due = []
+        fill = None
+        while self._heap and self._heap[0][0] <= now:
+            run_at, _, _, job = heapq.heappop(self._heap)
+            if job.cancelled or job.running or run_at != job.next_run:
+                continue
+            if fill is None:
+                fill = self._budget_fill()
+            if fill < _DEFER_BELOW[job.priority]:
+                job.next_run = now + self._jittered(job.interval)
+                self._push(job)
+                continue
+            job.running = True
+            due.append(job)
+        return due
+
+    def run_pending(self, now=None):
+        """
+        Run the jobs that are due in the calling thread.
+
+        :param now: time.monotonic() value, the current time if None
+        :return: Number of jobs run
+        """
+
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            due = self._due(now)
+        for job in due:
+            self._run_job(job, now)
+        return len(due)
+
+    def _fetch(self, job):
+        if self._state is None:
+            return getattr(self._api, job.method_name)(**job.params)
+
+        name = hashlib.blake2b("\0".join(job.key).encode("utf-8"), digest_size=12).hexdigest()
+        ttl = max(job.max_interval * 2, 5.0)
+        if self._state.acquire_lease(f"poll:{name}", self._owner, ttl):
+            response = getattr(self._api, job.method_name)(**job.params)
+            self._state.set_json(f"response:{name}", response, ttl)
+            return response
+        return self._state.get_json(f"response:{name}")
+
+    def _run_job(self, job, now=None):
+        error = response = None
+        try:
+            response = self._fetch(job)
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            job.running = False
+            job.runs += 1
+            subscriptions = list(job.subscriptions)
+            if error is not None:
+                job.interval = min(job.interval * 2, job.max_interval)
+            else:
+                fingerprint = _fingerprint(response)
+                if fingerprint != job.fingerprint:
+                    job.interval = job.min_interval
+                else:
+                    job.interval = min(job.interval * 1.5, job.max_interval)
+                job.fingerprint = fingerprint
+            interval = job.interval
+            fill = self._budget_fill()
+            if job.priority != PRIORITY_HIGH and fill < 0.5:
+                interval /= max(fill * 2, 0.25)
+            if not job.cancelled:
+                job.next_run = (time.monotonic() if now is None else now) + self._jittered(interval)
+                self._push(job)
+
+        if error is None and response is None:
+            # Another process leads this job and has not stored a response yet
+            return
+        for subscription in subscriptions:
+            try:
+                if error is None:
+                    subscription.callback(response)
+                elif subscription.on_error is not None:
+                    subscription.on_error(error)
+            except Exception:
+                _logger.exception("Subscriber of %s failed", job.method_name)
+        if error is not None and not any(s.on_error for s in subscriptions):
+            _logger.warning("Polling %s failed: %s", job.method_name, error)
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                thread_name_prefix="bybit-p2p-scheduler")
+            self._thread = threading.Thread(target=self._run, name="bybit-p2p-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    now = time.monotonic()
+                    due = self._due(now)
+                    if due:
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+            for job in due:
+                self._executor.submit(self._run_job, job)
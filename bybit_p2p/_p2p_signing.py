@@ -0,0 +1,161 @@
+import os
+import threading
+from concurrent.futures import Future
+
+# Signer of the current worker process, loaded once by `_init_worker`
+_worker_secret = None
+
+
+def _init_worker(secret):
+    global _worker_secret
+    from ._p2p_manager import _rsa_signer
+
+    _worker_secret = secret
+    # Parse the key up front, so the first job does not pay for it
+    _rsa_signer(secret)
+
+
+def _sign_batch(payloads):
+    from ._p2p_manager import _rsa_sign
+
+    return [_rsa_sign(_worker_secret, payload) for payload in payloads]
+
+
+def _mp_context():
+    import multiprocessing
+
+    # Forking a process that already runs threads (HTTP pools, the batcher) is unsafe
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class SigningExecutor:
+    """
+    Offloads RSA request signing to a pool of worker processes.
+
+    PKCS#1 v1.5 signing is CPU-bound and holds the GIL, so threads signing in parallel
+    do not scale past one core. Each worker process loads the private key once; jobs are
+    grouped into batches to amortise the inter-process round-trip. While fewer than
+    `inline_threshold` signatures are in progress, signing happens in the calling thread,
+    which is cheaper than a process hop at low load.
+
+    :param secret: RSA private key (PEM)
+    :param max_workers: Worker processes, defaults to the CPU count
+    :param inline_threshold: Signatures in progress below which signing stays in-thread
+    :param batch_size: Max signatures sent to a worker at once
+    :param batch_delay: Seconds the batcher waits for a batch to fill up
+    """
+
+    def __init__(self, secret, max_workers=None, inline_threshold=2, batch_size=16, batch_delay=0.0005):
+        self._secret = secret
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._inline_threshold = inline_threshold
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+        self._cond = threading.Condition()
+        self._queue = []
+        self._active = 0
+        self._closed = False
+        self._pool = None
+        self._batcher = None
+
+    def sign(self, data):
+        """
+        Sign bytes, blocking until the signature is ready.
+
+        :param data: Bytes to sign
+        :return: Base64 signature string
+        """
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SigningExecutor is closed")
+            inline = self._active < self._inline_threshold
+            self._active += 1
+        try:
+            if inline:
+                from ._p2p_manager import _rsa_sign
+
+                return _rsa_sign(self._secret, data)
+            return self._submit(data).result()
+        finally:
+            with self._cond:
+                self._active -= 1
+
+    def sign_async(self, data):
+        """
+        Sign bytes in a worker process without blocking.
+        Asyncio callers can await `asyncio.wrap_future(executor.sign_async(data))`.
+
+        :param data: Bytes to sign
+        :return: concurrent.futures.Future resolving to the base64 signature string
+        """
+
+        return self._submit(data)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._batcher is not None:
+            self._batcher.join()
+            self._batcher = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _submit(self, data):
+        future = Future()
+        with self._cond:
+            # Checked under the lock: close() may have run since the caller looked
+            if self._closed:
+                raise RuntimeError("SigningExecutor is closed")
+            self._queue.append((data, future))
+            if self._batcher is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=_mp_context(),
+                    initializer=_init_worker,
+                    initargs=(self._secret,),
+                )
+                self._batcher = threading.Thread(target=self._run_batcher, name="bybit-p2p-signer", daemon=True)
+                self._batcher.start()
+            self._cond.notify()
+        return future
+
+    def _run_batcher(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                if len(self._queue) < self._batch_size and not self._closed:
+                    self._cond.wait(self._batch_delay)
+                batch = self._queue[:self._batch_size]
+                del self._queue[:self._batch_size]
+            try:
+                job = self._pool.submit(_sign_batch, [data for data, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            job.add_done_callback(lambda done, batch=batch: self._distribute(batch, done))
+
+    @staticmethod
+    def _distribute(batch, done):
+        error = done.exception()
+        if error is not None:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for (_, future), signature in zip(batch, done.result()):
+            future.set_result(signature)
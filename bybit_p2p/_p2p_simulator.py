@@ -0,0 +1,744 @@
+import heapq
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from decimal import ROUND_DOWN, Decimal
+from urllib.parse import parse_qsl, urlsplit
+
+from ._p2p_balance import (SIDE_BUY, SIDE_SELL, STATUS_CANCELLED, STATUS_FINISHED, STATUS_WAITING_PAYMENT,
+                           STATUS_WAITING_RELEASE, _decimal)
+from ._p2p_helper import P2PMethods
+from ._p2p_transport import Transport, TransportResponse
+
+AD_STATUS_ONLINE = 10
+AD_STATUS_OFFLINE = 20
+
+# retCodes, same as MockP2PServer
+RET_CODE_PARAMS = 10001
+RET_CODE_NOT_FOUND = 912100001
+RET_CODE_ORDER_STATUS = 912100027
+
+PENDING_STATUSES = frozenset({STATUS_WAITING_PAYMENT, STATUS_WAITING_RELEASE})
+
+_QUANTITY_STEP = Decimal("0.0001")
+_AMOUNT_STEP = Decimal("0.01")
+
+# Fields of the order list items; get_order_details returns the whole order
+_SIMPLE_ORDER_FIELDS = ("id", "side", "tokenId", "currencyId", "price", "quantity", "amount", "status", "createDate",
+                        "userId", "nickName", "targetUserId", "targetNickName", "fee", "notifyTokenId",
+                        "notifyTokenQuantity")
+
+_GREETINGS = ("Hello", "Hi, paying now", "Good day", "Hi, is this available?")
+_PAID_MESSAGES = ("Paid, please release", "Done, sent the payment", "Payment sent")
+_CHATTER = ("Any update?", "Ok", "Thanks", "Please check", "Sent from my bank app")
+
+
+def _side(value):
+    # SIDE_BUY or SIDE_SELL from a request parameter, None if it is neither
+    try:
+        side = int(value)
+    except (TypeError, ValueError):
+        return None
+    return side if side in (SIDE_BUY, SIDE_SELL) else None
+
+
+class VirtualClock:
+    """
+    Simulated time in seconds since the epoch. It only moves when the simulator
+    advances it, so a simulated week takes as long as the events in it take to process.
+    """
+
+    def __init__(self, start=None):
+        self._now = float(time.time() if start is None else start)
+
+    def time(self):
+        return self._now
+
+    def time_ms(self):
+        return int(self._now * 1000)
+
+    def _move_to(self, ts):
+        if ts > self._now:
+            self._now = ts
+
+
+class SimulatorTransport(Transport):
+    """
+    Answers P2P client requests from a P2PSimulator instead of the network.
+    """
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+
+    def send(self, request):
+        url = urlsplit(request.url)
+        if request.method == "GET":
+            params = dict(parse_qsl(url.query))
+        elif request.headers.get("Content-Type", "").startswith("multipart/"):
+            match = re.search(rb'filename="([^"]*)"', request.body or b"")
+            params = {"upload_file": match.group(1).decode("utf-8", "replace") if match else "file"}
+        else:
+            try:
+                params = json.loads(request.body) if request.body else {}
+            except ValueError:
+                params = None
+        body = self.simulator.handle(url.path, params)
+        if body is None:
+            return TransportResponse(404, {}, b"Not Found")
+        return TransportResponse(200, {"Content-Type": "application/json"},
+                                 json.dumps(body, separators=(",", ":")).encode("utf-8"))
+
+
+class P2PSimulator:
+    """
+    In-process P2P market on a virtual clock, for testing ad and order automation far
+    faster than real time.
+
+    The simulator answers every `P2PRequests` method through `transport`, so strategy
+    code runs unchanged against `simulator.client()`. Our ads live in a book of
+    competitor ads whose prices follow a random walk around a reference price that
+    drifts itself. Synthetic counterparties place orders against our online ads, more
+    often the better the ad ranks in its book (`order_rate` orders per hour at the
+    top, `order_rate / (1 + rank)` below). On our sell ads, buyers pay after
+    `payment_delay` seconds or cancel with `cancel_probability`; on our buy ads, we
+    have to `mark_as_paid` within the ad's payment period, after which the seller
+    releases after `release_delay` seconds. Unpaid orders are cancelled when their
+    payment period ends. Counterparties greet, confirm payments and answer our
+    messages in the order chat. Sell ads lock their quantity in the funding balance;
+    finished orders move it.
+
+    Nothing happens between calls to `advance` or `run`; every API call sees the
+    market as of the virtual clock.
+
+    :param token_id: Token traded, like USDT
+    :param currency_id: Fiat currency, like EUR
+    :param reference_price: Starting market price of the token
+    :param balance: Starting funding balance of the token
+    :param competitors: Competitor ads per side
+    :param order_rate: Orders per hour on an ad at the top of its book
+    :param cancel_probability: Share of buyers that cancel instead of paying
+    :param payment_delay: (min, max) seconds before a buyer pays
+    :param release_delay: (min, max) seconds before a seller releases once paid
+    :param chat_probability: Chance of each counterparty chat message (greeting, chatter, reply)
+    :param volatility: Daily volatility of the reference price, as a fraction
+    :param tick: Seconds between market updates (competitor prices, new orders)
+    :param price_step: Price increment of competitor ads
+    :param counterparties: Size of the synthetic counterparty population
+    :param payment_methods: Our `get_user_payment_types` rows, one bank transfer if None
+    :param seed: Random seed, for reproducible runs
+    :param start: Virtual start time in seconds since the epoch, now if None
+    """
+
+    def __init__(self, token_id="USDT", currency_id="EUR", reference_price="0.92", balance="10000",
+                 competitors=20, order_rate=6.0, cancel_probability=0.1, payment_delay=(60, 900),
+                 release_delay=(30, 600), chat_probability=0.5, volatility=0.01, tick=10.0,
+                 price_step="0.001", counterparties=200, payment_methods=None, seed=None, start=None,
+                 nickname="simulated"):
+        self.token_id = token_id
+        self.currency_id = currency_id
+        self.clock = VirtualClock(start)
+        self.started = self.clock.time()
+        self.transport = SimulatorTransport(self)
+        self.order_rate = order_rate
+        self.cancel_probability = cancel_probability
+        self.payment_delay = payment_delay
+        self.release_delay = release_delay
+        self.chat_probability = chat_probability
+        self.volatility = volatility
+        self.tick = tick
+        self.price_step = Decimal(str(price_step))
+        self.reference_price = float(reference_price)
+
+        self._lock = threading.RLock()
+        self._rng = random.Random(seed)
+        self._events = []
+        self._seq = itertools.count()
+        self._ids = itertools.count(1800000000000000001)
+        self._total = _decimal(balance)
+        self._locked = Decimal(0)
+        self._ads = {}
+        self._competitors = {SIDE_BUY: [], SIDE_SELL: []}
+        self._orders = {}
+        self._messages = {}
+        self._requests = {}
+        self._counts = {"orders": 0, "finished": 0, "cancelled": 0, "expired": 0, "messages_received": 0,
+                        "messages_sent": 0}
+        self._volume = {SIDE_BUY: [Decimal(0), Decimal(0)], SIDE_SELL: [Decimal(0), Decimal(0)]}
+
+        self.user = {"userId": "100000001", "accountId": "200000001", "nickName": nickname}
+        self.payment_methods = [dict(row) for row in payment_methods] if payment_methods else [
+            {"id": "1001", "paymentType": "14", "bankName": "Bank Transfer", "realName": nickname,
+             "accountNo": "SIM00000000001", "branchName": "", "visible": 0, "online": "1"},
+        ]
+        self._counterparties = [self._new_counterparty(i) for i in range(counterparties)]
+        for side in (SIDE_BUY, SIDE_SELL):
+            for _ in range(competitors):
+                self._new_competitor_ad(side)
+        self._schedule(self.tick, self._market_tick)
+
+    # Virtual time
+
+    def _schedule(self, delay, func, *args):
+        heapq.heappush(self._events, (self.clock.time() + delay, next(self._seq), func, args))
+
+    def advance(self, seconds):
+        """
+        Move the virtual clock forward, running every market event due on the way.
+
+        :return: New virtual time in seconds
+        """
+
+        if seconds < 0:
+            raise ValueError("Cannot move the clock backwards")
+        with self._lock:
+            target = self.clock.time() + seconds
+            while self._events and self._events[0][0] <= target:
+                at, _, func, args = heapq.heappop(self._events)
+                self.clock._move_to(at)
+                func(*args)
+            self.clock._move_to(target)
+            return target
+
+    def sleep(self, seconds):
+        # Drop-in for time.sleep in strategy code driven by the simulator
+        self.advance(seconds)
+
+    def run(self, duration, step=60.0, callback=None, speed=None):
+        """
+        Simulate `duration` seconds, calling `callback(simulator)` every `step` virtual
+        seconds, e.g. to poll orders and reprice ads through `client()`.
+
+        :param speed: Virtual seconds per real second; None runs as fast as possible
+        :return: `stats()` at the end
+        """
+
+        end = self.clock.time() + duration
+        wall = time.monotonic()
+        virtual = self.clock.time()
+        while self.clock.time() < end:
+            self.advance(min(step, end - self.clock.time()))
+            if callback is not None:
+                callback(self)
+            if speed:
+                delay = (self.clock.time() - virtual) / speed - (time.monotonic() - wall)
+                if delay > 0:
+                    time.sleep(delay)
+        return self.stats()
+
+    def client(self, **kwargs):
+        """
+        P2P client bound to this simulator. Server time sync is off, since the virtual
+        clock does not follow the real one.
+
+        :param kwargs: Extra P2P arguments
+        """
+
+        from .p2p import P2P
+
+        kwargs.setdefault("api_key", "simulator")
+        kwargs.setdefault("api_secret", "simulator")
+        kwargs.setdefault("time_sync", False)
+        return P2P(testnet=False, transport=self.transport, **kwargs)
+
+    # Market
+
+    def _price(self, value):
+        return str(Decimal(str(value)).quantize(self.price_step))
+
+    def _new_counterparty(self, i):
+        total = self._rng.randint(0, 2000)
+        return {
+            "userId": str(300000000 + i), "nickName": f"trader{i:04d}", "realName": f"Trader {i:04d}",
+            "totalFinishCount": total, "recentFinishCount": min(total, self._rng.randint(0, 200)),
+            "recentRate": self._rng.randint(80, 100), "accountCreateDays": self._rng.randint(1, 2000),
+        }
+
+    def _new_competitor_ad(self, side):
+        # Sellers ask above the reference price, buyers bid below it
+        base = self._rng.uniform(0.001, 0.02) * (1 if side == SIDE_SELL else -1)
+        counterparty = self._rng.choice(self._counterparties)
+        quantity = Decimal(self._rng.randint(100, 20000))
+        ad = self._new_ad(side, counterparty, {
+            "price": self._price(self.reference_price * (1 + base)), "quantity": str(quantity),
+            "minAmount": str(self._rng.choice((10, 20, 50, 100))),
+            "maxAmount": str(self._rng.choice((500, 1000, 5000, 20000))),
+            "paymentIds": [self._rng.choice(("14", "90", "377", "416"))], "paymentPeriod": "15",
+            "remark": "", "priceType": "0", "premium": "",
+        })
+        ad["_base"] = ad["_offset"] = base
+        self._competitors[side].append(ad)
+        return ad
+
+    def _new_ad(self, side, owner, params):
+        ad_id = str(next(self._ids))
+        quantity = _decimal(params.get("quantity"))
+        ad = {
+            "id": ad_id, "accountId": owner.get("accountId", owner["userId"]), "userId": owner["userId"],
+            "nickName": owner["nickName"], "tokenId": self.token_id, "tokenName": self.token_id,
+            "currencyId": self.currency_id, "side": side, "priceType": int(params.get("priceType") or 0),
+            "price": str(params.get("price")), "premium": str(params.get("premium") or ""),
+            "quantity": str(quantity), "lastQuantity": str(quantity), "frozenQuantity": "0",
+            "executedQuantity": "0", "minAmount": str(params.get("minAmount")),
+            "maxAmount": str(params.get("maxAmount")), "remark": params.get("remark") or "",
+            "status": AD_STATUS_ONLINE, "isOnline": True, "createDate": str(self.clock.time_ms()),
+            "payments": [str(p) for p in params.get("paymentIds") or ()],
+            "paymentPeriod": int(params.get("paymentPeriod") or 15),
+            "tradingPreferenceSet": params.get("tradingPreferenceSet") or {},
+            "orderNum": 0, "finishNum": 0, "recentOrderNum": 0, "recentExecuteRate": 100,
+            "_mine": owner is self.user, "_value": float(_decimal(params.get("price"))),
+        }
+        self._ads[ad_id] = ad
+        return ad
+
+    def _market_tick(self):
+        dt = self.tick
+        self.reference_price *= math.exp(self._rng.gauss(0, self.volatility * math.sqrt(dt / 86400)))
+        for ads in self._competitors.values():
+            for ad in ads:
+                # Mean-reverting spread around the reference, so competitors follow the market;
+                # the price string is only formatted when the book is read
+                ad["_offset"] += 0.05 * (ad["_base"] - ad["_offset"]) + self._rng.gauss(0, 0.0005)
+                ad["_value"] = self.reference_price * (1 + ad["_offset"])
+                if self._rng.random() < dt / 3600:
+                    ad["lastQuantity"] = str(self._rng.randint(100, 20000))
+        for ad in [ad for ad in self._ads.values() if ad["_mine"]]:
+            if ad["status"] == AD_STATUS_ONLINE:
+                rate = self.order_rate / (1 + self._rank(ad)) * dt / 3600
+                for _ in range(self._poisson(rate)):
+                    self._new_order(ad)
+        self._schedule(self.tick, self._market_tick)
+
+    def _poisson(self, lam):
+        limit, k, p = math.exp(-lam), 0, self._rng.random()
+        while p > limit:
+            k += 1
+            p *= self._rng.random()
+        return k
+
+    def _rank(self, ad):
+        # Competitor ads with a better price than ours: lower asks, higher bids
+        price = ad["_value"]
+        if ad["side"] == SIDE_SELL:
+            return sum(1 for other in self._competitors[SIDE_SELL] if other["_value"] < price)
+        return sum(1 for other in self._competitors[SIDE_BUY] if other["_value"] > price)
+
+    def _book(self, side):
+        ads = [ad for ad in self._ads.values() if ad["side"] == side and ad["status"] == AD_STATUS_ONLINE]
+        ads.sort(key=lambda ad: ad["_value"], reverse=side == SIDE_BUY)
+        return ads
+
+    # Orders
+
+    def _new_order(self, ad):
+        price = _decimal(ad["price"])
+        if price <= 0:
+            return None
+        last = _decimal(ad["lastQuantity"])
+        low, high = _decimal(ad["minAmount"]), min(_decimal(ad["maxAmount"]), last * price)
+        if high < low:
+            return None
+        amount = low + (high - low) * Decimal(str(self._rng.random()))
+        quantity = (amount / price).quantize(_QUANTITY_STEP, rounding=ROUND_DOWN)
+        if quantity <= 0:
+            return None
+        counterparty = self._rng.choice(self._counterparties)
+        payment_type = self._payment_type(self._rng.choice(ad["payments"])) if ad["payments"] else "14"
+        if ad["side"] == SIDE_SELL:
+            # The buyer pays to one of our payment methods
+            terms = [m for m in self.payment_methods if str(m["paymentType"]) == payment_type] or \
+                self.payment_methods[:1]
+        else:
+            terms = [{"id": str(next(self._ids)), "paymentType": payment_type, "bankName": "Bank Transfer",
+                      "realName": counterparty["realName"], "accountNo": f"CP{counterparty['userId']}"}]
+
+        order_id = str(next(self._ids))
+        order = {
+            "id": order_id, "itemId": ad["id"], "side": ad["side"], "tokenId": self.token_id,
+            "currencyId": self.currency_id, "price": str(price), "quantity": str(quantity),
+            "amount": str((quantity * price).quantize(_AMOUNT_STEP)), "status": STATUS_WAITING_PAYMENT,
+            "createDate": str(self.clock.time_ms()), "transferDate": "0", "paymentPeriod": ad["paymentPeriod"],
+            "userId": self.user["userId"], "nickName": self.user["nickName"],
+            "targetUserId": counterparty["userId"], "targetNickName": counterparty["nickName"],
+            "paymentTermList": [dict(term) for term in terms], "confirmedPayTerm": {},
+            "fee": "0", "notifyTokenId": self.token_id, "notifyTokenQuantity": str(quantity),
+        }
+        self._orders[order_id] = order
+        self._messages[order_id] = []
+        ad["lastQuantity"] = str(last - quantity)
+        ad["frozenQuantity"] = str(_decimal(ad["frozenQuantity"]) + quantity)
+        ad["orderNum"] += 1
+        self._counts["orders"] += 1
+
+        self._system_message(order_id, "Order created")
+        if self._rng.random() < self.chat_probability:
+            self._schedule(self._rng.uniform(5, 60), self._counterparty_message, order_id, _GREETINGS)
+        period = ad["paymentPeriod"] * 60
+        if ad["side"] == SIDE_SELL:
+            if self._rng.random() < self.cancel_probability:
+                self._schedule(self._rng.uniform(0.1, 0.9) * period, self._cancel, order_id, False)
+            else:
+                self._schedule(min(self._rng.uniform(*self.payment_delay), period * 0.95), self._buyer_pays,
+                               order_id)
+        if self._rng.random() < self.chat_probability:
+            self._schedule(self._rng.uniform(60, period), self._counterparty_message, order_id, _CHATTER)
+        self._schedule(period, self._expire, order_id)
+        return order
+
+    def _payment_type(self, payment_id):
+        for method in self.payment_methods:
+            if str(method["id"]) == str(payment_id):
+                return str(method["paymentType"])
+        return str(payment_id)
+
+    def _buyer_pays(self, order_id):
+        order = self._orders[order_id]
+        if order["status"] != STATUS_WAITING_PAYMENT:
+            return
+        order["status"] = STATUS_WAITING_RELEASE
+        order["transferDate"] = str(self.clock.time_ms())
+        order["confirmedPayTerm"] = order["paymentTermList"][0]
+        self._counterparty_message(order_id, _PAID_MESSAGES, always=True)
+
+    def _seller_releases(self, order_id):
+        order = self._orders[order_id]
+        if order["status"] == STATUS_WAITING_RELEASE:
+            self._finish(order)
+
+    def _expire(self, order_id):
+        if self._orders[order_id]["status"] == STATUS_WAITING_PAYMENT:
+            self._counts["expired"] += 1
+            self._cancel(order_id, True)
+
+    def _cancel(self, order_id, expired):
+        order = self._orders[order_id]
+        if order["status"] != STATUS_WAITING_PAYMENT:
+            return
+        order["status"] = STATUS_CANCELLED
+        self._counts["cancelled"] += 1
+        quantity = _decimal(order["quantity"])
+        ad = self._ads.get(order["itemId"])
+        ad["frozenQuantity"] = str(_decimal(ad["frozenQuantity"]) - quantity)
+        if ad["status"] == AD_STATUS_ONLINE:
+            ad["lastQuantity"] = str(_decimal(ad["lastQuantity"]) + quantity)
+        elif ad["side"] == SIDE_SELL:
+            self._locked -= quantity
+        self._system_message(order_id, "Order cancelled: payment period ended" if expired else
+                             "Order cancelled by the buyer")
+
+    def _finish(self, order):
+        order["status"] = STATUS_FINISHED
+        quantity = _decimal(order["quantity"])
+        ad = self._ads.get(order["itemId"])
+        ad["frozenQuantity"] = str(_decimal(ad["frozenQuantity"]) - quantity)
+        ad["executedQuantity"] = str(_decimal(ad["executedQuantity"]) + quantity)
+        ad["finishNum"] += 1
+        if order["side"] == SIDE_SELL:
+            self._total -= quantity
+            self._locked -= quantity
+        else:
+            self._total += quantity
+        volume = self._volume[order["side"]]
+        volume[0] += quantity
+        volume[1] += _decimal(order["amount"])
+        self._counts["finished"] += 1
+        self._system_message(order["id"], "Order completed")
+
+    # Chat
+
+    def _add_message(self, order_id, message, user_id, nickname, role, content_type="str", **extra):
+        messages = self._messages[order_id]
+        entry = {
+            "id": str(len(messages) + 1), "orderId": order_id, "message": message, "contentType": content_type,
+            "userId": user_id, "nickName": nickname, "roleType": role, "msgType": 1 if role != "sys" else 0,
+            "createDate": str(self.clock.time_ms()), "read": 0, "msgUuid": "", "fileName": "",
+        }
+        entry.update(extra)
+        messages.append(entry)
+        return entry
+
+    def _system_message(self, order_id, message):
+        self._add_message(order_id, message, "0", "System", "sys")
+
+    def _counterparty_message(self, order_id, choices, always=False):
+        order = self._orders[order_id]
+        if order["status"] not in PENDING_STATUSES or not (always or self._rng.random() < self.chat_probability):
+            return
+        self._add_message(order_id, self._rng.choice(choices), order["targetUserId"], order["targetNickName"],
+                          "user")
+        self._counts["messages_received"] += 1
+
+    # Requests
+
+    def handle(self, path, params):
+        """
+        Answer one API request.
+
+        :param path: Endpoint path, e.g. /v5/p2p/order/info
+        :param params: Decoded query or JSON body, None if it could not be decoded
+        :return: Response body dictionary, None for an unknown path
+        """
+
+        name = _HANDLERS.get(path)
+        if name is None:
+            return None
+        with self._lock:
+            self._requests[path] = self._requests.get(path, 0) + 1
+            if params is None:
+                ret_code, ret_msg, result = RET_CODE_PARAMS, "Invalid JSON", {}
+            else:
+                ret_code, ret_msg, result = getattr(self, name)(params)
+            return {"retCode": ret_code, "retMsg": ret_msg, "result": result, "retExtInfo": {},
+                    "time": self.clock.time_ms()}
+
+    def _public_ad(self, ad):
+        public = {k: v for k, v in ad.items() if not k.startswith("_")}
+        if not ad["_mine"]:
+            public["price"] = self._price(ad["_value"])
+        return public
+
+    def _page(self, items, params):
+        page, size = int(params.get("page") or 1), int(params.get("size") or 10)
+        return 0, "SUCCESS", {"count": len(items), "items": items[(page - 1) * size:page * size]}
+
+    def _my_ad(self, ad_id):
+        ad = self._ads.get(str(ad_id))
+        return ad if ad is not None and ad["_mine"] else None
+
+    def _lock_quantity(self, quantity):
+        if quantity > self._total - self._locked:
+            return False
+        self._locked += quantity
+        return True
+
+    def _get_current_balance(self, params):
+        coins = [{"coin": self.token_id, "walletBalance": str(self._total),
+                  "transferBalance": str(self._total - self._locked), "bonus": "0"}]
+        if params.get("coin") and params["coin"] != self.token_id:
+            coins = []
+        return 0, "success", {"accountType": params.get("accountType"), "balance": coins}
+
+    def _get_account_information(self, params):
+        finished = [o for o in self._orders.values() if o["status"] == STATUS_FINISHED]
+        return 0, "SUCCESS", dict(
+            self.user, isOnline=True, kycLevel=2, realName=self.user["nickName"],
+            totalFinishCount=len(finished),
+            totalFinishBuyCount=sum(1 for o in finished if o["side"] == SIDE_BUY),
+            totalFinishSellCount=sum(1 for o in finished if o["side"] == SIDE_SELL),
+            recentFinishCount=len(finished), accountCreateDays=1 + int((self.clock.time() - self.started) // 86400),
+        )
+
+    def _get_ads_list(self, params):
+        ads = [self._public_ad(ad) for ad in self._ads.values() if ad["_mine"]
+               and (not params.get("status") or str(ad["status"]) == str(params["status"]))
+               and (not params.get("side") or str(ad["side"]) == str(params["side"]))]
+        return self._page(ads[::-1], params)
+
+    def _get_ad_details(self, params):
+        ad = self._my_ad(params.get("itemId"))
+        if ad is None:
+            return RET_CODE_NOT_FOUND, "Ad does not exist", {}
+        return 0, "SUCCESS", self._public_ad(ad)
+
+    def _post_new_ad(self, params):
+        side = _side(params.get("side"))
+        if side is None:
+            return RET_CODE_PARAMS, "Invalid side", {}
+        if params.get("tokenId") != self.token_id or params.get("currencyId") != self.currency_id:
+            return RET_CODE_PARAMS, f"Only {self.token_id}/{self.currency_id} is simulated", {}
+        if _decimal(params.get("price")) <= 0 or _decimal(params.get("quantity")) <= 0:
+            return RET_CODE_PARAMS, "Invalid price or quantity", {}
+        if side == SIDE_SELL and not self._lock_quantity(_decimal(params.get("quantity"))):
+            return RET_CODE_PARAMS, "Insufficient balance", {}
+        ad = self._new_ad(side, self.user, params)
+        return 0, "SUCCESS", {"itemId": ad["id"], "securityRiskToken": "", "riskTokenType": "",
+                              "riskVersion": "", "needSecurityRisk": False}
+
+    def _update_ad(self, params):
+        ad = self._my_ad(params.get("id"))
+        if ad is None:
+            return RET_CODE_NOT_FOUND, "Ad does not exist", {}
+        # Work out the whole change in locked funds first, so a refused update leaves the ad as it was
+        activate = params.get("actionType") == "ACTIVE" and ad["status"] != AD_STATUS_ONLINE
+        online = activate or ad["status"] == AD_STATUS_ONLINE
+        last = _decimal(params["quantity"]) if "quantity" in params and online else _decimal(ad["lastQuantity"])
+        # quantity is what is left to trade; online sell ads lock it
+        locked = _decimal(ad["lastQuantity"]) if ad["status"] == AD_STATUS_ONLINE else 0
+        delta = last - locked if ad["side"] == SIDE_SELL and online else 0
+        if delta > 0 and not self._lock_quantity(delta):
+            return RET_CODE_PARAMS, "Insufficient balance", {}
+        if delta < 0:
+            self._locked += delta
+        if activate:
+            ad["status"], ad["isOnline"] = AD_STATUS_ONLINE, True
+        if "quantity" in params and online:
+            ad["lastQuantity"] = str(last)
+            ad["quantity"] = str(last + _decimal(ad["frozenQuantity"]) + _decimal(ad["executedQuantity"]))
+        for key in ("price", "premium", "minAmount", "maxAmount", "remark", "tradingPreferenceSet"):
+            if key in params:
+                ad[key] = params[key] if key == "tradingPreferenceSet" else str(params[key])
+        if "price" in params:
+            ad["_value"] = float(_decimal(params["price"]))
+        if "priceType" in params:
+            ad["priceType"] = int(params["priceType"])
+        if "paymentIds" in params:
+            ad["payments"] = [str(p) for p in params["paymentIds"]]
+        if "paymentPeriod" in params:
+            ad["paymentPeriod"] = int(params["paymentPeriod"])
+        return 0, "SUCCESS", {}
+
+    def _remove_ad(self, params):
+        ad = self._my_ad(params.get("itemId"))
+        if ad is None:
+            return RET_CODE_NOT_FOUND, "Ad does not exist", {}
+        if ad["status"] == AD_STATUS_ONLINE:
+            ad["status"], ad["isOnline"] = AD_STATUS_OFFLINE, False
+            if ad["side"] == SIDE_SELL:
+                self._locked -= _decimal(ad["lastQuantity"])
+        return 0, "SUCCESS", {}
+
+    def _simple_order(self, order):
+        item = {k: order[k] for k in _SIMPLE_ORDER_FIELDS}
+        item.update(orderType="ORIGIN", selfUnreadMsgCount="0", unreadMsgCount="0",
+                    transferLastSeconds=str(self._seconds_left(order)))
+        return item
+
+    def _seconds_left(self, order):
+        if order["status"] != STATUS_WAITING_PAYMENT:
+            return 0
+        deadline = int(order["createDate"]) / 1000 + order["paymentPeriod"] * 60
+        return max(0, int(deadline - self.clock.time()))
+
+    def _orders_matching(self, params, statuses=None):
+        orders = []
+        for order in reversed(self._orders.values()):
+            if statuses is not None and order["status"] not in statuses:
+                continue
+            if params.get("status") not in (None, "") and order["status"] != int(params["status"]):
+                continue
+            if params.get("side") not in (None, "") and order["side"] != int(params["side"]):
+                continue
+            if params.get("tokenId") and order["tokenId"] != params["tokenId"]:
+                continue
+            created = int(order["createDate"])
+            if params.get("beginTime") and created < int(params["beginTime"]):
+                continue
+            if params.get("endTime") and created > int(params["endTime"]):
+                continue
+            orders.append(self._simple_order(order))
+        return orders
+
+    def _get_orders(self, params):
+        return self._page(self._orders_matching(params), params)
+
+    def _get_pending_orders(self, params):
+        return self._page(self._orders_matching(params, PENDING_STATUSES), params)
+
+    def _order(self, params):
+        return self._orders.get(str(params.get("orderId")))
+
+    def _get_counterparty_info(self, params):
+        order = self._order(params)
+        if order is None or order["targetUserId"] != str(params.get("originalUid")):
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        counterparty = next(c for c in self._counterparties if c["userId"] == order["targetUserId"])
+        return 0, "SUCCESS", dict(counterparty)
+
+    def _get_order_details(self, params):
+        order = self._order(params)
+        if order is None:
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        details = dict(order)
+        details["transferLastSeconds"] = str(self._seconds_left(order))
+        return 0, "SUCCESS", details
+
+    def _release_assets(self, params):
+        order = self._order(params)
+        if order is None or order["side"] != SIDE_SELL or order["status"] != STATUS_WAITING_RELEASE:
+            return RET_CODE_ORDER_STATUS, "Order status error", {}
+        self._finish(order)
+        return 0, "SUCCESS", {}
+
+    def _mark_as_paid(self, params):
+        order = self._order(params)
+        if order is None or order["side"] != SIDE_BUY or order["status"] != STATUS_WAITING_PAYMENT:
+            return RET_CODE_ORDER_STATUS, "Order status error", {}
+        term = next((t for t in order["paymentTermList"] if t["id"] == str(params.get("paymentId"))
+                     and str(t["paymentType"]) == str(params.get("paymentType"))), None)
+        if term is None:
+            return RET_CODE_PARAMS, "Payment method does not match the order", {}
+        order["status"] = STATUS_WAITING_RELEASE
+        order["transferDate"] = str(self.clock.time_ms())
+        order["confirmedPayTerm"] = term
+        self._system_message(order["id"], "Buyer marked the order as paid")
+        self._schedule(self._rng.uniform(*self.release_delay), self._seller_releases, order["id"])
+        return 0, "SUCCESS", {}
+
+    def _get_chat_messages(self, params):
+        messages = self._messages.get(str(params.get("orderId")))
+        if messages is None:
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        if params.get("startMessageId"):
+            messages = messages[:max(0, int(params["startMessageId"]) - 1)]
+        return 0, "SUCCESS", {"result": messages[-int(params.get("size") or 30):][::-1]}
+
+    def _upload_chat_file(self, params):
+        name = params.get("upload_file") or "file"
+        return 0, "SUCCESS", {"url": f"/simulator/{next(self._ids)}/{name}", "type": "pic"}
+
+    def _send_chat_message(self, params):
+        order = self._order(params)
+        if order is None:
+            return RET_CODE_NOT_FOUND, "Order does not exist", {}
+        self._add_message(order["id"], params.get("message"), self.user["userId"], self.user["nickName"], "user",
+                          params.get("contentType") or "str", msgUuid=params.get("msgUuid") or "",
+                          fileName=params.get("fileName") or "")
+        self._counts["messages_sent"] += 1
+        self._schedule(self._rng.uniform(10, 120), self._counterparty_message, order["id"], _CHATTER)
+        return 0, "SUCCESS", {}
+
+    def _get_online_ads(self, params):
+        side = _side(params.get("side"))
+        if side is None:
+            return RET_CODE_PARAMS, "Invalid side", {}
+        if params.get("tokenId") != self.token_id or params.get("currencyId") != self.currency_id:
+            return self._page([], params)
+        return self._page([self._public_ad(ad) for ad in self._book(side)], params)
+
+    def _get_user_payment_types(self, params):
+        return 0, "SUCCESS", [dict(row) for row in self.payment_methods]
+
+    def _get_server_time(self, params):
+        return 0, "OK", {"timeSecond": str(int(self.clock.time())), "timeNano": str(int(self.clock.time() * 1e9))}
+
+    # Reporting
+
+    def stats(self):
+        """
+        :return: Dictionary with the virtual time elapsed, order counts, traded volume
+            and average price per side, balance, chat counts and API calls per path
+        """
+
+        with self._lock:
+            volume = {}
+            for side, name in ((SIDE_BUY, "bought"), (SIDE_SELL, "sold")):
+                quantity, amount = self._volume[side]
+                volume[name] = {"quantity": str(quantity), "amount": str(amount),
+                                "average_price": str((amount / quantity).quantize(self.price_step))
+                                if quantity else None}
+            return dict(
+                self._counts,
+                elapsed=self.clock.time() - self.started,
+                pending=sum(1 for o in self._orders.values() if o["status"] in PENDING_STATUSES),
+                volume=volume,
+                balance={"total": str(self._total), "locked": str(self._locked)},
+                reference_price=self.reference_price,
+                requests=dict(self._requests),
+            )
+
+
+# Endpoint path -> handler, one per P2PRequests method
+_HANDLERS = {method.url: f"_{method.name.lower()}" for method in P2PMethods.all()}
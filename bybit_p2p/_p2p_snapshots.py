@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+def default_directory():
+    """
+    Snapshot directory shared by the processes of one host: on tmpfs (/dev/shm) where
+    available, so snapshots live in shared memory, otherwise in the temp directory.
+    """
+
+    if os.path.isdir("/dev/shm"):
+        base = "/dev/shm"
+    else:
+        import tempfile
+
+        base = tempfile.gettempdir()
+    return os.path.join(base, "bybit_p2p_snapshots")
+
+
+class Snapshot:
+    """
+    One stored snapshot: the JSON file at `path`, its `size` in bytes, its `etag`
+    (hex hash of the content, unquoted) and `modified` time, i.e. when the content
+    last changed.
+    """
+
+    __slots__ = ("name", "path", "size", "etag", "modified", "_key")
+
+    def __init__(self, name, path, size, etag, modified, key):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.modified = modified
+        self._key = key
+
+    def open(self):
+        """
+        :return: Binary file object. The content stays consistent while it is open,
+            even if the snapshot is replaced meanwhile.
+        """
+
+        return open(self.path, "rb")
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+    def json(self):
+        return json.loads(self.read())
+
+
+class SnapshotStore:
+    """
+    JSON snapshots (balance, ads, orders, ...) shared between processes through files.
+
+    A writer replaces a snapshot atomically (temporary file and rename), and only when
+    its content changed, so readers in other processes never see a partial file, and a
+    snapshot's ETag and modification time change exactly when its data does. Readers
+    need one `stat` per lookup; the ETag is hashed once per file version. Web servers
+    can hand `Snapshot.open()` to `sendfile`-capable responses, so snapshot bytes go
+    from the (by default tmpfs-backed) file to the socket without being copied into
+    Python.
+
+    :param directory: Snapshot directory, `default_directory()` if None
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_directory()
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def path(self, name):
+        if not name or os.sep in name or name.startswith("."):
+            raise ValueError(f"Invalid snapshot name: {name!r}")
+        return os.path.join(self.directory, name + ".json")
+
+    def write(self, name, data):
+        """
+        Store `data` as snapshot `name`, unless it equals the stored content.
+
+        :param data: JSON-serializable object, or bytes already encoded
+        :return: True if the snapshot changed
+        """
+
+        body = data if isinstance(data, bytes) else json.dumps(data, separators=(",", ":"), default=str).encode()
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        current = self.get(name)
+        if current is not None and current.etag == digest:
+            return False
+
+        path = self.path(name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+        return True
+
+    def get(self, name):
+        """
+        :return: Snapshot, or None if `name` was never written
+        """
+
+        path = self.path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        snapshot = self._cache.get(name)
+        if snapshot is not None and snapshot._key == key:
+            return snapshot
+        try:
+            with open(path, "rb") as f:
+                # Hash what was opened: the file may be replaced after the stat
+                body = f.read()
+                st = os.fstat(f.fileno())
+        except FileNotFoundError:
+            return None
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        snapshot = Snapshot(name, path, len(body), etag, st.st_mtime, (st.st_ino, st.st_size, st.st_mtime_ns))
+        with self._lock:
+            self._cache[name] = snapshot
+        return snapshot
+
+    def names(self):
+        return sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith(".json"))
+
+
+class SnapshotFetcher:
+    """
+    Refreshes snapshots from the API in a background thread.
+
+    With several processes serving the same store (e.g. gunicorn workers), pass a
+    `LeaderLease` on a shared backend: only the lease holder calls the API, so API
+    usage does not grow with the number of processes, and another process takes over
+    within the lease `ttl` if the leader dies. A failing source keeps its previous
+    snapshot.
+
+    :param store: SnapshotStore
+    :param sources: Dictionary {snapshot name: callable returning the data}
+    :param interval: Seconds between refreshes
+    :param lease: LeaderLease, None if this is the only fetcher
+    """
+
+    def __init__(self, store, sources, interval=5.0, lease=None):
+        self.store = store
+        self.sources = dict(sources)
+        self.interval = interval
+        self._lease = lease
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def refresh(self):
+        """
+        Fetch every source once, if this process leads.
+
+        :return: Names of the snapshots that changed, None if another process leads
+        """
+
+        if self._lease is not None and not self._lease.acquire():
+            return None
+        changed = []
+        for name, fetch in self.sources.items():
+            try:
+                data = fetch()
+            except Exception as e:
+                self.failures += 1
+                _logger.warning("Snapshot %s refresh failed: %s", name, e)
+                continue
+            if self.store.write(name, data):
+                changed.append(name)
+        self.refreshes += 1
+        return changed
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bybit-p2p-snapshots", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lease is not None:
+            self._lease.release()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception:
+                _logger.exception("Snapshot refresh failed")
+            if self._stop.wait(max(0.0, self.interval - (time.monotonic() - started))):
+                return
@@ -0,0 +1,524 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def default_owner():
+    """
+    Identity of this process in leases: host, PID and a random suffix.
+    """
+
+    import socket
+    import uuid
+
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _refill(tokens, updated, now, rate, capacity):
+    if tokens is None:
+        return float(capacity)
+    return min(float(capacity), tokens + max(0.0, now - updated) * rate)
+
+
+class StateBackend:
+    """
+    Key/value state shared between processes, with the atomic operations the client
+    needs: expiring values, counters, token buckets and leases.
+
+    Values are str or bytes; `get` returns what was stored as bytes.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key, amount=1, ttl=None):
+        """
+        Add to an integer counter, creating it (with `ttl` seconds to live) if needed.
+
+        :return: New value
+        """
+
+        raise NotImplementedError
+
+    def take_tokens(self, key, rate, capacity, tokens=1):
+        """
+        Take tokens from a token bucket if enough are available. `tokens=0` only reads.
+
+        :return: Tuple of (taken, tokens left)
+        """
+
+        raise NotImplementedError
+
+    def acquire_lease(self, key, owner, ttl):
+        """
+        Take or renew a lease: succeeds if the lease is free, expired or held by `owner`.
+
+        :param key: Lease name
+        :param owner: Identity of the caller, see `default_owner`
+        :param ttl: Seconds until the lease expires unless renewed
+        :return: True if `owner` holds the lease
+        """
+
+        raise NotImplementedError
+
+    def release_lease(self, key, owner):
+        raise NotImplementedError
+
+    def get_json(self, key):
+        value = self.get(key)
+        return None if value is None else json.loads(value)
+
+    def set_json(self, key, value, ttl=None):
+        self.set(key, json.dumps(value, separators=(",", ":")), ttl)
+
+    def close(self):
+        pass
+
+
+def _as_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else bytes(value)
+
+
+class MemoryBackend(StateBackend):
+    """
+    State in this process only. Useful for tests and single-process deployments.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _read(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= now:
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._read(key, time.time())
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (_as_bytes(value), time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._lock:
+            now = time.time()
+            current = self._read(key, now)
+            if current is None:
+                value, expires = amount, now + ttl if ttl else None
+            else:
+                value, expires = int(current) + amount, self._data[key][1]
+            self._data[key] = (str(value).encode(), expires)
+            return value
+
+    def take_tokens(self, key, rate, capacity, tokens=1):
+        with self._lock:
+            now = time.time()
+            bucket = self._data.get(key)
+            available = _refill(*(bucket[0] if bucket else (None, 0)), now, rate, capacity)
+            taken = available >= tokens
+            if taken:
+                available -= tokens
+            self._data[key] = ((available, now), None)
+            return taken, available
+
+    def acquire_lease(self, key, owner, ttl):
+        with self._lock:
+            now = time.time()
+            holder = self._read(key, now)
+            if holder is not None and holder != _as_bytes(owner):
+                return False
+            self._data[key] = (_as_bytes(owner), now + ttl)
+            return True
+
+    def release_lease(self, key, owner):
+        with self._lock:
+            if self._read(key, time.time()) == _as_bytes(owner):
+                del self._data[key]
+
+
+class SQLiteBackend(StateBackend):
+    """
+    State in an SQLite database file, shared by all processes on one host.
+    Every operation is one `BEGIN IMMEDIATE` transaction, so read-modify-write
+    operations are atomic across processes.
+
+    :param path: Database file
+    :param timeout: Seconds to wait for a lock held by another process
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self._timeout = timeout
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            import sqlite3
+
+            db = self._local.db = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _read(db, key, now):
+        row = db.execute("SELECT value, expires FROM state WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return row[0]
+
+    @staticmethod
+    def _write(db, key, value, expires):
+        db.execute("INSERT OR REPLACE INTO state (key, value, expires) VALUES (?, ?, ?)", (key, value, expires))
+
+    def get(self, key):
+        value = self._read(self._db, key, time.time())
+        return None if value is None else bytes(value)
+
+    def set(self, key, value, ttl=None):
+        self._write(self._db, key, _as_bytes(value), time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        self._db.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._transaction() as db:
+            now = time.time()
+            row = db.execute("SELECT value, expires FROM state WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                value, expires = amount, now + ttl if ttl else None
+            else:
+                value, expires = int(row[0]) + amount, row[1]
+            self._write(db, key, str(value).encode(), expires)
+            return value
+
+    def take_tokens(self, key, rate, capacity, tokens=1):
+        with self._transaction() as db:
+            now = time.time()
+            current = self._read(db, key, now)
+            state = json.loads(current) if current is not None else (None, 0)
+            available = _refill(*state, now, rate, capacity)
+            taken = available >= tokens
+            if taken:
+                available -= tokens
+            self._write(db, key, json.dumps((available, now)).encode(), None)
+            return taken, available
+
+    def acquire_lease(self, key, owner, ttl):
+        with self._transaction() as db:
+            now = time.time()
+            holder = self._read(db, key, now)
+            if holder is not None and bytes(holder) != _as_bytes(owner):
+                return False
+            self._write(db, key, _as_bytes(owner), now + ttl)
+            return True
+
+    def release_lease(self, key, owner):
+        self._db.execute("DELETE FROM state WHERE key = ? AND value = ?", (key, _as_bytes(owner)))
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class RedisError(Exception):
+    pass
+
+
+# KEYS[1] bucket; ARGV rate, capacity, tokens. Time comes from the server, so clock
+# skew between clients does not change the shared budget.
+_TOKEN_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate, capacity, tokens = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local available = capacity
+if state[1] then
+  available = math.min(capacity, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * rate)
+end
+local taken = 0
+if available >= tokens then
+  available = available - tokens
+  taken = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(available), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 2000) + 1000)
+return {taken, tostring(available)}
+"""
+
+# KEYS[1] counter; ARGV amount, ttl (ms, 0 for none)
+_INCR_SCRIPT = """
+local created = redis.call('EXISTS', KEYS[1]) == 0
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if created and tonumber(ARGV[2]) > 0 then
+  redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+# KEYS[1] lease; ARGV owner, ttl (ms)
+_LEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# Commands safe to send again after a lost connection
+_RETRIED_COMMANDS = frozenset({"GET", "EXISTS", "PTTL", "TIME", "PING"})
+
+
+class RedisBackend(StateBackend):
+    """
+    State in Redis (or any server speaking its protocol), shared across hosts.
+
+    Talks RESP over a plain socket, one connection per thread, so no Redis client
+    package is needed. Counters, token buckets and leases run as Lua scripts, which
+    makes them atomic on the server.
+
+    :param host: Server host
+    :param port: Server port
+    :param db: Database number
+    :param password: Password, None for no AUTH
+    :param prefix: Prefix of every key
+    :param timeout: Socket timeout in seconds
+    """
+
+    def __init__(self, host="localhost", port=6379, db=0, password=None, prefix="bybit_p2p:", timeout=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self._password = password
+        self.prefix = prefix
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        import socket
+
+        sock = socket.create_connection((self.host, self.port), timeout=self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        self._local.connection = connection
+        if self._password is not None:
+            self._roundtrip(connection, ("AUTH", self._password))
+        if self.db:
+            self._roundtrip(connection, ("SELECT", self.db))
+        return connection
+
+    @staticmethod
+    def _encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @classmethod
+    def _read_reply(cls, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(rest.decode("utf-8"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [cls._read_reply(reader) for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _roundtrip(self, connection, args):
+        sock, reader = connection
+        sock.sendall(self._encode(args))
+        return self._read_reply(reader)
+
+    def command(self, *args):
+        """
+        Send one command and return its reply. Reads are retried once on a fresh
+        connection if the connection was lost; other commands are not, since the
+        server may have run them before the connection dropped.
+        """
+
+        connection = getattr(self._local, "connection", None)
+        attempts = 2 if str(args[0]).upper() in _RETRIED_COMMANDS else 1
+        for attempt in range(attempts):
+            if connection is None:
+                connection = self._connect()
+            try:
+                return self._roundtrip(connection, args)
+            except (ConnectionError, OSError):
+                self.close()
+                connection = None
+                if attempt == attempts - 1:
+                    raise
+
+    def get(self, key):
+        return self.command("GET", self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        args = ["SET", self.prefix + key, _as_bytes(value)]
+        if ttl:
+            args += ["PX", int(ttl * 1000)]
+        self.command(*args)
+
+    def delete(self, key):
+        self.command("DEL", self.prefix + key)
+
+    def incr(self, key, amount=1, ttl=None):
+        return self.command("EVAL", _INCR_SCRIPT, 1, self.prefix + key, amount, int(ttl * 1000) if ttl else 0)
+
+    def take_tokens(self, key, rate, capacity, tokens=1):
+        taken, available = self.command("EVAL", _TOKEN_SCRIPT, 1, self.prefix + key, rate, capacity, tokens)
+        return bool(taken), float(available)
+
+    def acquire_lease(self, key, owner, ttl):
+        return bool(self.command("EVAL", _LEASE_SCRIPT, 1, self.prefix + key, owner, int(ttl * 1000)))
+
+    def release_lease(self, key, owner):
+        self.command("EVAL", _RELEASE_SCRIPT, 1, self.prefix + key, owner)
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.connection = None
+            try:
+                connection[1].close()
+                connection[0].close()
+            except OSError:
+                pass
+
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in a StateBackend, so every process sharing the backend draws
+    from one budget. Drop-in for TokenBucket in `rate_limiters` and as a
+    PollingScheduler budget.
+
+    :param backend: StateBackend
+    :param name: Bucket name
+    :param rate: Tokens added per second
+    :param capacity: Bucket size, defaults to `rate`
+    """
+
+    def __init__(self, backend, name, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._backend = backend
+        self._key = f"bucket:{name}"
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+
+    @property
+    def available(self):
+        return self._backend.take_tokens(self._key, self.rate, self.capacity, 0)[1]
+
+    def try_acquire(self, tokens=1):
+        return self._backend.take_tokens(self._key, self.rate, self.capacity, tokens)[0]
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Take tokens, waiting for the bucket to refill if needed.
+
+        :return: True if the tokens were taken, False on timeout
+        """
+
+        if tokens > self.capacity:
+            raise ValueError("Cannot acquire more tokens than the bucket capacity")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            taken, available = self._backend.take_tokens(self._key, self.rate, self.capacity, tokens)
+            if taken:
+                return True
+            wait = (tokens - available) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class LeaderLease:
+    """
+    Leader election over a StateBackend: the process holding the lease is the leader
+    until it stops renewing it for `ttl` seconds.
+
+    :param backend: StateBackend
+    :param name: Lease name, one leader per name
+    :param ttl: Seconds the lease lasts without renewal
+    :param owner: Identity of this process, `default_owner()` if None
+    """
+
+    def __init__(self, backend, name, ttl=15.0, owner=None):
+        self._backend = backend
+        self._key = f"lease:{name}"
+        self.ttl = ttl
+        self.owner = owner or default_owner()
+
+    def acquire(self):
+        """
+        Take or renew the lease.
+
+        :return: True if this process is the leader
+        """
+
+        return self._backend.acquire_lease(self._key, self.owner, self.ttl)
+
+    def release(self):
+        self._backend.release_lease(self._key, self.owner)
@@ -0,0 +1,316 @@
+import json
+import threading
+from urllib.parse import urlsplit
+
+from ._p2p_compression import CHUNK_SIZE, MAX_BODY_SIZE, CompressionStats, accept_encoding, read_body
+
+
+class TransportRequest:
+    """
+    A signed request, ready to be sent: method, full URL, headers and body bytes.
+    """
+
+    __slots__ = ("method", "url", "headers", "body")
+
+    def __init__(self, method, url, headers, body=None):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+    def __repr__(self):
+        return f"TransportRequest({self.method} {self.url})"
+
+
+class TransportResponse:
+    """
+    What a transport returns: status code, headers and raw body bytes.
+    """
+
+    __slots__ = ("status_code", "headers", "content")
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Transport:
+    """
+    Sends signed requests. Implementations only move bytes: signing, headers and
+    response handling stay in `P2PManager`.
+    """
+
+    def send(self, request):
+        """
+        :param request: TransportRequest
+        :return: TransportResponse
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class AsyncTransport:
+    """
+    Asynchronous counterpart of `Transport`, used by `P2PManager.http_req_handler_async`.
+    """
+
+    async def send(self, request):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Transport over a `requests.Session` (the default).
+
+    Requests are handed to `Session.send` already prepared: headers are merged with the
+    session defaults once, and the per-call `prepare_request` merging of cookies, auth
+    and headers is skipped. Environment proxy settings are resolved once per host.
+
+    With `compress`, every decodable coding (gzip, deflate, and br/zstd when their
+    libraries are installed) is offered, response bodies are decompressed as they are
+    read, and `compression` counts bytes received versus decoded. Reading stops with
+    ResponseTooLargeError once a decoded body exceeds `max_body_size`.
+
+    :param session: requests.Session, created on first use if None
+    :param verify: Verify SSL certificates, used when the session is created here
+    :param timeout: Seconds (or a (connect, read) tuple), None waits indefinitely
+    :param compress: Negotiate response compression, otherwise request identity
+        bodies (still counted in `compression`)
+    :param max_body_size: Largest decoded response body in bytes, None for no limit
+    """
+
+    def __init__(self, session=None, verify=True, timeout=None, compress=True, max_body_size=MAX_BODY_SIZE):
+        self._session = session
+        self._verify = verify
+        self._timeout = timeout
+        self._compress = compress
+        self._max_body_size = max_body_size
+        self.compression = CompressionStats()
+        self._base_headers = None
+        self._proxies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            from ._p2p_manager import create_session
+
+            self._session = create_session(verify=self._verify)
+        return self._session
+
+    def _proxies_for(self, url):
+        host = urlsplit(url)[:2]
+        proxies = self._proxies.get(host)
+        if proxies is None:
+            from requests.utils import resolve_proxies
+
+            session = self.session
+            probe = TransportRequest("GET", url, {})
+            proxies = self._proxies[host] = resolve_proxies(probe, session.proxies, session.trust_env)
+        return proxies
+
+    def send(self, request):
+        from requests.models import PreparedRequest
+        from requests.structures import CaseInsensitiveDict
+
+        session = self.session
+        if self._base_headers is None:
+            with self._lock:
+                self._base_headers = dict(session.headers)
+
+        prepared = PreparedRequest()
+        prepared.method = request.method
+        prepared.url = request.url
+        prepared.headers = CaseInsensitiveDict(self._base_headers)
+        prepared.headers.update(request.headers)
+        if request.body is not None:
+            prepared.headers["Content-Length"] = str(len(request.body))
+        prepared.body = request.body
+        # Without compress, ask for identity explicitly: the session's default
+        # "gzip, deflate" would be decoded by requests behind our back
+        prepared.headers["Accept-Encoding"] = accept_encoding() if self._compress else "identity"
+
+        response = session.send(prepared, timeout=self._timeout, proxies=self._proxies_for(request.url),
+                                stream=True)
+        raw = response.raw
+        encoding = response.headers.get("Content-Encoding")
+        try:
+            content, received = read_body(raw.stream(CHUNK_SIZE, decode_content=False), encoding,
+                                          self._max_body_size)
+        except BaseException:
+            # The rest of the body is still on the wire; do not reuse the connection
+            raw.close()
+            raise
+        finally:
+            raw.release_conn()
+        self.compression.record(encoding, received, len(content))
+        return TransportResponse(response.status_code, response.headers, content)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport over a bare `urllib3.PoolManager`, skipping the requests layer entirely.
+    Environment proxy variables are not honoured. Compression and `max_body_size`
+    work as in `RequestsTransport`.
+
+    :param maxsize: Kept-alive connections per host
+    :param verify: Verify SSL certificates
+    :param timeout: Seconds, None waits indefinitely
+    :param compress: Negotiate response compression
+    :param max_body_size: Largest decoded response body in bytes, None for no limit
+    """
+
+    def __init__(self, maxsize=10, verify=True, timeout=None, compress=True, max_body_size=MAX_BODY_SIZE):
+        import urllib3
+
+        self._timeout = urllib3.Timeout(total=timeout) if timeout else urllib3.Timeout.DEFAULT_TIMEOUT
+        self._pool = urllib3.PoolManager(
+            maxsize=maxsize,
+            block=False,
+            cert_reqs="CERT_REQUIRED" if verify else "CERT_NONE",
+            retries=False,
+        )
+        self._headers = {"Accept": "application/json", "Connection": "keep-alive"}
+        self._headers["Accept-Encoding"] = accept_encoding() if compress else "identity"
+        self._max_body_size = max_body_size
+        self.compression = CompressionStats()
+
+    def send(self, request):
+        headers = dict(self._headers)
+        headers.update(request.headers)
+        response = self._pool.request(
+            request.method,
+            request.url,
+            body=request.body,
+            headers=headers,
+            timeout=self._timeout,
+            redirect=False,
+            preload_content=False,
+            decode_content=False,
+        )
+        encoding = response.headers.get("Content-Encoding")
+        try:
+            content, received = read_body(response.stream(CHUNK_SIZE, decode_content=False), encoding,
+                                          self._max_body_size)
+        except BaseException:
+            # The rest of the body is still on the wire; do not reuse the connection
+            response.close()
+            raise
+        finally:
+            response.release_conn()
+        self.compression.record(encoding, received, len(content))
+        return TransportResponse(response.status, response.headers, content)
+
+    def close(self):
+        self._pool.clear()
+
+
+class HttpxAsyncTransport(AsyncTransport):
+    """
+    Asynchronous transport over `httpx.AsyncClient` (optional dependency).
+
+    :param timeout: Seconds, None waits indefinitely
+    :param verify: Verify SSL certificates
+    :param max_connections: Connection pool size
+    """
+
+    def __init__(self, timeout=None, verify=True, max_connections=100):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("HttpxAsyncTransport requires httpx: pip install httpx") from None
+
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            verify=verify,
+            limits=httpx.Limits(max_connections=max_connections),
+            headers={"Accept": "application/json"},
+        )
+        self.compression = CompressionStats()
+
+    async def send(self, request):
+        response = await self._client.request(
+            request.method, request.url, content=request.body, headers=request.headers
+        )
+        # httpx negotiates and decodes compression itself
+        self.compression.record(response.headers.get("Content-Encoding"), response.num_bytes_downloaded,
+                                len(response.content))
+        return TransportResponse(response.status_code, response.headers, response.content)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class ThreadedAsyncTransport(AsyncTransport):
+    """
+    Asynchronous wrapper running a blocking transport in the event loop's executor.
+    Works without extra dependencies.
+
+    :param transport: Blocking Transport, a RequestsTransport if None
+    """
+
+    def __init__(self, transport=None):
+        self._transport = transport or RequestsTransport()
+
+    async def send(self, request):
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(None, self._transport.send, request)
+
+    async def close(self):
+        self._transport.close()
+
+
+class MockTransport(Transport):
+    """
+    In-memory transport for tests. Routes map (method, path) to a response body dict,
+    or to a callable `(request, payload) -> body dict | TransportResponse`, where
+    `payload` is the decoded JSON body (or None). Every request is kept in `requests`.
+
+    :param routes: Dictionary {(method, path): body or callable}
+    :param default: Body or callable for unrouted requests; unrouted requests get 404 if None
+    """
+
+    def __init__(self, routes=None, default=None):
+        self.routes = dict(routes or {})
+        self.default = default
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def add(self, method, path, response):
+        self.routes[(method.upper(), path)] = response
+
+    def send(self, request):
+        with self._lock:
+            self.requests.append(request)
+        path = urlsplit(request.url).path
+        handler = self.routes.get((request.method, path), self.default)
+        if handler is None:
+            return TransportResponse(404, {}, b"Not Found")
+        if callable(handler):
+            try:
+                payload = json.loads(request.body) if request.body else None
+            except ValueError:
+                payload = None
+            handler = handler(request, payload)
+        if isinstance(handler, TransportResponse):
+            return handler
+        return TransportResponse(200, {"Content-Type": "application/json"}, json.dumps(handler).encode())
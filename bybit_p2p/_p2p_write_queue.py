@@ -0,0 +1,149 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class _PendingUpdate:
+    __slots__ = ("params", "futures", "due")
+
+    def __init__(self, params, due):
+        self.params = params
+        self.futures = []
+        self.due = due
+
+
+class AdUpdateQueue:
+    """
+    Coalesces `update_ad` calls per ad.
+
+    Updates for the same ad `id` submitted within `window` seconds of the first one are
+    merged into a single request carrying the latest value of every field; superseded
+    writes are never sent. Every caller gets a Future that resolves with the response
+    (or exception) of the request its update was merged into. Writes for one ad are
+    sent one at a time and in submission order; different ads are written concurrently.
+    `submitted`, `coalesced` and `sent` count updates queued, updates merged into
+    another one, and requests made.
+
+    :param api: P2P client
+    :param window: Seconds an update waits for later updates to the same ad
+    :param rate_limiter: TokenBucket acquired before each write, None for no extra pacing
+    :param max_workers: Writes in flight at the same time
+    """
+
+    def __init__(self, api, window=0.5, rate_limiter=None, max_workers=4):
+        self._api = api
+        self.window = window
+        self._rate_limiter = rate_limiter
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bybit-p2p-ad-writer")
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._inflight = set()
+        self._closed = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.sent = 0
+        self._thread = threading.Thread(target=self._run, name="bybit-p2p-ad-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, **params):
+        """
+        Queue an ad update. Takes the same parameters as `update_ad`.
+
+        :key id: Advertisement ID
+        :return: concurrent.futures.Future resolving to the response dictionary
+        """
+
+        if "id" not in params:
+            raise ValueError("update_ad requires an ad id")
+        ad_id = str(params["id"])
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("AdUpdateQueue is closed")
+            update = self._pending.get(ad_id)
+            if update is None:
+                update = self._pending[ad_id] = _PendingUpdate({}, time.monotonic() + self.window)
+            else:
+                self.coalesced += 1
+            update.params.update(params)
+            update.futures.append(future)
+            self.submitted += 1
+            self._cond.notify()
+        return future
+
+    def update_ad(self, **params):
+        """
+        Blocking form of `submit`.
+
+        :return: Response dictionary
+        """
+
+        return self.submit(**params).result()
+
+    def flush(self, timeout=None):
+        """
+        Send every queued update now and wait until all writes are done.
+
+        :return: True if the queue drained within `timeout`
+        """
+
+        with self._cond:
+            now = time.monotonic()
+            for update in self._pending.values():
+                update.due = min(update.due, now)
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout)
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ready(self, now):
+        ready = [(ad_id, update) for ad_id, update in self._pending.items()
+                 if update.due <= now and ad_id not in self._inflight]
+        for ad_id, _ in ready:
+            del self._pending[ad_id]
+            self._inflight.add(ad_id)
+        return ready
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    ready = self._ready(now)
+                    if ready or (self._closed and not self._pending):
+                        break
+                    waiting = [u.due for ad_id, u in self._pending.items() if ad_id not in self._inflight]
+                    self._cond.wait(max(0.0, min(waiting) - now) if waiting else None)
+                if not ready:
+                    return
+            for ad_id, update in ready:
+                self._executor.submit(self._send, ad_id, update)
+
+    def _send(self, ad_id, update):
+        try:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            response = self._api.update_ad(**update.params)
+        except Exception as e:
+            for future in update.futures:
+                future.set_exception(e)
+        else:
+            for future in update.futures:
+                future.set_result(response)
+        finally:
+            with self._cond:
+                self._inflight.discard(ad_id)
+                self.sent += 1
+                self._cond.notify_all()
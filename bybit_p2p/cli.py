@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ._exceptions import FailedRequestError
+from ._p2p_helper import P2PMethods
+from ._p2p_pagination import DEFAULT_PAGE_SIZE, iter_items
+from ._p2p_manager import create_session
+from .p2p import P2P
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _command_name(method):
+    return method.name.lower()
+
+
+def _parse_params(pairs, json_params=None):
+    # key=value passes a string, key:=value passes raw JSON (numbers, lists, objects)
+    params = dict(json.loads(json_params)) if json_params else {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep or not key.rstrip(":"):
+            raise ValueError(f"Expected key=value or key:=json, got: {pair}")
+        if key.endswith(":"):
+            params[key[:-1]] = json.loads(value)
+        else:
+            params[key] = value
+    return params
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _error_dict(e):
+    if isinstance(e, FailedRequestError):
+        return {"message": e.message, "code": e.status_code}
+    return {"message": str(e), "code": None}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="bybit-p2p",
+        description="Bybit P2P API from the command line. Responses are printed as JSON lines.",
+    )
+    parser.add_argument("--testnet", action="store_true", help="Use Testnet instead of Mainnet")
+    parser.add_argument("--api-key", default=os.getenv("BYBIT_API_KEY", ""),
+                        help="API key (default: $BYBIT_API_KEY)")
+    parser.add_argument("--api-secret", default=os.getenv("BYBIT_API_SECRET", ""),
+                        help="API secret or RSA private key (default: $BYBIT_API_SECRET)")
+    parser.add_argument("--rsa", action="store_true", help="Sign requests with RSA")
+    parser.add_argument("--domain", default=None, help="API domain, e.g. bybit or bytick")
+    parser.add_argument("--tld", default=None, help="API top-level domain, e.g. com, kz, tr")
+    parser.add_argument("--recv-window", type=int, default=5000)
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    for method in P2PMethods.all():
+        doc = (getattr(P2P, _command_name(method)).__doc__ or "").strip().splitlines()
+        sub = commands.add_parser(
+            _command_name(method),
+            aliases=[_command_name(method).replace("_", "-")],
+            help=doc[0] if doc else None,
+        )
+        sub.set_defaults(method=method)
+        sub.add_argument("params", nargs="*", metavar="key=value",
+                         help="Request parameters: key=value for strings, key:=value for JSON values")
+        sub.add_argument("--json", dest="json_params", default=None,
+                         help="Request parameters as a JSON object")
+        if method.paginated:
+            sub.add_argument("--all-pages", action="store_true",
+                             help="Fetch every page and print one item per line")
+            sub.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+
+    batch = commands.add_parser(
+        "batch",
+        help="Execute JSON-lines requests from stdin concurrently",
+        description=(
+            "Reads one request per line from stdin: "
+            '{"id": ..., "method": "get_order_details", "params": {...}}. '
+            "Prints one JSON line per request, in completion order unless --ordered is set."
+        ),
+    )
+    batch.set_defaults(method=None)
+    batch.add_argument("--workers", type=int, default=8, help="Concurrent requests")
+    batch.add_argument("--ordered", action="store_true", help="Print results in input order")
+
+    loadtest = commands.add_parser(
+        "loadtest",
+        help="Load-test the client against a mock server and print a JSON report",
+        description=(
+            "Runs a mix of scenarios (poll_pending, read_chat, send_message, mark_paid, release, reprice) "
+            "from concurrent workers against --url, or against an in-process mock server if --url is not given, "
+            "and prints throughput, latency percentiles, errors, memory and file descriptor counts as JSON."
+        ),
+    )
+    loadtest.set_defaults(method=None)
+    loadtest.add_argument("--url", default=None, help="Base URL of the server under test (default: in-process mock)")
+    loadtest.add_argument("--concurrency", type=int, default=50, help="Worker threads")
+    loadtest.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    loadtest.add_argument("--mix", default=None,
+                          help="Scenario weights, e.g. poll_pending=5,release=1 (default: a polling-heavy mix)")
+    loadtest.add_argument("--transport", choices=["requests", "urllib3"], default="requests")
+    loadtest.add_argument("--no-compress", action="store_true", help="Do not negotiate response compression")
+    loadtest.add_argument("--trace-memory", action="store_true", help="Measure allocations with tracemalloc")
+    loadtest.add_argument("--orders", type=int, default=200, help="Pending orders on the mock server")
+    loadtest.add_argument("--server-latency", type=float, default=0.0, help="Seconds added by the mock server")
+    loadtest.add_argument("--server-error-rate", type=float, default=0.0,
+                          help="Fraction of mock server responses that are HTTP 503")
+    loadtest.add_argument("--max-error-rate", type=float, default=None,
+                          help="Exit with status 1 if the error rate is higher")
+    loadtest.add_argument("--output", default=None, help="Write the report to this file instead of stdout")
+
+    mock_server = commands.add_parser("mock-server", help="Serve the mock P2P API used by loadtest")
+    mock_server.set_defaults(method=None)
+    mock_server.add_argument("--host", default="127.0.0.1")
+    mock_server.add_argument("--port", type=int, default=8080)
+    mock_server.add_argument("--orders", type=int, default=200, help="Pending orders")
+    mock_server.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    mock_server.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 503 responses")
+    return parser
+
+
+def make_client(args, pool_size=None):
+    return P2P(
+        testnet=args.testnet,
+        api_key=args.api_key,
+        api_secret=args.api_secret,
+        rsa=args.rsa,
+        domain=args.domain,
+        tld=args.tld,
+        recv_window=args.recv_window,
+        # One kept-alive connection per worker for the whole invocation
+        session=create_session(pool_maxsize=pool_size) if pool_size else None,
+    )
+
+
+def _parse_mix(value):
+    mix = {}
+    for pair in value.split(","):
+        name, sep, weight = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected scenario=weight, got: {pair}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def run_loadtest(args, out):
+    import logging
+
+    from ._p2p_loadtest import LoadTest
+    from ._p2p_mock_server import MockP2PServer
+    from ._p2p_transport import RequestsTransport, Urllib3Transport
+
+    server = None
+    url = args.url
+    if url is None:
+        server = MockP2PServer(orders=args.orders, latency=args.server_latency,
+                               error_rate=args.server_error_rate).start()
+        url = server.url
+    if args.transport == "urllib3":
+        transport = Urllib3Transport(maxsize=args.concurrency, compress=not args.no_compress)
+    else:
+        transport = RequestsTransport(create_session(pool_maxsize=args.concurrency), compress=not args.no_compress)
+    try:
+        api = P2P(
+            testnet=False,
+            api_key=args.api_key or "loadtest",
+            api_secret=args.api_secret or "loadtest",
+            rsa=args.rsa,
+            recv_window=args.recv_window,
+            base_url=url,
+            # Failures are counted in the report instead of logged
+            logging_level=logging.CRITICAL,
+            transport=transport,
+        )
+        report = LoadTest(
+            api,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            mix=_parse_mix(args.mix) if args.mix else None,
+            trace_memory=args.trace_memory,
+        ).run()
+    finally:
+        if server is not None:
+            server.stop()
+
+    report["url"] = url if server is None else "in-process mock server"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        out.write(json.dumps(report, indent=2) + "\n")
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def run_mock_server(args):
+    from ._p2p_mock_server import MockP2PServer
+
+    server = MockP2PServer(host=args.host, port=args.port, orders=args.orders, latency=args.latency,
+                           error_rate=args.error_rate)
+    sys.stderr.write(f"Serving the mock P2P API on {server.url}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return EXIT_OK
+
+
+def run_single(api, args, out):
+    params = _parse_params(args.params, args.json_params)
+    fetch = getattr(api, _command_name(args.method))
+    if getattr(args, "all_pages", False):
+        # Paging is driven by --page-size; a given page is where iteration starts
+        params.pop("size", None)
+        start_page = int(params.pop("page", 1))
+        for item in iter_items(fetch, page_size=args.page_size, start_page=start_page, **params):
+            out.write(_dumps(item) + "\n")
+    else:
+        out.write(_dumps(fetch(**params)) + "\n")
+    return EXIT_OK
+
+
+def _execute(api, line_no, request):
+    request_id = line_no
+    try:
+        if not isinstance(request, dict):
+            raise ValueError(f"Request must be a JSON object, got {type(request).__name__}")
+        request_id = request.get("id", line_no)
+        name = request["method"].replace("-", "_")
+        method = getattr(P2PMethods, name.upper(), None)
+        if method is None:
+            raise ValueError(f"Unknown method: {request['method']}")
+        result = getattr(api, _command_name(method))(**(request.get("params") or {}))
+        return {"id": request_id, "ok": True, "result": result}
+    except Exception as e:
+        return {"id": request_id, "ok": False, "error": _error_dict(e)}
+
+
+def run_batch(api, args, stdin, out):
+    failed = False
+    pending = {}
+    buffered = {}
+    next_to_print = 0
+    max_in_flight = max(1, args.workers) * 4
+
+    def emit(index, record):
+        nonlocal failed, next_to_print
+        failed = failed or not record["ok"]
+        if not args.ordered:
+            out.write(_dumps(record) + "\n")
+            return
+        buffered[index] = record
+        while next_to_print in buffered:
+            out.write(_dumps(buffered.pop(next_to_print)) + "\n")
+            next_to_print += 1
+
+    def drain():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            emit(pending.pop(future), future.result())
+
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="bybit-p2p-batch") as executor:
+        index = 0
+        for line_no, line in enumerate(stdin, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                emit(index, {"id": line_no, "ok": False, "error": {"message": f"Invalid JSON: {e}", "code": None}})
+            else:
+                pending[executor.submit(_execute, api, line_no, request)] = index
+            index += 1
+            while len(pending) >= max_in_flight:
+                drain()
+        while pending:
+            drain()
+
+    out.flush()
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def main(argv=None, stdin=None, out=None):
+    stdin = stdin or sys.stdin
+    out = out or sys.stdout
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "loadtest":
+            return run_loadtest(args, out)
+        if args.command == "mock-server":
+            return run_mock_server(args)
+        if args.command == "batch":
+            return run_batch(make_client(args, pool_size=args.workers), args, stdin, out)
+        return run_single(make_client(args), args, out)
+    except FailedRequestError as e:
+        sys.stderr.write(_dumps({"ok": False, "error": _error_dict(e)}) + "\n")
+        return EXIT_FAILED
+    except ValueError as e:
+        parser.print_usage(sys.stderr)
+        sys.stderr.write(f"{parser.prog}: error: {e}\n")
+        return EXIT_USAGE
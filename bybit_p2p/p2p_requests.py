@@ -1,5 +1,13 @@
+import os
+import threading
+import uuid
+
 from ._p2p_manager import P2PManager
 from ._p2p_helper import P2PMethods
+from ._p2p_attachments import AttachmentCache, AttachmentUploader
+
+# Guards the lazy creation of each client's attachment uploader
+_attachments_lock = threading.Lock()
 
 
 class P2PRequests(P2PManager):
@@ -236,6 +244,65 @@ class P2PRequests(P2PManager):
             params=kwargs
         )
 
+    @property
+    def attachments(self):
+        """
+        Attachment uploader shared by `send_attachment` and `send_attachments`.
+
+        :return: AttachmentUploader instance
+        """
+
+        uploader = getattr(self, "_attachments", None)
+        if uploader is None:
+            with _attachments_lock:
+                uploader = getattr(self, "_attachments", None)
+                if uploader is None:
+                    cache = self._attachment_cache
+                    if cache is None or isinstance(cache, (str, bytes)) or hasattr(cache, "__fspath__"):
+                        cache = AttachmentCache(cache)
+                    uploader = self._attachments = AttachmentUploader(self, cache)
+        return uploader
+
+    def send_attachment(self, order_id, path, **kwargs):
+        """
+        Send a file to the order chat. The file is uploaded only if its content
+        has not been uploaded before, otherwise the cached URL is reused.
+
+        :param order_id: Order ID
+        :param path: Path to a pic (jpg, jpeg, png), pdf or video (mp4) file
+        :key msgUuid: Client message UUID, generated if omitted
+        :return: Response dictionary
+        """
+
+        return self._send_attachment_entry(order_id, path, self.attachments.resolve(path), **kwargs)
+
+    def send_attachments(self, order_id, paths):
+        """
+        Send several files to the order chat. Uploads that miss the cache run in
+        parallel; messages are sent in the order of `paths`.
+
+        :param order_id: Order ID
+        :param paths: Iterable of file paths
+        :return: List of response dictionaries
+        """
+
+        paths = list(paths)
+        futures = [self.attachments.resolve_async(path) for path in paths]
+        return [
+            self._send_attachment_entry(order_id, path, future.result())
+            for path, future in zip(paths, futures)
+        ]
+
+    def _send_attachment_entry(self, order_id, path, entry, **kwargs):
+        kwargs.setdefault("msgUuid", uuid.uuid4().hex)
+        return self.send_chat_message(
+            message=entry["url"],
+            contentType=entry["contentType"],
+            orderId=order_id,
+            fileName=os.path.basename(str(path)),
+            **kwargs
+        )
+
     def post_new_ad(self, **kwargs):
         """
         Post new advertisement
@@ -289,4 +356,16 @@ class P2PRequests(P2PManager):
         return self.http_req_handler(
             method=P2PMethods.GET_USER_PAYMENT_TYPES,
             params=kwargs
-        )
\ No newline at end of file
+        )
+
+    def get_server_time(self, **kwargs):
+        """
+        Get Bybit server time
+
+        :return: Response dictionary
+        """
+
+        return self.http_req_handler(
+            method=P2PMethods.GET_SERVER_TIME,
+            params=kwargs
+        )
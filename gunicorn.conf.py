@@ -0,0 +1,28 @@
+# Production entry point: gunicorn -c gunicorn.conf.py web_app:app
+import multiprocessing
+import os
+
+from bybit_p2p._p2p_snapshots import default_directory
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = 30
+keepalive = 5
+
+# Workers serve snapshots from this directory (tmpfs when available) instead of calling the API
+os.environ.setdefault("P2P_SNAPSHOT_DIR", default_directory())
+
+
+def post_worker_init(worker):
+    # Every worker runs a fetcher; the one holding the lease refreshes the snapshots
+    import web_app
+
+    worker.snapshot_fetcher = web_app.start_snapshot_fetcher()
+
+
+def worker_exit(server, worker):
+    fetcher = getattr(worker, "snapshot_fetcher", None)
+    if fetcher is not None:
+        fetcher.stop()
@@ -0,0 +1,74 @@
+import json
+import time
+
+import pytest
+
+from bybit_p2p import P2P, P2PAccountPool, TokenBucket
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body):
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+
+    def send(self, request):
+        key = request.headers["X-BAPI-API-KEY"]
+        sent.append((key, request.url))
+        if key == "broken":
+            return FakeResponse({"retCode": 10003, "retMsg": "Invalid api key"})
+        if request.url.endswith("/pending/simplifyList"):
+            page = json.loads(request.body)["page"]
+            items = [{"id": f"{key}-1", "createDate": "200" if key == "a" else "100"}] if page == 1 else []
+            return FakeResponse({"retCode": 0, "result": {"count": 1, "items": items}})
+        return FakeResponse({"retCode": 0, "result": {"balance": [{"coin": "USDT", "walletBalance": key}]}})
+
+    monkeypatch.setattr(P2P, "_send_request", send)
+    return sent
+
+
+def test_accounts_share_session_and_ip_budget(sent):
+    pool = P2PAccountPool(testnet=True, key_rate=5)
+    a = pool.add_account("a", "a", "secret")
+    b = pool.add_account("b", "b", "secret")
+    assert a.client is b.client
+    assert a._rate_limiters[-1] is b._rate_limiters[-1] is pool.ip_bucket
+    assert a._rate_limiters[0] is not b._rate_limiters[0]
+    with pytest.raises(ValueError):
+        pool.add_account("a", "a", "secret")
+    pool.close()
+
+
+def test_cross_account_queries_merge_and_report_errors(sent):
+    pool = P2PAccountPool(testnet=True, max_workers=4)
+    for name in ("a", "b", "broken"):
+        pool.add_account(name, name, "secret")
+
+    orders = pool.all_pending_orders()
+    assert [(o["id"], o["account"]) for o in orders] == [("a-1", "a"), ("b-1", "b")]
+    assert list(orders.errors) == ["broken"]
+
+    balances = pool.all_balances(coin="USDT", accounts=["a", "b"])
+    assert sorted(row["walletBalance"] for row in balances) == ["a", "b"]
+    assert balances.errors == {}
+    pool.close()
+
+
+def test_token_bucket_paces_callers():
+    bucket = TokenBucket(rate=50, capacity=2)
+    started = time.monotonic()
+    for _ in range(7):
+        assert bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+    assert not bucket.try_acquire()
+    assert not bucket.acquire(timeout=0)
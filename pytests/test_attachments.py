@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+
+import pytest
+
+from bybit_p2p import P2P, AttachmentCache
+from bybit_p2p._p2p_attachments import AttachmentUploader
+
+
+def make_api(tmp_path, monkeypatch, cache=None):
+    api = P2P(testnet=True, api_key="dummy", api_secret="dummy", attachment_cache=cache)
+    uploads = []
+    sent = []
+    lock = threading.Lock()
+
+    def upload_chat_file(**kwargs):
+        with lock:
+            uploads.append(kwargs["upload_file"])
+        return {"retCode": 0, "result": {"url": f"/oss/{len(uploads)}", "type": "pic"}}
+
+    def send_chat_message(**kwargs):
+        sent.append(kwargs)
+        return {"retCode": 0, "result": {}}
+
+    monkeypatch.setattr(api, "upload_chat_file", upload_chat_file)
+    monkeypatch.setattr(api, "send_chat_message", send_chat_message)
+    return api, uploads, sent
+
+
+def test_send_attachment_uploads_once_per_content(tmp_path, monkeypatch):
+    first = tmp_path / "a.png"
+    second = tmp_path / "b.png"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+    api, uploads, sent = make_api(tmp_path, monkeypatch)
+
+    api.send_attachment("1", str(first))
+    api.send_attachment("2", str(second))
+
+    assert uploads == [str(first)]
+    assert [m["message"] for m in sent] == ["/oss/1", "/oss/1"]
+    assert sent[1]["contentType"] == "pic"
+    assert sent[1]["fileName"] == "b.png"
+    assert sent[1]["orderId"] == "2"
+
+
+def test_send_attachments_parallel_dedup(tmp_path, monkeypatch):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"{i}.pdf"
+        path.write_bytes(b"doc-%d" % (i % 3))
+        paths.append(str(path))
+    api, uploads, sent = make_api(tmp_path, monkeypatch)
+
+    api.send_attachments("1", paths)
+
+    assert len(uploads) == 3
+    assert [m["fileName"] for m in sent][:3] == ["0.pdf", "1.pdf", "2.pdf"]
+
+
+def test_attachment_cache_is_persistent(tmp_path, monkeypatch):
+    cache_path = tmp_path / "cache.json"
+    doc = tmp_path / "doc.pdf"
+    doc.write_bytes(b"pdf")
+
+    api, uploads, _ = make_api(tmp_path, monkeypatch, cache=str(cache_path))
+    api.send_attachment("1", str(doc))
+    assert len(json.loads(cache_path.read_text())) == 1
+
+    api, uploads, sent = make_api(tmp_path, monkeypatch, cache=AttachmentCache(str(cache_path)))
+    api.send_attachment("1", str(doc))
+    assert uploads == []
+    assert sent[0]["message"] == "/oss/1"
+
+
+def test_concurrent_sends_share_one_uploader_and_upload(tmp_path, monkeypatch):
+    doc = tmp_path / "doc.pdf"
+    doc.write_bytes(b"pdf")
+    api, uploads, sent = make_api(tmp_path, monkeypatch)
+    barrier = threading.Barrier(8)
+    uploaders = []
+
+    def send():
+        barrier.wait()
+        uploaders.append(api.attachments)
+        api.send_attachment("1", str(doc))
+
+    threads = [threading.Thread(target=send) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(u) for u in uploaders}) == 1
+    assert uploads == [str(doc)] and len(sent) == 8
+
+
+def test_unsupported_attachment_is_rejected_before_upload(tmp_path, monkeypatch):
+    archive = tmp_path / "logs.zip"
+    archive.write_bytes(b"zip")
+    api, uploads, sent = make_api(tmp_path, monkeypatch)
+
+    with pytest.raises(ValueError):
+        api.send_attachment("1", str(archive))
+    assert uploads == [] and sent == []
+
+
+def test_close_waits_for_a_running_upload(tmp_path):
+    doc = tmp_path / "doc.pdf"
+    doc.write_bytes(b"pdf")
+    started, release = threading.Event(), threading.Event()
+
+    class Api:
+        def upload_chat_file(self, upload_file):
+            started.set()
+            release.wait()
+            return {"retCode": 0, "result": {"url": "/oss/1", "type": "pdf"}}
+
+    uploader = AttachmentUploader(Api())
+    future = uploader.resolve_async(str(doc))
+    assert started.wait(5)
+    closer = threading.Thread(target=uploader.close, daemon=True)
+    closer.start()
+    time.sleep(0.1)  # close() is waiting for the upload
+    release.set()
+    closer.join(5)
+    assert not closer.is_alive()
+    assert future.result()["url"] == "/oss/1"
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from bybit_p2p import BalanceTracker
+
+
+class FakeApi:
+    def __init__(self):
+        self.balance_calls = 0
+        self.released = []
+
+    def get_current_balance(self, **kwargs):
+        self.balance_calls += 1
+        return {"retCode": 0, "result": {"balance": [
+            {"coin": "USDT", "walletBalance": "100", "transferBalance": "100"},
+            {"coin": "BTC", "walletBalance": "1", "transferBalance": "1"},
+        ]}}
+
+    def release_assets(self, **kwargs):
+        self.released.append(kwargs["orderId"])
+        return {"retCode": 0, "result": {}}
+
+
+def test_order_events_adjust_balance_locally():
+    api = FakeApi()
+    tracker = BalanceTracker(api, coins=["USDT"])
+    tracker.reconcile()
+    assert "BTC" not in tracker.snapshot()
+
+    tracker.order_created("1", "USDT", "30.5")
+    tracker.order_created("1", "USDT", "30.5")  # duplicate event
+    tracker.order_created("2", "USDT", "20")
+    assert tracker.available("USDT") == Decimal("49.5")
+    assert tracker.locked("USDT") == Decimal("50.5")
+    assert not tracker.can_cover("USDT", "50")
+
+    tracker.release_assets("1")
+    tracker.order_cancelled("2")
+    tracker.order_cancelled("2")
+    assert api.released == ["1"]
+    assert tracker.available("USDT") == Decimal("69.5")
+    assert tracker.locked("USDT") == 0
+    assert tracker.snapshot()["USDT"]["total"] == Decimal("69.5")
+    assert api.balance_calls == 1
+
+
+def test_apply_orders_is_idempotent_and_reconcile_keeps_locks():
+    tracker = BalanceTracker(FakeApi())
+    tracker.reconcile()
+    orders = [
+        {"id": "1", "tokenId": "USDT", "side": 1, "status": 10, "notifyTokenQuantity": "10"},
+        {"id": "2", "tokenId": "USDT", "side": 0, "status": 50, "notifyTokenQuantity": "5"},
+        {"id": "3", "tokenId": "USDT", "side": 1, "status": 40, "notifyTokenQuantity": "7"},
+    ]
+    tracker.apply_orders(orders)
+    tracker.apply_orders(orders)
+    # Orders 2 and 3 were already closed when first seen: only order 1 moves funds
+    assert tracker.available("USDT") == Decimal("90")
+    assert tracker.locked("USDT") == Decimal("10")
+
+    # The exchange view wins for available, open locks are kept
+    tracker.reconcile()
+    assert tracker.available("USDT") == Decimal("100")
+    assert tracker.locked("USDT") == Decimal("10")
+
+
+def test_historic_closed_orders_do_not_move_the_balance():
+    tracker = BalanceTracker(FakeApi(), coins=["USDT"])
+    tracker.reconcile()
+    history = [
+        {"id": "10", "tokenId": "USDT", "side": 1, "status": 50, "notifyTokenQuantity": "30"},
+        {"id": "11", "tokenId": "USDT", "side": 0, "status": 50, "notifyTokenQuantity": "5"},
+        {"id": "12", "tokenId": "USDT", "side": 1, "status": 40, "notifyTokenQuantity": "7"},
+    ]
+    tracker.apply_orders(history)
+    tracker.apply_orders(history)
+    snapshot = tracker.snapshot()["USDT"]
+    assert (snapshot["total"], snapshot["available"], snapshot["locked"]) == (100, 100, 0)
+
+    tracker.apply_order({"id": "13", "tokenId": "USDT", "side": 1, "status": 10, "notifyTokenQuantity": "20"})
+    tracker.apply_order({"id": "13", "tokenId": "USDT", "side": 1, "status": 50, "notifyTokenQuantity": "20"})
+    snapshot = tracker.snapshot()["USDT"]
+    assert (snapshot["total"], snapshot["available"], snapshot["locked"]) == (80, 80, 0)
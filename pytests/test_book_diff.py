@@ -0,0 +1,60 @@
+from bybit_p2p import P2P, OrderBookDiff
+from bybit_p2p._p2p_transport import MockTransport
+
+
+def ad(ad_id, price, quantity="100", payments=("14",), **fields):
+    return dict({"id": ad_id, "price": price, "lastQuantity": quantity, "quantity": quantity,
+                 "minAmount": "10", "maxAmount": "500", "payments": list(payments), "status": 10}, **fields)
+
+
+def test_first_update_adds_everything():
+    diff = OrderBookDiff().update("USDT", "EUR", "1", [ad("1", "0.95"), ad("2", "0.94")], ts=1.0)
+    assert [a["id"] for a in diff.added] == ["1", "2"]
+    assert not diff.removed and not diff.changed
+    assert diff.best_price == 0.94 and diff.best_price_changed
+    assert diff.key == "USDT/EUR/1" and diff.size == 2
+
+
+def test_only_changes_are_reported():
+    books = OrderBookDiff()
+    books.update("USDT", "EUR", "1", [ad("1", "0.95"), ad("2", "0.94"), ad("3", "0.96")])
+
+    diff = books.update("USDT", "EUR", "1", [ad("1", "0.95", nickName="renamed"), ad("2", "0.94", payments=("14",)),
+                                             ad("3", "0.96", payments=("62", "14"))])
+    assert [(old["id"], new["payments"]) for old, new in diff.changed] == [("3", ["62", "14"])]
+    assert not diff.added and not diff.removed and not diff.best_price_changed
+
+    diff = books.update("USDT", "EUR", "1", [ad("1", "0.93"), ad("3", "0.96", payments=("14", "62")), ad("4", "0.99")])
+    assert [a["id"] for a in diff.added] == ["4"]
+    assert [a["id"] for a in diff.removed] == ["2"]
+    assert [new["price"] for _, new in diff.changed] == ["0.93"]
+    assert (diff.previous_best_price, diff.best_price) == (0.94, 0.93)
+
+    unchanged = books.update("USDT", "EUR", "1", [ad("1", "0.93"), ad("3", "0.96", payments=("62", "14")),
+                                                  ad("4", "0.99")])
+    assert not unchanged and not unchanged.best_price_changed
+
+
+def test_books_are_independent_and_buy_side_best_is_highest():
+    books = OrderBookDiff()
+    books.update("USDT", "EUR", "1", [ad("1", "0.95")])
+    diff = books.update("USDT", "EUR", "0", [ad("5", "0.90"), ad("6", "0.92")])
+    assert len(diff.added) == 2 and diff.best_price == 0.92
+    assert books.best_price("USDT", "EUR", "1") == 0.95
+
+    books.reset("USDT", "EUR", "0")
+    assert books.snapshot("USDT", "EUR", "0") == []
+    assert len(books.update("USDT", "EUR", "0", [ad("5", "0.90")]).added) == 1
+
+
+def test_poll_fetches_pages():
+    ads = [ad(str(i), f"0.{90 + i % 10}") for i in range(7)]
+    transport = MockTransport(default=lambda request, payload: {
+        "retCode": 0,
+        "result": {"count": len(ads), "items": ads[(int(payload["page"]) - 1) * int(payload["size"]):
+                                                   int(payload["page"]) * int(payload["size"])]},
+    })
+    api = P2P(testnet=True, api_key="k", api_secret="s", transport=transport)
+
+    diff = OrderBookDiff().poll(api, "USDT", "EUR", "1", max_items=5, page_size=3)
+    assert diff.size == 5 and len(transport.requests) == 2
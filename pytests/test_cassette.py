@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from bybit_p2p import P2P, Cassette
+from bybit_p2p._exceptions import CassetteMismatchError, FailedRequestError
+from bybit_p2p._p2p_transport import MockTransport, TransportResponse
+
+
+def LiveResponse(body):
+    return TransportResponse(200, {"Content-Type": "application/json", "Set-Cookie": "session=abc"},
+                             json.dumps(body).encode())
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    live_calls = []
+
+    def send_live(request, body):
+        live_calls.append(request.url)
+        if body.get("orderId") == "404":
+            return LiveResponse({"retCode": 912100202, "retMsg": "Order not found"})
+        return LiveResponse({"retCode": 0, "retMsg": "OK", "result": {"orderId": body.get("orderId"), "n": len(live_calls)}})
+
+    recorder = P2P(testnet=True, api_key="KEY", api_secret="SECRET",
+                   cassette=Cassette(path, mode="record"), transport=MockTransport(default=send_live))
+    recorder.get_order_details(orderId="1")
+    recorder.get_order_details(orderId="1")
+    recorder.send_chat_message(message="hi", contentType="str", orderId="1", msgUuid="aaa")
+    with pytest.raises(FailedRequestError):
+        recorder.get_order_details(orderId="404")
+    assert len(live_calls) == 4
+
+    text = open(path).read()
+    assert "KEY" not in text and "SECRET" not in text
+    assert "X-BAPI" not in text and "session=abc" not in text
+
+    player = P2P(testnet=False, api_key="other", api_secret="other", cassette=Cassette(path))
+    assert player.get_order_details(orderId="1")["result"]["n"] == 1
+    assert player.get_order_details(orderId="1")["result"]["n"] == 2
+    # recordings exhausted: the last one is repeated
+    assert player.get_order_details(orderId="1")["result"]["n"] == 2
+    # msgUuid differs on every call and is not part of the match
+    assert player.send_chat_message(message="hi", contentType="str", orderId="1", msgUuid="bbb")["retCode"] == 0
+    with pytest.raises(FailedRequestError):
+        player.get_order_details(orderId="404")
+    with pytest.raises(CassetteMismatchError):
+        player.get_order_details(orderId="2")
+    # replay never creates an HTTP session
+    assert player._client is None
+
+
+def test_recording_appends_lines_and_survives_a_torn_write(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    cassette = Cassette(str(path), mode="record")
+    recorder = P2P(testnet=True, api_key="KEY", api_secret="SECRET", cassette=cassette,
+                   transport=MockTransport(default=lambda request, body: LiveResponse({"retCode": 0, "result": body})))
+    for i in range(3):
+        recorder.get_order_details(orderId=str(i))
+    lines = path.read_text().splitlines()
+    assert len(lines) == 4 and json.loads(lines[0]) == {"version": 1}
+    cassette.close()
+
+    # A crash mid-write leaves a partial last line: it is dropped, and recording goes on after it
+    with open(path, "a") as f:
+        f.write('{"request": {"meth')
+    cassette = Cassette(str(path), mode="record")
+    assert len(cassette.interactions) == 3
+    P2P(testnet=True, api_key="KEY", api_secret="SECRET", cassette=cassette,
+        transport=MockTransport(default=lambda request, body: LiveResponse({"retCode": 0, "result": body}))
+        ).get_order_details(orderId="3")
+    cassette.close()
+
+    player = P2P(testnet=True, api_key="KEY", api_secret="SECRET", cassette=Cassette(str(path)))
+    assert [player.get_order_details(orderId=str(i))["result"]["orderId"] for i in range(4)] == ["0", "1", "2", "3"]
+
+
+def test_single_document_cassettes_still_replay(tmp_path):
+    path = tmp_path / "cassette.json"
+    interaction = {"request": {"method": "POST", "path": "/v5/p2p/order/info", "body": '{"orderId": "1"}'},
+                   "response": {"status": 200, "headers": {}, "body": '{"retCode": 0, "result": {"n": 1}}'}}
+    path.write_text(json.dumps({"version": 1, "interactions": [interaction]}, indent=1))
+    player = P2P(testnet=True, api_key="KEY", api_secret="SECRET", cassette=Cassette(str(path)))
+    assert player.get_order_details(orderId="1")["result"]["n"] == 1
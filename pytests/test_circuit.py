@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from bybit_p2p import P2P, CircuitBreakerRegistry
+from bybit_p2p._exceptions import CircuitOpenError, FailedRequestError
+from bybit_p2p._p2p_circuit import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+from bybit_p2p._p2p_transport import MockTransport, TransportResponse
+
+
+def make_client(transport, breakers):
+    return P2P(testnet=True, api_key="key", api_secret="secret", time_sync=False,
+               transport=transport, circuit_breaker=breakers)
+
+
+def test_circuit_opens_fails_fast_and_recovers_after_probe():
+    healthy = {"up": False}
+
+    def orders(request, payload):
+        if not healthy["up"]:
+            return TransportResponse(503, {}, b"Service Unavailable")
+        return {"retCode": 0, "result": {"items": []}}
+
+    transport = MockTransport({("POST", "/v5/p2p/order/pending/simplifyList"): orders},
+                              default={"retCode": 0, "result": {}})
+    breakers = CircuitBreakerRegistry(failure_threshold=2, reset_timeout=0.05)
+    api = make_client(transport, breakers)
+
+    for _ in range(2):
+        with pytest.raises(FailedRequestError):
+            api.get_pending_orders(page=1, size=10)
+    with pytest.raises(CircuitOpenError) as error:
+        api.get_pending_orders(page=1, size=10)
+    assert 0 < error.value.retry_after <= 0.05
+    assert len(transport.requests) == 2
+
+    # Other endpoints have their own breaker
+    api.get_account_information()
+
+    time.sleep(0.06)
+    healthy["up"] = True
+    api.get_pending_orders(page=1, size=10)
+    state = {s["name"].rsplit("/", 1)[-1]: s for s in breakers.states()}["simplifyList"]
+    assert state["state"] == STATE_CLOSED
+    assert (state["total_failures"], state["rejected"]) == (2, 1)
+
+
+def test_half_open_allows_a_single_probe_and_backs_off():
+    breakers = CircuitBreakerRegistry(failure_threshold=1, reset_timeout=0.05, slow_threshold=0.5)
+    breaker = breakers.get(type("Method", (), {"url": "/x"})(), "https://api")
+    breaker.record(200, 1.0)  # slow response
+    assert breaker.state == STATE_OPEN
+    time.sleep(0.06)
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert 0.05 < breaker.retry_after() <= 0.1
+
+
+def test_transport_errors_count_as_failures():
+    class Down:
+        def send(self, request):
+            raise ConnectionError("connection refused")
+
+    api = make_client(Down(), CircuitBreakerRegistry(failure_threshold=1, reset_timeout=10))
+    with pytest.raises(ConnectionError):
+        api.get_ads_list()
+    with pytest.raises(CircuitOpenError):
+        api.get_ads_list()
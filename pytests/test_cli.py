@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+
+from bybit_p2p import P2P, cli
+from bybit_p2p._exceptions import FailedRequestError
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def http_req_handler(self, method, params):
+        calls.append((method.name, dict(params)))
+        if method.name == "REMOVE_AD":
+            raise FailedRequestError("req", "Ad not found", 912100001, "00:00:00", {})
+        if method.paginated:
+            page = params["page"]
+            items = [{"id": f"{page}-{i}"} for i in range(params["size"] if page < 3 else 1)]
+            return {"retCode": 0, "result": {"count": 2 * params["size"] + 1, "items": items}}
+        return {"retCode": 0, "result": {"method": method.name}}
+
+    monkeypatch.setattr(P2P, "http_req_handler", http_req_handler)
+    return calls
+
+
+def run(argv, stdin=""):
+    out = io.StringIO()
+    code = cli.main(argv, stdin=io.StringIO(stdin), out=out)
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_every_request_method_has_a_command():
+    parser = cli.build_parser()
+    for name in ["get_orders", "mark_as_paid", "get_user_payment_types", "upload-chat-file"]:
+        assert parser.parse_args([name]).method is not None
+
+
+def test_single_call_parses_params(calls):
+    code, lines = run(["get_order_details", "orderId=123", "size:=10", 'paymentIds:=["1","2"]'])
+    assert code == cli.EXIT_OK
+    assert lines == [{"retCode": 0, "result": {"method": "GET_ORDER_DETAILS"}}]
+    assert calls == [("GET_ORDER_DETAILS", {"orderId": "123", "size": 10, "paymentIds": ["1", "2"]})]
+
+
+def test_all_pages_streams_items(calls):
+    code, lines = run(["get_orders", "--all-pages", "--page-size", "2", "status:=50"])
+    assert code == cli.EXIT_OK
+    assert [item["id"] for item in lines] == ["1-0", "1-1", "2-0", "2-1", "3-0"]
+    assert all(params["status"] == 50 for _, params in calls)
+
+
+def test_all_pages_ignores_page_and_size_params(calls):
+    code, lines = run(["get_orders", "--all-pages", "--page-size", "2", "page:=2", "size:=50"])
+    assert code == cli.EXIT_OK
+    assert [item["id"] for item in lines] == ["2-0", "2-1", "3-0"]
+    assert [params["size"] for _, params in calls] == [2, 2]
+
+
+def test_batch_ordered(calls):
+    stdin = "\n".join([
+        json.dumps({"id": "a", "method": "get_ad_details", "params": {"itemId": "1"}}),
+        "not json",
+        json.dumps({"id": "b", "method": "remove_ad", "params": {"itemId": "2"}}),
+        json.dumps({"method": "no_such_method"}),
+        json.dumps({"id": "c", "method": "get-account-information"}),
+        "[]",
+        "1",
+    ])
+    code, lines = run(["batch", "--workers", "4", "--ordered"], stdin)
+    assert code == cli.EXIT_FAILED
+    assert [line["ok"] for line in lines] == [True, False, False, False, True, False, False]
+    assert [line["id"] for line in lines] == ["a", 2, "b", 4, "c", 6, 7]
+    assert lines[2]["error"]["code"] == 912100001
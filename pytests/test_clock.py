@@ -0,0 +1,105 @@
+import json
+import time
+
+from bybit_p2p import P2P
+from bybit_p2p._p2p_clock import ServerClock
+
+
+class FakeResponse:
+    def __init__(self, body, headers=None, status_code=200):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(body)
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+def test_offset_converges_and_resists_outliers():
+    clock = ServerClock(smoothing=0.5)
+    now = time.time()
+    for _ in range(10):
+        clock.observe((now + 0.025) * 1000 + 2000, now, now + 0.05, key="/x")
+    assert abs(clock.offset_ms - 2000) < 1
+
+    # a single sample moves the estimate only partially, less so if its RTT was slow
+    clock.observe((now + 0.025) * 1000 + 4000, now, now + 0.05, key="/x")
+    assert 2900 < clock.offset_ms < 3100
+    clock.observe((now + 1) * 1000 + 4000, now, now + 2, key="/x")
+    assert clock.offset_ms < 3100
+    assert abs(clock.now_ms() - (time.time() * 1000 + clock.offset_ms)) < 50
+
+
+def test_recv_window_adapts_within_bounds():
+    clock = ServerClock(min_recv_window=1000, max_recv_window=5000)
+    assert clock.recv_window("/x", 5000) == 5000
+    now = time.time()
+    for _ in range(5):
+        clock.observe(now * 1000 + 10, now, now + 0.02, key="/x")
+        clock.observe(now * 1000 + 5000, now, now + 10, key="/slow")
+    assert 1000 <= clock.recv_window("/x", 5000) < 1200
+    assert clock.recv_window("/slow", 5000) == 5000
+
+
+def test_requests_are_stamped_with_server_time(monkeypatch):
+    api = P2P(testnet=True, api_key="dummy", api_secret="dummy", adaptive_recv_window=True)
+    sent = []
+
+    def send(request):
+        sent.append(request)
+        server_now = int(time.time() * 1000) + 60_000
+        return FakeResponse({"retCode": 0, "retMsg": "OK", "result": {}, "time": server_now},
+                            {"Timenow": str(server_now)})
+
+    monkeypatch.setattr(api, "_send_request", send)
+    api.get_account_information()
+    api.get_account_information()
+
+    stamp = int(sent[1].headers["X-BAPI-TIMESTAMP"])
+    assert abs(stamp - (time.time() * 1000 + 60_000)) < 1000
+    assert int(sent[1].headers["X-BAPI-RECV-WINDOW"]) < 5000
+
+
+def test_timestamp_rejection_resyncs_and_retries_once(monkeypatch):
+    api = P2P(testnet=True, api_key="dummy", api_secret="dummy")
+    urls = []
+
+    def send(request):
+        urls.append(request.url)
+        server_now = int(time.time() * 1000) - 30_000
+        if request.url.endswith("/v5/market/time"):
+            return FakeResponse({"retCode": 0, "retMsg": "OK", "result": {}, "time": server_now})
+        if len(urls) == 1:
+            return FakeResponse({"retCode": 10002, "retMsg": "invalid timestamp", "result": {}})
+        return FakeResponse({"retCode": 0, "retMsg": "OK", "result": {"ok": True}, "time": server_now})
+
+    monkeypatch.setattr(api, "_send_request", send)
+    assert api.get_account_information()["result"] == {"ok": True}
+    assert [url.rsplit("/v5/", 1)[1] for url in urls] == ["p2p/user/personal/info", "market/time", "p2p/user/personal/info"]
+    assert api.clock.offset_ms < -20_000
+
+
+def test_resync_after_clock_step_takes_the_new_offset(monkeypatch):
+    api = P2P(testnet=True, api_key="dummy", api_secret="dummy")
+    skew = [0]
+    stamps = []
+
+    def send(request):
+        server_now = int(time.time() * 1000) + skew[0]
+        if request.url.endswith("/v5/market/time"):
+            return FakeResponse({"retCode": 0, "retMsg": "OK", "result": {}, "time": server_now})
+        stamp = int(request.headers["X-BAPI-TIMESTAMP"])
+        stamps.append(stamp)
+        if abs(stamp - server_now) > 5000:
+            return FakeResponse({"retCode": 10002, "retMsg": "invalid timestamp", "result": {}})
+        return FakeResponse({"retCode": 0, "retMsg": "OK", "result": {"ok": True}, "time": server_now})
+
+    monkeypatch.setattr(api, "_send_request", send)
+    for _ in range(20):
+        api.get_account_information()
+    # The local clock steps 30 s ahead of the server
+    skew[0] = -30_000
+    assert api.get_account_information()["result"] == {"ok": True}
+    assert abs(api.clock.offset_ms + 30_000) < 1000
+    assert abs(stamps[-1] - (time.time() * 1000 - 30_000)) < 1000
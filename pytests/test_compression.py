@@ -0,0 +1,106 @@
+import json
+import zlib
+
+import pytest
+
+from bybit_p2p import P2P
+from bybit_p2p._exceptions import ResponseTooLargeError
+from bybit_p2p._p2p_compression import available_encodings, compress, negotiate, read_body
+from bybit_p2p._p2p_mock_server import MockP2PServer
+from bybit_p2p._p2p_transport import RequestsTransport, Urllib3Transport
+
+BODY = json.dumps({"items": [{"id": str(i), "price": "0.95"} for i in range(500)]}).encode()
+
+
+def _chunks(data, size=100):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("encoding", available_encodings())
+def test_stream_decompression(encoding):
+    encoded = compress(BODY, encoding)
+    assert read_body(_chunks(encoded), encoding) == (BODY, len(encoded))
+
+
+def test_raw_deflate_and_identity():
+    raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    encoded = raw.compress(BODY) + raw.flush()
+    assert read_body(_chunks(encoded), "deflate")[0] == BODY
+    assert read_body(_chunks(BODY), None) == (BODY, len(BODY))
+
+
+def test_decoded_size_limit():
+    bomb = compress(b"\0" * (10 * 1024 * 1024), "gzip")
+    decoded = []
+
+    def chunks():
+        for chunk in _chunks(bomb, 1024):
+            decoded.append(chunk)
+            yield chunk
+
+    with pytest.raises(ResponseTooLargeError):
+        read_body(chunks(), "gzip", max_size=1024 * 1024)
+    # Aborted early, without inflating the rest of the body
+    assert len(decoded) < len(_chunks(bomb, 1024)) / 2
+    with pytest.raises(ResponseTooLargeError):
+        read_body(_chunks(BODY), None, max_size=len(BODY) - 1)
+    assert read_body(_chunks(compress(BODY, "deflate")), "deflate", max_size=len(BODY))[0] == BODY
+    assert read_body([bomb], "gzip", max_size=None)[0] == b"\0" * (10 * 1024 * 1024)
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate", ("br", "gzip")) == "gzip"
+    assert negotiate("br;q=0, gzip;q=0.5", ("br", "gzip")) == "gzip"
+    assert negotiate("*", ("deflate",)) == "deflate"
+    assert negotiate("identity", ("gzip",)) is None
+    assert negotiate(None, ("gzip",)) is None
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockP2PServer(orders=200, seed=3, encodings=("gzip", "deflate")) as server:
+        yield server
+
+
+@pytest.mark.parametrize("transport_class", [RequestsTransport, Urllib3Transport])
+def test_transports_decode_and_count_compressed_responses(server, transport_class):
+    transport = transport_class()
+    api = P2P(testnet=False, api_key="k", api_secret="s", base_url=server.url, transport=transport)
+
+    for _ in range(2):
+        items = api.get_pending_orders(page=1, size=100)["result"]["items"]
+        assert len(items) == 100
+
+    stats = transport.compression.snapshot()
+    gzip = stats["encodings"]["gzip"]
+    assert gzip["responses"] == 2
+    assert gzip["decoded_bytes"] > gzip["received_bytes"] > 0
+    assert stats["bytes_saved"] == gzip["decoded_bytes"] - gzip["received_bytes"]
+    assert stats["ratio"] > 2
+    transport.close()
+
+
+@pytest.mark.parametrize("transport_class", [RequestsTransport, Urllib3Transport])
+def test_transports_refuse_oversized_bodies(server, transport_class):
+    transport = transport_class(max_body_size=1000)
+    api = P2P(testnet=False, api_key="k", api_secret="s", base_url=server.url, transport=transport)
+    with pytest.raises(ResponseTooLargeError):
+        api.get_pending_orders(page=1, size=100)
+    # The aborted connection is not reused for the next request
+    assert api.get_server_time()["retCode"] == 0
+    transport.close()
+
+
+def test_compression_can_be_disabled(server):
+    transport = Urllib3Transport(compress=False)
+    api = P2P(testnet=False, api_key="k", api_secret="s", base_url=server.url, transport=transport)
+    assert len(api.get_pending_orders(page=1, size=100)["result"]["items"]) == 100
+    assert list(transport.compression.snapshot()["encodings"]) == ["identity"]
+
+    transport = RequestsTransport(compress=False)
+    api = P2P(testnet=False, api_key="k", api_secret="s", base_url=server.url, transport=transport)
+    assert len(api.get_pending_orders(page=1, size=100)["result"]["items"]) == 100
+    # The session's default "gzip, deflate" is not sent, so the body arrives as-is
+    identity = transport.compression.snapshot()["encodings"]["identity"]
+    assert identity["responses"] == 1 and identity["received_bytes"] == identity["decoded_bytes"]
+    assert list(transport.compression.snapshot()["encodings"]) == ["identity"]
@@ -0,0 +1,85 @@
+import csv
+import os
+
+import pytest
+
+from bybit_p2p import OrderExporter
+
+ORDERS = [
+    {"id": str(i), "createDate": str(1700000000000 + i), "side": i % 2, "status": 50,
+     "tokenId": "USDT", "currencyId": "RUB", "price": "90.5", "amount": "905",
+     "notifyTokenQuantity": "10", "fee": "0", "buyerRealName": "secret"}
+    for i in range(7)
+]
+
+
+class FakeApi:
+    def __init__(self, fail_on_page=None):
+        self.calls = []
+        self.fail_on_page = fail_on_page
+
+    def get_orders(self, page, size, **kwargs):
+        self.calls.append((page, kwargs["endTime"]))
+        if page == self.fail_on_page:
+            raise ConnectionError("connection reset")
+        items = ORDERS[(page - 1) * size:page * size]
+        return {"retCode": 0, "result": {"count": len(ORDERS), "items": items}}
+
+
+def read_parts(directory, parts):
+    rows = []
+    for name in parts:
+        with open(os.path.join(directory, name), newline="") as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_export_resumes_after_last_completed_part(tmp_path):
+    directory = str(tmp_path / "export")
+    api = FakeApi(fail_on_page=4)
+    exporter = OrderExporter(api, directory, format="csv", page_size=2, pages_per_file=2, tokenId="USDT")
+    with pytest.raises(ConnectionError):
+        exporter.run()
+
+    api.fail_on_page = None
+    state = exporter.run()
+    assert state["done"] and state["rows"] == 7
+    assert state["parts"] == ["part-00000.csv", "part-00001.csv"]
+    # Resumed at page 3 with the endTime pinned by the first run
+    assert [page for page, _ in api.calls] == [1, 2, 3, 4, 3, 4]
+    assert len({end_time for _, end_time in api.calls}) == 1
+
+    rows = read_parts(directory, state["parts"])
+    assert [row["id"] for row in rows] == [str(i) for i in range(7)]
+    assert rows[1]["side"] == "sell"
+    assert rows[1]["price"] == "90.5"
+    assert rows[1]["createDate"] == "2023-11-14T22:13:20.001+00:00"
+    assert "buyerRealName" not in rows[0]
+
+    assert exporter.run()["rows"] == 7
+    assert len(api.calls) == 6
+
+
+def test_export_refuses_a_different_export_in_the_same_directory(tmp_path):
+    OrderExporter(FakeApi(), str(tmp_path), format="csv").run()
+    with pytest.raises(ValueError):
+        OrderExporter(FakeApi(), str(tmp_path), format="csv", tokenId="BTC").run()
+
+
+def test_parquet_round_trip(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from decimal import Decimal
+
+    directory = str(tmp_path / "export")
+    state = OrderExporter(FakeApi(), directory, format="parquet", page_size=3, pages_per_file=2).run()
+    assert state["done"] and state["parts"] == ["part-00000.parquet", "part-00001.parquet"]
+
+    table = pq.ParquetDataset([os.path.join(directory, name) for name in state["parts"]]).read()
+    assert table.num_rows == 7
+    rows = table.to_pylist()
+    assert [row["id"] for row in rows] == [str(i) for i in range(7)]
+    assert rows[1]["side"] == "sell" and rows[1]["status"] == 50
+    assert rows[1]["price"] == Decimal("90.5")
+    assert rows[1]["createDate"].isoformat(timespec="milliseconds") == "2023-11-14T22:13:20.001+00:00"
+    assert "buyerRealName" not in table.column_names
+    assert str(table.schema.field("price").type) == "decimal128(38, 10)"
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+
+import bybit_p2p
+
+# Cumulative import time of `bybit_p2p` itself, as reported by -X importtime.
+IMPORT_BUDGET_US = 100_000
+
+HEAVY_MODULES = ["requests", "requests_toolbelt", "urllib3", "Crypto"]
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(bybit_p2p.__file__)))
+
+
+def run_python(code, *args, env=None):
+    env = dict(os.environ, PYTHONPATH=PACKAGE_ROOT, **(env or {}))
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True, text=True, env=env, check=True
+    )
+
+
+def test_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, json, bybit_p2p\n"
+        "api = bybit_p2p.P2P(testnet=True, api_key='k', api_secret='s')\n"
+        "print(json.dumps(sorted(m.split('.')[0] for m in sys.modules)))"
+    )
+    loaded = set(json.loads(run_python(code).stdout))
+    assert loaded.isdisjoint(HEAVY_MODULES)
+
+
+def _import_time_us():
+    result = run_python("import bybit_p2p", "-X", "importtime")
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == "bybit_p2p":
+            return int(parts[1])
+    raise AssertionError("bybit_p2p missing from -X importtime output")
+
+
+def test_import_time_budget():
+    # The first run writes the bytecode cache of a fresh checkout; the best of the
+    # following runs is the import time without scheduler noise
+    run_python("import bybit_p2p")
+    assert min(_import_time_us() for _ in range(3)) < IMPORT_BUDGET_US
+
+
+def test_exports_are_loaded_on_first_access():
+    code = (
+        "import sys, bybit_p2p\n"
+        "assert 'bybit_p2p._p2p_simulator' not in sys.modules\n"
+        "from bybit_p2p import P2PSimulator, PRIORITY_HIGH\n"
+        "assert 'bybit_p2p._p2p_simulator' in sys.modules\n"
+        "assert set(bybit_p2p.__all__) <= set(dir(bybit_p2p))\n"
+        "print(all(getattr(bybit_p2p, name) is not None for name in bybit_p2p.__all__))"
+    )
+    assert run_python(code).stdout.strip() == "True"
+
+
+def test_rsa_signing_loads_crypto_lazily():
+    from Crypto.PublicKey import RSA
+
+    key = RSA.generate(1024).export_key().decode()
+    code = (
+        "import os, sys\n"
+        "from bybit_p2p import P2P\n"
+        "key = os.environ['TEST_RSA_KEY']\n"
+        "api = P2P(testnet=True, api_key='k', api_secret=key, rsa=True)\n"
+        "assert 'Crypto' not in sys.modules\n"
+        "sig = P2P._sign(True, key, 'payload')\n"
+        "assert 'Crypto' in sys.modules\n"
+        "assert P2P._sign(True, key, 'payload') == sig\n"
+        "print(len(sig))"
+    )
+    assert int(run_python(code, env={"TEST_RSA_KEY": key}).stdout) > 0
+
+
+def test_init_does_not_create_session():
+    api = bybit_p2p.P2P(testnet=True, api_key="dummy", api_secret="dummy")
+    assert api._client is None
+    assert api.client is api.client
@@ -0,0 +1,100 @@
+import http.client
+import io
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+from bybit_p2p import P2P, cli
+from bybit_p2p._exceptions import FailedRequestError
+from bybit_p2p._p2p_loadtest import LoadTest, _LatencyHistogram, percentiles
+from bybit_p2p._p2p_mock_server import MockP2PServer
+
+
+@pytest.fixture
+def server():
+    with MockP2PServer(orders=20, ads=4, seed=1) as server:
+        yield server
+
+
+def test_mock_server_order_lifecycle(server):
+    api = P2P(testnet=False, api_key="k", api_secret="s", base_url=server.url + "/")
+    orders = api.get_pending_orders(page=1, size=5)["result"]
+    assert orders["count"] == 20 and len(orders["items"]) == 5
+
+    order_id = orders["items"][0]["id"]
+    api.mark_as_paid(orderId=order_id, paymentType="14", paymentId="1")
+    with pytest.raises(FailedRequestError) as e:
+        api.mark_as_paid(orderId=order_id, paymentType="14", paymentId="1")
+    assert e.value.status_code == 912100027
+
+    api.send_chat_message(message="hi", contentType="str", orderId=order_id)
+    assert api.get_chat_messages(orderId=order_id, size=10)["result"]["result"][0]["message"] == "hi"
+
+    api.release_assets(orderId=order_id)
+    items = api.get_pending_orders(page=1, size=50)["result"]["items"]
+    assert len(items) == 20 and order_id not in {o["id"] for o in items}
+    assert server.request_counts()["/v5/p2p/order/pay"] == 2
+
+
+def test_keep_alive_responses_do_not_wait_for_delayed_ack(server):
+    url = urlsplit(server.url)
+    connection = http.client.HTTPConnection(url.hostname, url.port)
+    started = time.perf_counter()
+    for _ in range(20):
+        connection.request("GET", "/v5/market/time")
+        connection.getresponse().read()
+    connection.close()
+    # With Nagle on, each response stalls ~40 ms on the client's delayed ACK
+    assert time.perf_counter() - started < 0.4
+
+
+def test_percentiles():
+    result = percentiles([i / 1000 for i in range(1, 101)])
+    assert result["p50"] == 50.0 and result["p99"] == 99.0 and result["max"] == 100.0
+    assert percentiles([]) == {}
+
+
+def test_latency_histogram_matches_exact_percentiles_within_a_bucket():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(-4, 1) for _ in range(5000)]
+    histogram, other = _LatencyHistogram(), _LatencyHistogram()
+    for i, value in enumerate(values):
+        (histogram if i % 2 else other).add(value)
+    histogram.merge(other)
+    exact, approximate = percentiles(values), histogram.percentiles()
+    assert approximate["max"] == exact["max"] and approximate["mean"] == pytest.approx(exact["mean"], abs=0.001)
+    for p in ("p50", "p90", "p95", "p99"):
+        assert exact[p] <= approximate[p] <= exact[p] * 1.011
+    assert len(histogram.buckets) < 1000 and _LatencyHistogram().percentiles() == {}
+
+
+def test_load_test_report(server):
+    api = P2P(testnet=False, api_key="k", api_secret="s", base_url=server.url)
+    report = LoadTest(api, concurrency=4, duration=0.3, mix={"poll_pending": 3, "reprice": 1, "release": 0},
+                      sample_interval=0.1, seed=7).run()
+
+    assert set(report["scenarios"]) == {"poll_pending", "reprice"}
+    assert report["requests"] == sum(s["requests"] for s in report["scenarios"].values()) > 0
+    assert report["errors"] == 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"]
+    assert report["fds"]["peak"] >= report["fds"]["start"]
+    json.dumps(report)
+
+
+def test_load_test_rejects_unknown_scenarios(server):
+    with pytest.raises(ValueError):
+        LoadTest(P2P(testnet=False, base_url=server.url), mix={"withdraw": 1})
+
+
+def test_loadtest_command_against_in_process_server():
+    out = io.StringIO()
+    code = cli.main(["loadtest", "--concurrency", "2", "--duration", "0.2", "--orders", "10",
+                     "--server-error-rate", "1", "--max-error-rate", "0.5", "--mix", "read_chat=1"],
+                    out=out)
+    report = json.loads(out.getvalue())
+    assert code == cli.EXIT_FAILED
+    assert report["error_rate"] == 1.0
+    assert list(report["scenarios"]["read_chat"]["error_types"]) == ["503: HTTP status code is: 503, expected: 200"]
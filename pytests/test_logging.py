@@ -0,0 +1,96 @@
+import io
+import json
+import logging
+
+import pytest
+
+from bybit_p2p import P2P, configure_logging
+from bybit_p2p._exceptions import FailedRequestError
+from bybit_p2p._p2p_logging import RateLimitFilter
+from bybit_p2p._p2p_transport import MockTransport
+
+
+@pytest.fixture
+def api_logger():
+    logger = logging.getLogger("bybit_p2p._p2p_manager")
+    saved = (logger.handlers[:], logger.filters[:], logger.level, logger.propagate)
+    yield logger
+    logger.handlers, logger.filters, level, logger.propagate = saved
+    logger.setLevel(level)
+
+
+def failing_api():
+    transport = MockTransport(default={"retCode": 10001, "retMsg": "params error"})
+    return P2P(testnet=True, api_key="MYAPIKEY", api_secret="MYSECRET", transport=transport)
+
+
+def test_json_records_carry_request_fields(api_logger):
+    stream = io.StringIO()
+    listener = configure_logging(api_logger, json_format=True, queue=True, handler=logging.StreamHandler(stream))
+    api = failing_api()
+    with pytest.raises(FailedRequestError) as exc:
+        api.send_chat_message(message="card 4111 1111", contentType="str", orderId="1")
+    api.logger.error("bad key %s", "MYAPIKEY")
+    listener.stop()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records[0]["method"] == "SEND_CHAT_MESSAGE"
+    assert records[0]["endpoint"] == "/v5/p2p/order/message/send"
+    assert records[0]["retCode"] == 10001
+    assert records[0]["latency_ms"] >= 0
+    assert records[1]["message"] == "bad key ***"
+    assert "4111" not in str(exc.value)
+    assert '"orderId": "1"' in str(exc.value)
+
+
+def test_error_logging_is_rate_limited(api_logger):
+    stream = io.StringIO()
+    configure_logging(api_logger, handler=logging.StreamHandler(stream), error_rate=0.001, error_burst=5)
+    api = failing_api()
+    for _ in range(50):
+        with pytest.raises(FailedRequestError):
+            api.get_account_information()
+    assert len(stream.getvalue().splitlines()) == 5
+
+
+def test_rate_limit_is_opt_in_and_keys_on_the_template(api_logger):
+    assert not any(isinstance(f, RateLimitFilter) for f in api_logger.filters)
+
+    stream = io.StringIO()
+    configure_logging(api_logger, handler=logging.StreamHandler(stream), error_rate=0.001, error_burst=2)
+    assert not any(isinstance(f, RateLimitFilter) for f in api_logger.filters)
+    assert any(isinstance(f, RateLimitFilter) for f in api_logger.handlers[0].filters)
+    api = failing_api()
+    for i in range(5):
+        api.logger.error("bad key %s (%d)", "MYAPIKEY", i)
+    assert stream.getvalue().splitlines() == ["bad key *** (0)", "bad key *** (1)"]
+
+
+def test_rate_limit_applies_to_records_from_child_loggers(api_logger):
+    parent = logging.getLogger("bybit_p2p")
+    saved = (parent.handlers[:], parent.filters[:], parent.level, parent.propagate)
+    api_logger.handlers, api_logger.propagate = [], True
+    stream = io.StringIO()
+    try:
+        configure_logging(parent, handler=logging.StreamHandler(stream), error_rate=0.001, error_burst=3)
+        api = failing_api()
+        assert api.logger.handlers == []
+        for _ in range(10):
+            with pytest.raises(FailedRequestError):
+                api.get_account_information()
+        api.logger.error("bad key %s", "MYAPIKEY")
+    finally:
+        parent.handlers, parent.filters, level, parent.propagate = saved
+        parent.setLevel(level)
+    assert len(stream.getvalue().splitlines()) == 4
+    assert stream.getvalue().splitlines()[-1] == "bad key ***"
+
+
+def test_rate_limit_filter_reports_suppressed():
+    f = RateLimitFilter(rate=1000, burst=1)
+    records = [logging.LogRecord("x", logging.ERROR, "", 0, "boom", (), None) for _ in range(3)]
+    assert [f.filter(r) for r in records] == [True, False, False]
+    later = logging.LogRecord("x", logging.ERROR, "", 0, "boom", (), None)
+    f._buckets[("x", logging.ERROR, "boom")] = (1, f._buckets[("x", logging.ERROR, "boom")][1], 2)
+    assert f.filter(later)
+    assert later.suppressed == 2
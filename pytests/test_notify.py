@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bybit_p2p import NotificationDispatcher
+from bybit_p2p._p2p_notify import POLICY_DROP_NEWEST, POLICY_MERGE, WebhookDestination
+
+
+class Receiver(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        status = server.statuses.pop(0) if server.statuses else 200
+        if status == 200:
+            server.batches.append(body["events"])
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    server.batches = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_webhook_batches_and_retries(receiver):
+    receiver.statuses = [503]
+    url = f"http://127.0.0.1:{receiver.server_port}/hook"
+    with NotificationDispatcher() as dispatcher:
+        dispatcher.add_destination(WebhookDestination(url), batch_size=3, max_delay=60)
+        for i in range(3):
+            dispatcher.publish("order", {"id": i}, key=str(i))
+        assert dispatcher.flush(timeout=10)
+        stats = dispatcher.stats()[url]
+
+    assert [[e["data"]["id"] for e in batch] for batch in receiver.batches] == [[0, 1, 2]]
+    assert stats["sent"] == 3 and stats["batches"] == 1 and stats["failed"] == 0
+
+
+def test_orders_are_deduplicated_until_their_status_changes():
+    batches = []
+    with NotificationDispatcher() as dispatcher:
+        dispatcher.add_destination(batches.append, kinds={"order"}, max_delay=0.01)
+        response = {"result": {"items": [{"id": "1", "status": 10}, {"id": "2", "status": 10}]}}
+        dispatcher.publish_orders(response)
+        dispatcher.flush(timeout=5)
+        dispatcher.publish_orders(response)
+        dispatcher.publish("chat_message", {"message": "ignored"})
+        response["result"]["items"][0] = {"id": "1", "status": 20}
+        dispatcher.publish_orders(response)
+        dispatcher.flush(timeout=5)
+        stats = dispatcher.stats()["append"]
+
+    assert [[e["key"] for e in batch] for batch in batches] == [["1:10", "2:10"], ["1:20"]]
+    assert stats["deduplicated"] == 3 and stats["published"] == 6
+
+
+def test_full_queue_policies_and_publish_never_blocks():
+    release = threading.Event()
+    newest, merged = [], []
+
+    def blocked(events):
+        release.wait()
+        newest.append(events)
+
+    dispatcher = NotificationDispatcher()
+    dispatcher.add_destination(blocked, max_queue=2, batch_size=1, max_delay=0, policy=POLICY_DROP_NEWEST)
+    dispatcher.add_destination(lambda events: merged.append(events), max_queue=2, batch_size=10, max_delay=60,
+                               policy=POLICY_MERGE)
+
+    started = time.monotonic()
+    dispatcher.publish("order", 0)
+    time.sleep(0.1)  # the first event is in flight, blocked
+    for i in range(1, 6):
+        dispatcher.publish("order", i)
+    assert time.monotonic() - started < 1
+
+    release.set()
+    dispatcher.close(timeout=5)
+    assert [e["data"] for batch in newest for e in batch] == [0, 1, 2]
+    assert [(e["kind"], e["data"]) for e in merged[0]] == [("order", 4), ("order", 5), ("order", {"merged": 4})]
+    stats = dispatcher.stats()
+    assert stats["blocked"]["dropped"] == 3 and stats["<lambda>"]["merged"] == 4
+
+
+def test_keys_in_flight_are_not_queued_again_until_delivery_fails():
+    release = threading.Event()
+    batches = []
+
+    def failing(events):
+        release.wait()
+        batches.append(events)
+        raise RuntimeError("down")
+
+    dispatcher = NotificationDispatcher()
+    dispatcher.add_destination(failing, max_delay=0, retries=0)
+    response = {"result": {"items": [{"id": "1", "status": 10}]}}
+    dispatcher.publish_orders(response)
+    time.sleep(0.1)  # in flight, blocked
+    dispatcher.publish_orders(response)
+    assert dispatcher.stats()["failing"]["deduplicated"] == 1
+
+    release.set()
+    assert dispatcher.flush(timeout=5)
+    # The failed key is forgotten, so the next poll alerts again
+    dispatcher.publish_orders(response)
+    dispatcher.close(timeout=5)
+    assert len(batches) == 2
+    assert dispatcher.stats()["failing"]["failed"] == 2
+
+
+def test_retries_do_not_hold_workers_from_healthy_destinations():
+    attempts, delivered = [], []
+
+    def failing(events):
+        attempts.append(time.monotonic())
+        raise RuntimeError("down")
+
+    dispatcher = NotificationDispatcher(max_workers=1)
+    dispatcher.add_destination(failing, max_delay=0, retries=2)
+    dispatcher.add_destination(lambda events: delivered.append(time.monotonic()), max_delay=0.2)
+    started = time.monotonic()
+    dispatcher.publish("order", {"id": 1})
+    assert dispatcher.flush(timeout=10)
+
+    # The healthy batch went out while the failing one waited for its retries
+    assert delivered[0] - started < 0.45 < attempts[1] - started
+    assert len(attempts) == 3
+    stats = dispatcher.stats()
+    assert stats["failing"]["failed"] == 1 and stats["<lambda>"]["sent"] == 1
+    dispatcher.close()
@@ -0,0 +1,92 @@
+from bybit_p2p import OrderBookRecorder, OrderBookReplay
+from bybit_p2p._p2p_orderbook import OrderBookWriter, book_key, read_snapshots
+
+
+def make_ads(price, n=3):
+    return [
+        {
+            "id": f"ad{i}",
+            "userId": f"u{i}",
+            "nickName": f"trader {i}",
+            "price": str(price + i / 10),
+            "lastQuantity": "1500.5",
+            "minAmount": "500",
+            "maxAmount": "100000",
+            "recentExecuteRate": 98,
+            "payments": ["14", "377"],
+        }
+        for i in range(n)
+    ]
+
+
+def test_snapshots_round_trip(tmp_path):
+    path = str(tmp_path / "book.bin")
+    with OrderBookWriter(path) as writer:
+        writer.append(book_key("USDT", "RUB", 1), make_ads(90), ts=1000)
+        writer.append(book_key("USDT", "EUR", 0), [], ts=1500)
+        writer.append(book_key("USDT", "RUB", 1), make_ads(91), ts=2000)
+
+    snapshots = list(read_snapshots(path))
+    assert [(s.ts, s.key, s.rows) for s in snapshots] == [
+        (1000, "USDT/RUB/1", 3), (1500, "USDT/EUR/0", 0), (2000, "USDT/RUB/1", 3)
+    ]
+    item = snapshots[2].items[1]
+    assert item["price"] == "91.1"
+    assert item["minAmount"] == "500"
+    assert item["payments"] == ["14", "377"]
+    assert item["nickName"] == "trader 1"
+    assert item["side"] == 1
+    assert [s.ts for s in read_snapshots(path, key="USDT/RUB/1", start=1500)] == [2000]
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / "book.bin"
+    with OrderBookWriter(str(path)) as writer:
+        writer.append("USDT/RUB/1", make_ads(90), ts=1000)
+        writer.append("USDT/RUB/1", make_ads(91), ts=2000)
+    path.write_bytes(path.read_bytes()[:-5])
+    assert [s.ts for s in read_snapshots(str(path))] == [1000]
+
+
+def test_reopened_writer_drops_torn_chunk(tmp_path):
+    path = tmp_path / "book.bin"
+    with OrderBookWriter(str(path)) as writer:
+        writer.append("USDT/RUB/1", make_ads(90), ts=1000)
+        writer.append("USDT/RUB/1", make_ads(91), ts=2000)
+    path.write_bytes(path.read_bytes()[:-5])
+
+    with OrderBookWriter(str(path)) as writer:
+        writer.append("USDT/RUB/1", make_ads(92), ts=3000)
+    with OrderBookWriter(str(path)) as writer:
+        writer.append("USDT/RUB/1", make_ads(93), ts=4000)
+
+    snapshots = list(read_snapshots(str(path)))
+    assert [s.ts for s in snapshots] == [1000, 3000, 4000]
+    assert snapshots[-1].items[0]["price"] == "93"
+
+
+def test_recorder_and_replay(tmp_path):
+    path = str(tmp_path / "book.bin")
+
+    class Api:
+        price = 90
+
+        def get_online_ads(self, **kwargs):
+            items = make_ads(self.price, n=3) if kwargs["page"] == 1 else []
+            return {"retCode": 0, "result": {"count": 3, "items": items}}
+
+    api = Api()
+    recorder = OrderBookRecorder(api, path, [("USDT", "RUB", "1")])
+    for price in (90, 95, 93):
+        api.price = price
+        assert recorder.record_once() == 1
+    recorder.stop()
+
+    seen = []
+
+    def strategy(market, snapshot):
+        ads = market.get_online_ads(tokenId="USDT", currencyId="RUB", side="1", page=1, size=2)
+        seen.append([ad["price"] for ad in ads["result"]["items"]])
+
+    assert OrderBookReplay(path).run(strategy) == 3
+    assert seen == [["90", "90.1"], ["95", "95.1"], ["93", "93.1"]]
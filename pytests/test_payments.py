@@ -0,0 +1,41 @@
+from bybit_p2p import PaymentMethodIndex
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = 0
+
+    def get_user_payment_types(self, **kwargs):
+        self.calls += 1
+        return {"retCode": 0, "result": [
+            {"id": "101", "paymentType": "75", "bankName": "Tinkoff"},
+            {"id": "102", "paymentType": "14", "bankName": "Sber"},
+            {"id": "103", "paymentType": "14", "bankName": "tinkoff "},
+        ]}
+
+
+def test_lookups_are_served_from_the_index():
+    api = FakeApi()
+    payments = PaymentMethodIndex(api, ttl=None)
+    payments.learn_from_ads([{"currencyId": "RUB", "paymentTerms": [{"paymentType": "14"}]}])
+    payments.add_currency("75", "KZT")
+
+    assert payments.get(101)["bankName"] == "Tinkoff"
+    assert [p["id"] for p in payments.by_bank("TINKOFF")] == ["101", "103"]
+    assert payments.payment_ids(currency_id="RUB") == ["102", "103"]
+    assert payments.payment_ids(currency_id="RUB", bank_name="tinkoff") == ["103"]
+    assert payments.payment_ids(payment_types=["75", "14"], currency_id="KZT") == ["101"]
+    assert api.calls == 1
+
+    payments.ttl = 0
+    payments.get("101")
+    assert api.calls == 2
+
+
+def test_resolve_picks_preferred_payment_term():
+    payments = PaymentMethodIndex(FakeApi())
+    order = {"paymentTermList": [{"id": "9", "paymentType": "1"}, {"id": "8", "paymentType": "14"}]}
+    assert payments.resolve(order) == {"paymentType": "14", "paymentId": "8"}
+    assert payments.resolve(order, preferred_types=["1"]) == {"paymentType": "1", "paymentId": "9"}
+    assert payments.resolve(order, preferred_types=["99"]) == {"paymentType": "1", "paymentId": "9"}
+    assert payments.resolve({"paymentTermList": []}) is None
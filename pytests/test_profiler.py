@@ -0,0 +1,79 @@
+import pstats
+import threading
+
+import pytest
+
+from bybit_p2p import P2P, Profiler
+from bybit_p2p._p2p_transport import MockTransport
+
+
+def make_client(profiler):
+    transport = MockTransport(default={"retCode": 0, "result": {"items": []}})
+    return P2P(testnet=True, api_key="key", api_secret="secret", time_sync=False,
+               transport=transport, profiler=profiler)
+
+
+def test_sampled_requests_are_split_into_phases(tmp_path):
+    profiler = Profiler(memory=True, cprofile=True)
+    api = make_client(profiler)
+    for _ in range(3):
+        api.get_pending_orders(page=1, size=10)
+    profiler.disable()
+    api.get_pending_orders(page=1, size=10)
+
+    phases = profiler.summary()["GET_PENDING_ORDERS"]
+    assert list(phases) == ["validate", "rate_limit", "payload", "sign", "prepare", "network", "decode"]
+    assert all(p["count"] == 3 for p in phases.values())
+    assert "GET_PENDING_ORDERS" in profiler.report()
+
+    lines = profiler.collapsed().splitlines()
+    assert "bybit_p2p;GET_PENDING_ORDERS;sign" in [line.rsplit(" ", 1)[0] for line in lines]
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    path = str(tmp_path / "requests.prof")
+    profiler.dump_pstats(path)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert "_generate_sign" in functions
+
+
+def test_sample_rate_and_runtime_switch():
+    profiler = Profiler(sample_rate=0.0)
+    api = make_client(profiler)
+    api.get_ads_list()
+    assert profiler.summary() == {}
+
+    profiler.sample_rate = 1.0
+    api.get_ads_list()
+    assert profiler.summary()["GET_ADS_LIST"]["network"]["count"] == 1
+
+    api.profiler = None
+    api.get_ads_list()
+    assert profiler.summary()["GET_ADS_LIST"]["network"]["count"] == 1
+
+
+def test_concurrent_requests_share_cprofile():
+    profiler = Profiler(cprofile=True)
+    api = make_client(profiler)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                api.get_pending_orders(page=1, size=10)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert profiler.summary()["GET_PENDING_ORDERS"]["network"]["count"] == 80
+
+    # A request failing validation releases cProfile for the next one
+    with pytest.raises(ValueError):
+        api.get_order_details()
+    profiler.reset()
+    api.get_pending_orders(page=1, size=10)
+    assert profiler._pstats
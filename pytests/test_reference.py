@@ -0,0 +1,52 @@
+import json
+import math
+
+import pytest
+
+from bybit_p2p import FileSource, OnlineBookSource, Quote, ReferenceFeed, StaticSource
+
+
+class FakeBook:
+    def get_online_ads(self, **kwargs):
+        prices = {"0": [("89", "10"), ("90", "30")], "1": [("92", "20"), ("91", "20")]}[kwargs["side"]]
+        return {"retCode": 0, "result": {"count": 2, "items": [
+            {"price": p, "lastQuantity": q} for p, q in prices
+        ]}}
+
+
+def test_online_book_stats():
+    feed = ReferenceFeed(OnlineBookSource(FakeBook(), "USDT", "RUB"))
+    published = []
+    feed.subscribe(published.append)
+    stats = feed.update()
+
+    assert published == [stats]
+    assert (stats.bid, stats.ask, stats.mid, stats.spread) == (90.0, 91.0, 90.5, 1.0)
+    assert stats.bid_vwap == (89 * 10 + 90 * 30) / 40
+    assert stats.ask_vwap == 91.5
+    assert stats.volatility == 0.0
+    assert feed.stats is stats
+
+
+def test_window_statistics_roll_over(tmp_path):
+    path = tmp_path / "quotes.jsonl"
+    with open(path, "w") as f:
+        for ts, mid in enumerate([100, 101, 99, 102]):
+            f.write(json.dumps({"ts": ts, "bids": [[mid - 1, 1]], "asks": [[mid + 1, 1]]}) + "\n")
+
+    feed = ReferenceFeed(FileSource(str(path)), window=3)
+    for _ in range(4):
+        stats = feed.update()
+
+    assert stats.samples == 3
+    assert feed.buffer.column("mid") == [101.0, 99.0, 102.0]
+    assert math.isclose(stats.vwap, (101 + 99 + 102) / 3)
+    returns = [math.log(99 / 101), math.log(102 / 99)]
+    mean = sum(returns) / 2
+    assert math.isclose(stats.volatility, math.sqrt(sum((r - mean) ** 2 for r in returns)))
+
+
+def test_stats_are_read_only():
+    stats = ReferenceFeed(StaticSource(Quote(0, [(1, 1)], [(2, 1)]))).update()
+    with pytest.raises(AttributeError):
+        stats.mid = 0
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from bybit_p2p import PRIORITY_HIGH, PRIORITY_LOW, PollingScheduler, TokenBucket
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = []
+        self.result = {"items": []}
+
+    def get_pending_orders(self, **kwargs):
+        self.calls.append(("get_pending_orders", kwargs))
+        return {"retCode": 0, "result": self.result}
+
+    def get_ads_list(self, **kwargs):
+        self.calls.append(("get_ads_list", kwargs))
+        return {"retCode": 0, "result": {"items": []}}
+
+
+def test_duplicate_subscriptions_share_one_request():
+    api = FakeApi()
+    scheduler = PollingScheduler(api, jitter=0)
+    first, second = [], []
+    a = scheduler.subscribe("get_pending_orders", first.append, interval=10, page=1, size=30)
+    scheduler.subscribe("get_pending_orders", second.append, interval=3, size=30, page=1)
+    scheduler.subscribe("get_pending_orders", second.append, interval=3, page=2, size=30)
+
+    assert scheduler.run_pending(time.monotonic()) == 2
+    assert len(api.calls) == 2
+    assert len(first) == 1 and len(second) == 2
+    assert sorted(interval for _, _, interval, _ in scheduler.jobs()) == [3, 3]
+
+    scheduler.unsubscribe(a)
+    assert [count for _, _, _, count in scheduler.jobs()] == [1, 1]
+    with pytest.raises(ValueError):
+        scheduler.subscribe("no_such_method", print)
+
+
+def test_interval_backs_off_while_unchanged_and_resets_on_activity():
+    api = FakeApi()
+    scheduler = PollingScheduler(api, jitter=0)
+    scheduler.subscribe("get_pending_orders", lambda response: None, interval=2)
+    now = time.monotonic()
+    intervals = []
+    for step in range(5):
+        if step == 4:
+            api.result = {"items": [{"id": "1"}]}
+        now += 100
+        scheduler.run_pending(now)
+        intervals.append(scheduler.jobs()[0][2])
+    assert intervals == [2, 3, 4.5, 6.75, 2]
+
+
+def test_faster_subscriber_pulls_the_next_run_forward():
+    api = FakeApi()
+    scheduler = PollingScheduler(api, jitter=0)
+    scheduler.subscribe("get_pending_orders", lambda response: None, interval=10)
+    now = time.monotonic()
+    for step in range(3):
+        now += 100
+        scheduler.run_pending(now)
+    assert scheduler.jobs()[0][2] == 22.5
+
+    scheduler.subscribe("get_pending_orders", lambda response: None, interval=1)
+    assert scheduler.run_pending(time.monotonic() + 1.5) == 1
+    # The entry left at the old time is dropped as stale instead of running the job twice
+    assert scheduler.run_pending(now + 23) == 1
+    assert len(api.calls) == 5 and len(scheduler._heap) == 1
+
+
+def test_low_priority_jobs_yield_when_budget_runs_low():
+    api = FakeApi()
+    budget = TokenBucket(rate=0.001, capacity=10)
+    scheduler = PollingScheduler(api, budget=budget, jitter=0)
+    scheduler.subscribe("get_pending_orders", lambda response: None, interval=1, priority=PRIORITY_HIGH)
+    scheduler.subscribe("get_ads_list", lambda response: None, interval=1, priority=PRIORITY_LOW)
+    budget.try_acquire(7)
+
+    scheduler.run_pending(time.monotonic() + 1)
+    assert [name for name, _ in api.calls] == ["get_pending_orders"]
+
+
+def test_background_thread_polls_until_stopped():
+    api = FakeApi()
+    scheduler = PollingScheduler(api)
+    received = []
+    scheduler.subscribe("get_pending_orders", received.append, interval=0.01)
+    scheduler.start()
+    deadline = time.monotonic() + 2
+    while len(received) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    assert len(received) >= 3
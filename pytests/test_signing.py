@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from bybit_p2p import P2P, SigningExecutor
+
+
+@pytest.fixture(scope="module")
+def rsa_key():
+    from Crypto.PublicKey import RSA
+
+    return RSA.generate(1024).export_key().decode()
+
+
+def test_worker_signatures_match_in_thread_signing(rsa_key):
+    payloads = [f"payload-{i}" for i in range(40)]
+    expected = [P2P._sign(True, rsa_key, p) for p in payloads]
+
+    with SigningExecutor(rsa_key, max_workers=2, inline_threshold=0, batch_size=8) as executor:
+        results = [None] * len(payloads)
+
+        def sign(i):
+            results[i] = executor.sign(payloads[i].encode())
+
+        threads = [threading.Thread(target=sign, args=(i,)) for i in range(len(payloads))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == expected
+        assert executor.sign_async(b"payload-0").result() == expected[0]
+
+
+def test_low_load_signs_in_thread(rsa_key):
+    executor = SigningExecutor(rsa_key, inline_threshold=1)
+    assert executor.sign(b"x") == P2P._sign(True, rsa_key, "x")
+    assert executor._pool is None
+    executor.close()
+    with pytest.raises(RuntimeError):
+        executor.sign(b"x")
+
+
+def test_closed_executor_never_starts_a_pool(rsa_key):
+    executor = SigningExecutor(rsa_key, inline_threshold=0)
+    executor.close()
+    with pytest.raises(RuntimeError):
+        executor.sign_async(b"x")
+    with pytest.raises(RuntimeError):
+        executor._submit(b"x")
+    assert executor._pool is None and executor._batcher is None
+
+
+def test_manager_uses_signer_only_with_rsa(rsa_key):
+    class Recorder:
+        def sign(self, data):
+            self.data = data
+            return "signed"
+
+    signer = Recorder()
+    api = P2P(testnet=True, api_key="k", api_secret=rsa_key, rsa=True, signer=signer)
+    assert api._generate_sign('{"a": 1}', 1000, 5000) == "signed"
+    assert signer.data == b'1000k5000{"a": 1}'
+
+    hmac_api = P2P(testnet=True, api_key="k", api_secret="s", signer=signer)
+    assert len(hmac_api._generate_sign("{}", 1000, 5000)) == 64
@@ -0,0 +1,117 @@
+import pytest
+
+from bybit_p2p import P2PSimulator
+from bybit_p2p._exceptions import FailedRequestError
+from bybit_p2p._p2p_helper import P2PMethods
+from bybit_p2p._p2p_simulator import _HANDLERS
+
+AD = {"tokenId": "USDT", "currencyId": "EUR", "priceType": "0", "premium": "", "minAmount": "10",
+      "maxAmount": "500", "remark": "", "tradingPreferenceSet": {}, "paymentIds": ["1001"],
+      "quantity": "1000", "paymentPeriod": "15", "itemType": "ORIGIN"}
+
+
+def _seller(api):
+    def step(simulator):
+        for order in api.get_pending_orders(page=1, size=50)["result"]["items"]:
+            if order["side"] == 1 and order["status"] == 20:
+                api.release_assets(orderId=order["id"])
+    return step
+
+
+def test_every_method_is_simulated(tmp_path):
+    assert set(_HANDLERS) == {method.url for method in P2PMethods.all()}
+    simulator = P2PSimulator(seed=1, start=1700000000)
+    api = simulator.client()
+
+    assert api.get_server_time()["result"]["timeSecond"] == "1700000000"
+    ad_id = api.post_new_ad(side="1", price="0.93", **AD)["result"]["itemId"]
+    assert api.get_current_balance(accountType="FUND")["result"]["balance"][0]["transferBalance"] == "9000"
+    assert api.get_ads_list()["result"]["items"][0]["id"] == ad_id
+    api.update_ad(id=ad_id, priceType="0", premium="", price="0.5", minAmount="10", maxAmount="500", remark="",
+                  tradingPreferenceSet={}, paymentIds=["1001"], actionType="MODIFY", quantity="2000",
+                  paymentPeriod="15")
+    assert api.get_ad_details(itemId=ad_id)["result"]["price"] == "0.5"
+    assert api.get_current_balance(accountType="FUND")["result"]["balance"][0]["transferBalance"] == "8000"
+    book = api.get_online_ads(tokenId="USDT", currencyId="EUR", side="1", page=1, size=5)["result"]
+    assert book["items"][0]["id"] == ad_id and book["count"] == 21
+
+    simulator.advance(3600)
+    order = api.get_orders(page=1, size=1)["result"]["items"][0]
+    details = api.get_order_details(orderId=order["id"])["result"]
+    assert details["itemId"] == ad_id and details["paymentTermList"][0]["id"] == "1001"
+    info = api.get_counterparty_info(originalUid=order["targetUserId"], orderId=order["id"])["result"]
+    assert info["nickName"] == order["targetNickName"]
+
+    upload = tmp_path / "receipt.png"
+    upload.write_bytes(b"png")
+    url = api.upload_chat_file(upload_file=str(upload))["result"]["url"]
+    api.send_chat_message(message=url, contentType="pic", orderId=order["id"])
+    messages = api.get_chat_messages(orderId=order["id"], size=50)["result"]["result"]
+    assert any(m["message"] == url and m["userId"] == "100000001" for m in messages)
+
+    api.remove_ad(itemId=ad_id)
+    assert api.get_user_payment_types()["result"][0]["paymentType"] == "14"
+    assert api.get_account_information()["result"]["nickName"] == "simulated"
+
+
+def test_simulated_day_is_reproducible_and_moves_the_balance():
+    def day():
+        simulator = P2PSimulator(seed=7, order_rate=12, start=1700000000)
+        api = simulator.client()
+        api.post_new_ad(side="1", price="0.9", **dict(AD, quantity="10000"))
+        return simulator.run(86400, step=300, callback=_seller(api))
+
+    stats = day()
+    assert stats == day()
+    assert stats["elapsed"] == 86400
+    assert stats["finished"] > 10 and stats["orders"] == stats["finished"] + stats["cancelled"] + stats["pending"]
+    sold = stats["volume"]["sold"]
+    assert float(stats["balance"]["total"]) == pytest.approx(10000 - float(sold["quantity"]))
+    assert sold["average_price"] == "0.900"
+
+
+def test_buy_orders_expire_unless_paid_with_the_sellers_term():
+    simulator = P2PSimulator(seed=3, order_rate=60, chat_probability=0)
+    api = simulator.client()
+    api.post_new_ad(side="0", price="0.95", **AD)
+    simulator.advance(600)
+
+    orders = api.get_pending_orders(page=1, size=50)["result"]["items"]
+    assert orders and all(o["side"] == 0 and o["status"] == 10 for o in orders)
+    paid = orders[0]["id"]
+    term = api.get_order_details(orderId=paid)["result"]["paymentTermList"][0]
+    with pytest.raises(FailedRequestError):
+        api.mark_as_paid(orderId=paid, paymentType=term["paymentType"], paymentId="1001")
+    api.mark_as_paid(orderId=paid, paymentType=term["paymentType"], paymentId=term["id"])
+    with pytest.raises(FailedRequestError):
+        api.release_assets(orderId=paid)
+
+    simulator.advance(1800)
+    statuses = {o["id"]: o["status"] for o in api.get_orders(page=1, size=100)["result"]["items"]}
+    assert statuses.pop(paid) == 50
+    stats = simulator.stats()
+    assert stats["expired"] >= len(orders) - 1 and 40 in statuses.values()
+    assert float(stats["balance"]["total"]) > 10000
+
+
+def test_refused_updates_and_bad_sides_change_nothing():
+    simulator = P2PSimulator(seed=1, order_rate=0)
+    api = simulator.client()
+    ad_id = api.post_new_ad(side="1", price="0.93", **AD)["result"]["itemId"]
+    api.remove_ad(itemId=ad_id)
+    update = dict(id=ad_id, priceType="0", premium="", price="0.93", minAmount="10", maxAmount="500", remark="",
+                  tradingPreferenceSet={}, paymentIds=["1001"], paymentPeriod="15")
+
+    with pytest.raises(FailedRequestError):
+        api.update_ad(actionType="ACTIVE", quantity="20000", **update)
+    assert api.get_ad_details(itemId=ad_id)["result"]["status"] == 20
+    assert api.get_current_balance(accountType="FUND")["result"]["balance"][0]["transferBalance"] == "10000"
+    api.update_ad(actionType="ACTIVE", quantity="500", **update)
+    assert api.get_ad_details(itemId=ad_id)["result"]["lastQuantity"] == "500"
+    assert api.get_current_balance(accountType="FUND")["result"]["balance"][0]["transferBalance"] == "9500"
+
+    for side in (None, "x", "3"):
+        with pytest.raises(FailedRequestError):
+            api.post_new_ad(**dict(AD, price="0.93", side=side))
+        with pytest.raises(FailedRequestError):
+            api.get_online_ads(tokenId="USDT", currencyId="EUR", side=side, page=1, size=5)
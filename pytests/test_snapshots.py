@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from bybit_p2p import LeaderLease, MemoryBackend, SnapshotFetcher, SnapshotStore
+
+
+def test_store_rewrites_only_changed_content(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert store.get("orders") is None
+
+    assert store.write("orders", {"success": True, "data": [1]})
+    first = store.get("orders")
+    assert first.json() == {"success": True, "data": [1]}
+    assert first.size == len(first.read())
+
+    assert not store.write("orders", {"success": True, "data": [1]})
+    assert store.get("orders") is first
+
+    assert store.write("orders", {"success": True, "data": [2]})
+    second = store.get("orders")
+    assert second.etag != first.etag
+    assert store.names() == ["orders"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+    with pytest.raises(ValueError):
+        store.path("../escape")
+
+
+def test_open_snapshot_survives_replacement(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.write("ads", b'{"v":1}')
+    with store.get("ads").open() as f:
+        store.write("ads", b'{"v":2}')
+        assert f.read() == b'{"v":1}'
+    assert store.get("ads").read() == b'{"v":2}'
+
+
+def _write_from_other_process(directory):
+    SnapshotStore(directory).write("balance", {"coin": "USDT"})
+
+
+def test_readers_see_writes_from_other_processes(tmp_path):
+    process = multiprocessing.get_context("spawn").Process(target=_write_from_other_process, args=(str(tmp_path),))
+    process.start()
+    process.join(30)
+    assert SnapshotStore(str(tmp_path)).get("balance").json() == {"coin": "USDT"}
+
+
+def test_only_the_lease_holder_fetches(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    backend = MemoryBackend()
+    calls = []
+
+    def fetcher(owner):
+        sources = {"orders": lambda: calls.append(owner) or {"n": len(calls)}}
+        return SnapshotFetcher(store, sources, lease=LeaderLease(backend, "web", ttl=60, owner=owner))
+
+    leader, follower = fetcher("a"), fetcher("b")
+    assert leader.refresh() == ["orders"]
+    assert follower.refresh() is None
+    assert calls == ["a"]
+
+    leader.stop()
+    assert follower.refresh() == ["orders"]
+    assert store.get("orders").json() == {"n": 2}
+
+
+def test_failed_source_keeps_previous_snapshot(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.write("ads", {"ok": True})
+
+    def fail():
+        raise RuntimeError("down")
+
+    fetcher = SnapshotFetcher(store, {"ads": fail, "orders": lambda: {"ok": True}})
+    assert fetcher.refresh() == ["orders"]
+    assert fetcher.failures == 1
+    assert store.get("ads").json() == {"ok": True}
@@ -0,0 +1,208 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from bybit_p2p import LeaderLease, MemoryBackend, PollingScheduler, RedisBackend, SharedTokenBucket, SQLiteBackend
+from bybit_p2p import _p2p_state
+
+
+class RespStandIn(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """
+    Minimal RESP server: plain commands on a MemoryBackend, and the client's Lua
+    scripts mapped to the equivalent MemoryBackend operations.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = MemoryBackend()
+        self.commands = []
+        self.drop = set()
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(value, bool) or isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % int(value))
+        elif isinstance(value, list):
+            self.wfile.write(b"*%d\r\n" % len(value))
+            for item in value:
+                self.reply(item)
+        else:
+            data = value if isinstance(value, bytes) else str(value).encode()
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(data), data))
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            self.server.commands.append(name)
+            if name in self.server.drop:
+                # Run nothing and hang up, as if the connection broke mid-command
+                self.server.drop.discard(name)
+                return
+            if name == "GET":
+                self.reply(data.get(args[1].decode()))
+            elif name == "SET":
+                ttl = int(args[4]) / 1000 if len(args) > 4 else None
+                data.set(args[1].decode(), args[2], ttl)
+                self.wfile.write(b"+OK\r\n")
+            elif name == "DEL":
+                data.delete(args[1].decode())
+                self.reply(1)
+            elif name == "INCRBY":
+                self.reply(data.incr(args[1].decode(), int(args[2])))
+            elif name == "PEXPIRE":
+                self.reply(1)
+            elif name == "EVAL":
+                script, key, argv = args[1].decode(), args[3].decode(), [a.decode() for a in args[4:]]
+                if script == _p2p_state._TOKEN_SCRIPT:
+                    taken, left = data.take_tokens(key, float(argv[0]), float(argv[1]), float(argv[2]))
+                    self.reply([int(taken), repr(left)])
+                elif script == _p2p_state._INCR_SCRIPT:
+                    self.reply(data.incr(key, int(argv[0]), int(argv[1]) / 1000 or None))
+                elif script == _p2p_state._LEASE_SCRIPT:
+                    self.reply(data.acquire_lease(key, argv[0], int(argv[1]) / 1000))
+                elif script == _p2p_state._RELEASE_SCRIPT:
+                    data.release_lease(key, argv[0])
+                    self.reply(1)
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def redis_server():
+    server = RespStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryBackend()
+    elif request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "state.db"))
+        yield backend
+        backend.close()
+    else:
+        server = request.getfixturevalue("redis_server")
+        backend = RedisBackend("127.0.0.1", server.server_address[1])
+        yield backend
+        backend.close()
+
+
+def test_values_counters_and_expiry(backend):
+    backend.set_json("cursor", {"page": 3})
+    assert backend.get_json("cursor") == {"page": 3}
+    backend.set("short", "x", ttl=0.05)
+    assert backend.get("short") == b"x"
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.incr("n") == 1
+    assert backend.incr("n", 5) == 6
+    backend.delete("n")
+    assert backend.get("n") is None
+
+
+def test_shared_token_bucket(backend):
+    first = SharedTokenBucket(backend, "ip", rate=0.001, capacity=3)
+    second = SharedTokenBucket(backend, "ip", rate=0.001, capacity=3)
+    assert first.try_acquire(2)
+    assert not second.try_acquire(2)
+    assert second.try_acquire(1)
+    assert second.available < 1
+    assert not first.acquire(timeout=0.01)
+
+
+def test_leases_elect_one_leader(backend):
+    a = LeaderLease(backend, "poller", ttl=0.2, owner="a")
+    b = LeaderLease(backend, "poller", ttl=0.2, owner="b")
+    assert a.acquire() and a.acquire()
+    assert not b.acquire()
+    a.release()
+    assert b.acquire()
+    time.sleep(0.3)
+    assert a.acquire()
+
+
+def test_redis_retries_reads_only(redis_server):
+    backend = RedisBackend("127.0.0.1", redis_server.server_address[1])
+    backend.set("x", "1")
+    redis_server.drop.add("GET")
+    assert backend.get("x") == b"1"
+    assert redis_server.commands[-2:] == ["GET", "GET"]
+
+    redis_server.drop.add("EVAL")
+    with pytest.raises(ConnectionError):
+        backend.incr("n", ttl=5)
+    assert redis_server.commands[-1] == "EVAL" and backend.get("n") is None
+    assert backend.incr("n", ttl=5) == 1
+    # The counter and its expiry are set by one script
+    assert redis_server.commands[-1] == "EVAL" and "PEXPIRE" not in redis_server.commands
+    backend.close()
+
+
+def test_sqlite_backend_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "state.db")
+    results = []
+
+    def worker():
+        backend = SQLiteBackend(path)
+        for _ in range(50):
+            backend.incr("hits")
+        results.append(backend.get("hits"))
+        backend.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SQLiteBackend(path).get("hits") == b"200"
+
+
+def test_only_the_leader_polls(redis_server):
+    class Api:
+        def __init__(self):
+            self.calls = 0
+
+        def get_pending_orders(self, **kwargs):
+            self.calls += 1
+            return {"retCode": 0, "result": {"items": [{"id": "1"}]}}
+
+    port = redis_server.server_address[1]
+    apis = [Api() for _ in range(3)]
+    received = [[] for _ in apis]
+    schedulers = [PollingScheduler(api, jitter=0, state=RedisBackend("127.0.0.1", port)) for api in apis]
+    for scheduler, inbox in zip(schedulers, received):
+        scheduler.subscribe("get_pending_orders", inbox.append, interval=1, page=1)
+
+    now = time.monotonic()
+    for scheduler in schedulers:
+        scheduler.run_pending(now + 1)
+
+    assert [api.calls for api in apis] == [1, 0, 0]
+    assert all(inbox == [{"retCode": 0, "result": {"items": [{"id": "1"}]}}] for inbox in received)
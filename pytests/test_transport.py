@@ -0,0 +1,88 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bybit_p2p import P2P
+from bybit_p2p._p2p_helper import P2PMethods
+from bybit_p2p._p2p_transport import (
+    MockTransport,
+    RequestsTransport,
+    ThreadedAsyncTransport,
+    TransportRequest,
+    Urllib3Transport,
+)
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        payload = json.dumps({
+            "retCode": 0,
+            "result": {
+                "path": self.path,
+                "body": body.decode(),
+                "sign": self.headers.get("X-BAPI-SIGN"),
+                "chunked": self.headers.get("Transfer-Encoding"),
+            },
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("transport_class", [RequestsTransport, Urllib3Transport])
+def test_transports_send_signed_bytes(server_url, transport_class):
+    transport = transport_class(timeout=5)
+    request = TransportRequest("POST", server_url + "/v5/p2p/order/info",
+                               {"X-BAPI-SIGN": "abc", "Content-Type": "application/json"}, b'{"orderId": "1"}')
+    for _ in range(2):
+        response = transport.send(request)
+        assert response.status_code == 200
+        result = response.json()["result"]
+        assert result == {"path": "/v5/p2p/order/info", "body": '{"orderId": "1"}', "sign": "abc", "chunked": None}
+    transport.close()
+
+
+def test_client_with_mock_transport():
+    transport = MockTransport()
+    transport.add("POST", "/v5/p2p/order/info", lambda request, payload: {
+        "retCode": 0, "result": {"id": payload["orderId"]}
+    })
+    api = P2P(testnet=True, api_key="k", api_secret="s", transport=transport)
+
+    assert api.get_order_details(orderId=5)["result"] == {"id": 5}
+    request = transport.requests[0]
+    assert request.url == "https://api-testnet.bybit.com/v5/p2p/order/info"
+    assert request.headers["X-BAPI-API-KEY"] == "k"
+    assert api._client is None
+
+
+def test_async_request_handler():
+    transport = MockTransport(default=lambda request, payload: {"retCode": 0, "result": payload})
+    api = P2P(testnet=True, api_key="k", api_secret="s", async_transport=ThreadedAsyncTransport(transport))
+
+    async def main():
+        return await asyncio.gather(*[
+            api.http_req_handler_async(P2PMethods.GET_ORDER_DETAILS, {"orderId": str(i)}) for i in range(5)
+        ])
+
+    results = asyncio.run(main())
+    assert [r["result"]["orderId"] for r in results] == ["0", "1", "2", "3", "4"]
+    assert len(transport.requests) == 5
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from bybit_p2p import AdUpdateQueue
+
+
+class FakeApi:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = []
+        self.active = {}
+        self.overlap = False
+        self._lock = threading.Lock()
+
+    def update_ad(self, **params):
+        with self._lock:
+            if self.active.get(params["id"]):
+                self.overlap = True
+            self.active[params["id"]] = True
+        time.sleep(self.delay)
+        with self._lock:
+            self.active[params["id"]] = False
+            self.writes.append(dict(params))
+        if params.get("price") == "bad":
+            raise ValueError("rejected")
+        return {"retCode": 0, "result": {"price": params["price"]}}
+
+
+def test_updates_to_the_same_ad_are_merged():
+    api = FakeApi()
+    with AdUpdateQueue(api, window=0.1) as queue:
+        first = queue.submit(id="1", price="90", quantity="100")
+        second = queue.submit(id="1", price="91")
+        other = queue.submit(id="2", price="50")
+        assert first.result(timeout=2) == second.result(timeout=2) == {"retCode": 0, "result": {"price": "91"}}
+        other.result(timeout=2)
+
+    assert sorted(api.writes, key=lambda w: w["id"]) == [
+        {"id": "1", "price": "91", "quantity": "100"},
+        {"id": "2", "price": "50"},
+    ]
+    assert (queue.submitted, queue.coalesced, queue.sent) == (3, 1, 2)
+
+
+def test_writes_to_one_ad_stay_ordered_and_errors_reach_all_callers():
+    api = FakeApi(delay=0.05)
+    queue = AdUpdateQueue(api, window=0.0)
+    first = queue.submit(id="1", price="90")
+    time.sleep(0.02)  # first write is in flight
+    second = queue.submit(id="1", price="bad")
+    third = queue.submit(id="1", price="bad", quantity="5")
+    assert first.result(timeout=2)["result"]["price"] == "90"
+    for future in (second, third):
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+    queue.close()
+
+    assert [w["price"] for w in api.writes] == ["90", "bad"]
+    assert not api.overlap
+    with pytest.raises(RuntimeError):
+        queue.submit(id="1", price="1")
@@ -1,7 +1,8 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, send_file
 import os
+import threading
 from dotenv import load_dotenv
-from bybit_p2p import P2P
+from bybit_p2p import P2P, LeaderLease, SnapshotFetcher, SnapshotStore, SQLiteBackend
 import logging
 
 load_dotenv()
@@ -42,42 +43,94 @@ def connect_api():
     
     return jsonify({"success": False, "error": "Não foi possível conectar em nenhuma região"})
 
+# Em produção (gunicorn.conf.py) os dados vêm de snapshots atualizados por um único
+# processo e compartilhados por todos os workers; sem P2P_SNAPSHOT_DIR, cada requisição
+# chama a API
+SNAPSHOT_DIR = os.getenv("P2P_SNAPSHOT_DIR")
+SNAPSHOT_INTERVAL = float(os.getenv("P2P_SNAPSHOT_INTERVAL", "5"))
+snapshots = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+
+SOURCES = {
+    "balance": lambda api: api.get_current_balance(accountType="FUND", coin="USDT"),
+    "ads": lambda api: api.get_ads_list(),
+    "orders": lambda api: api.get_pending_orders(page=1, size=10),
+}
+
 @app.route('/api/balance', methods=['GET'])
 def get_balance():
-    return make_api_call(lambda api: api.get_current_balance(accountType="FUND", coin="USDT"))
+    return snapshot_or_api_call("balance")
 
 @app.route('/api/ads', methods=['GET'])
 def get_ads():
-    return make_api_call(lambda api: api.get_ads_list())
+    return snapshot_or_api_call("ads")
 
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
-    return make_api_call(lambda api: api.get_pending_orders())
+    return snapshot_or_api_call("orders")
 
-def make_api_call(func):
-    regions = [
-        {"domain": "bybit", "tld": "com"},
-        {"domain": "bybit", "tld": "tr"},
-        {"domain": "bybit", "tld": "kz"},
-        {"domain": "bybit", "tld": "nl"}
-    ]
-    
-    for region in regions:
-        try:
-            api = P2P(
+def snapshot_or_api_call(name):
+    if snapshots is None:
+        return make_api_call(SOURCES[name])
+    snapshot = snapshots.get(name)
+    if snapshot is None:
+        return jsonify({"success": False, "error": "Dados ainda não disponíveis"}), 503
+    # ETag/If-None-Match -> 304; o arquivo é enviado com sendfile pelo gunicorn
+    return send_file(snapshot.open(), mimetype="application/json", etag=snapshot.etag,
+                     last_modified=snapshot.modified, max_age=0, conditional=True)
+
+REGIONS = [
+    {"domain": "bybit", "tld": "com"},
+    {"domain": "bybit", "tld": "tr"},
+    {"domain": "bybit", "tld": "kz"},
+    {"domain": "bybit", "tld": "nl"}
+]
+
+# Um cliente por região, reutilizado entre requisições (conexões keep-alive, relógio
+# sincronizado); sem timeout, uma região que não responde travaria a thread do worker
+API_TIMEOUT = float(os.getenv("P2P_API_TIMEOUT", "10"))
+clients = {}
+clients_lock = threading.Lock()
+
+def region_client(region):
+    with clients_lock:
+        api = clients.get(region["tld"])
+        if api is None:
+            api = clients[region["tld"]] = P2P(
                 testnet=False,
                 api_key=os.getenv("BYBIT_API_KEY"),
                 api_secret=os.getenv("BYBIT_API_SECRET"),
                 domain=region["domain"],
-                tld=region["tld"]
+                tld=region["tld"],
+                timeout=API_TIMEOUT
             )
-            result = func(api)
-            return jsonify({"success": True, "data": result})
+        return api
+
+def call_api(func):
+    for region in REGIONS:
+        try:
+            return func(region_client(region))
         except Exception as e:
             logger.warning(f"Falha com TLD {region['tld']}: {str(e)}")
             continue
-    
-    return jsonify({"success": False, "error": "Falha em todas as regiões"})
+    raise RuntimeError("Falha em todas as regiões")
+
+def make_api_call(func):
+    try:
+        return jsonify({"success": True, "data": call_api(func)})
+    except RuntimeError as e:
+        return jsonify({"success": False, "error": str(e)})
+
+def start_snapshot_fetcher():
+    """
+    Chamado em cada worker por gunicorn.conf.py; só o worker com o lease chama a API.
+    """
+
+    lease = LeaderLease(SQLiteBackend(os.path.join(SNAPSHOT_DIR, "lease.db")), "web-snapshots",
+                        ttl=max(15.0, SNAPSHOT_INTERVAL * 3))
+    sources = {name: (lambda func=func: {"success": True, "data": call_api(func)}) for name, func in SOURCES.items()}
+    fetcher = SnapshotFetcher(snapshots, sources, interval=SNAPSHOT_INTERVAL, lease=lease)
+    fetcher.start()
+    return fetcher
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))